@@ -1,6 +1,6 @@
 from matplotlib import pyplot as plt
 from LHeC_shieldingStudy import dipoleOptimised_half as lf
-import pybdsim
+from LHeC_shieldingStudy import results
 import numpy as np
 import pandas as pd
 import os
@@ -8,7 +8,6 @@ import csv
 
 os.chdir("/Users/connormonaghan/Documents/LHeC/Final_Sims")
 
-pybdsim.Data.LoadROOTLibraries()
 plt.style.use(['science','no-latex','ieee', 'grid'])
 
 material    = 'steelMagnetite'
@@ -22,9 +21,13 @@ percentAtten = np.zeros((len(thicknesses),12))
 
 buffer = np.zeros((len(thicknesses), nruns))
 
+# every run is also kept in the results database, one row per seed
+db = results.resultsDB('DATA/results.sqlite')
+
 i = 0
 for t in thicknesses:
     s = lf.shieldingStudy(material, ngenerate, nruns, t, runKey)
+    s.results = db
 
     s.genGMAD()
 
@@ -1,5 +1,6 @@
 import numpy as np
 import pybdsim
+from LHeC_shieldingStudy import streaming
 import csv
 import os
 import scipy.optimize as opt
@@ -18,11 +19,11 @@ def genBDSIMcsv():
     
     i = 0
     for t in thicknesses:
-        d = pybdsim.Data.Load("DATA/{}/{}-{}m.root".format(runKey,material,t))
-        target  = pybdsim.Data.SamplerData(d,'target')
-        drift   = pybdsim.Data.SamplerData(d,'DRIFT_0')
-        numBefore = len(drift.data['energy'][(drift.data['partID']==22)&(drift.data['zp']>=0)&(drift.data['x']>=0.005)])
-        numAfter  = len(target.data['energy'][(target.data['partID']==22)&(target.data['zp']>=0)&(target.data['x']>=0.005)])
+        # count chunk by chunk so only a few thousand events are in memory at once
+        f   = "DATA/{}/{}-{}m.root".format(runKey,material,t)
+        cut = lambda d: (d['partID']==22)&(d['zp']>=0)&(d['x']>=0.005)
+        n   = streaming.counts(streaming.iterSamplers(f, ['DRIFT_0', 'target'], branches=('x', 'zp', 'partID'), chunkSize=5000), ['DRIFT_0', 'target'], select=cut)
+        numBefore, numAfter = n['DRIFT_0'], n['target']
     
         percentAtten[i] = 1-(numAfter/numBefore)
         i = i+1
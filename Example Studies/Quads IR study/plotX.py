@@ -1,19 +1,23 @@
 from matplotlib import pyplot as plt
-import pybdsim
+from LHeC_shieldingStudy import streaming
 import numpy as np
 
 plt.style.use(['science','no-latex','ieee', 'grid'])
 
-d = pybdsim.Data.Load("/Users/connormonaghan/Documents/LHeC/IRstudy_full/DATA/run_Pb_quads/Pb-0.025m_quads.root")
+# Read the samplers in chunks of events so large runs do not have to fit in memory
+f = "/Users/connormonaghan/Documents/LHeC/IRstudy_full/DATA/run_Pb_quads/Pb-0.025m_quads.root"
+photons = lambda d: d['partID']==22
 
-DRIFT_1 = pybdsim.Data.SamplerData(d, 'dDRIFT50')
-COL_0 = pybdsim.Data.SamplerData(d, 'COL_END_0')
+h_DRIFT_1, edges = streaming.histogram(streaming.iterSamplers(f, ['dDRIFT50'], branches=('x', 'partID'), chunkSize=5000),
+                                       'dDRIFT50', 'x', 80, (-0.005, 0.4), select=photons)
+h_COL_0, _       = streaming.histogram(streaming.iterSamplers(f, ['COL_END_0'], branches=('x', 'partID'), chunkSize=5000),
+                                       'COL_END_0', 'x', 80, (-0.005, 0.4), select=photons)
 
 fig1, axs1 = plt.subplots(2,1)
 fig1.set_figheight(4)
 fig1.set_figwidth(6)
 
-axs1[0].hist(DRIFT_1.data['x'][DRIFT_1.data['partID']==22], 80, (-0.005, 0.4), histtype='step', edgecolor='green', ls="-")
+axs1[0].hist(edges[:-1], edges, weights=h_DRIFT_1, histtype='step', edgecolor='green', ls="-")
 axs1[0].axvline(x=0.00, color='b', linestyle='--', linewidth=0.5)
 axs1[0].axvline(x=-0.005, color='b', linestyle='-', linewidth=0.5)
 axs1[0].axvline(x=0.005, color='b', linestyle='-', linewidth=0.5)
@@ -23,7 +27,7 @@ axs1[0].axvline(x=0.106105-0.02, color='r', linestyle='-', linewidth=0.5)
 axs1[0].axvline(x=0.106105+0.02, color='r', linestyle='-', linewidth=0.5)
 axs1[0].set_yscale("log")
 
-axs1[1].hist(COL_0.data['x'][COL_0.data['partID']==22], 80, (-0.005, 0.4), histtype='step', edgecolor='green', ls="-")
+axs1[1].hist(edges[:-1], edges, weights=h_COL_0, histtype='step', edgecolor='green', ls="-")
 axs1[1].axvline(x=0.00, color='b', linestyle='--', linewidth=0.5)
 axs1[1].axvline(x=-0.005, color='b', linestyle='-', linewidth=0.5)
 axs1[1].axvline(x=0.005, color='b', linestyle='-', linewidth=0.5)
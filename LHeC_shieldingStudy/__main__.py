@@ -0,0 +1,40 @@
+"""
+Command line entry point, run a campaign from a json spec (see campaign.campaign).
+
+    python -m LHeC_shieldingStudy spec.json --workers 64 --dir /path/to/study
+    python -m LHeC_shieldingStudy spec.json --scheduler slurm
+"""
+
+import argparse as _argparse
+import json as _json
+import os as _os
+
+
+def main(argv=None):
+    parser = _argparse.ArgumentParser(prog="python -m LHeC_shieldingStudy",
+                                      description="Run a material x thickness x seed shielding campaign.")
+    parser.add_argument("spec", help="json file containing the campaign spec")
+    parser.add_argument("--workers", type=int, default=None, help="max number of jobs running at once")
+    parser.add_argument("--scheduler", default=None, choices=["local", "slurm", "htcondor"],
+                        help="submit the jobs as job arrays to this batch scheduler (see batch.py)")
+    parser.add_argument("--dir", default=None, help="directory to run from (containing GMAD/, DATA/, ...)")
+    args = parser.parse_args(argv)
+
+    with open(args.spec) as f:
+        spec = _json.load(f)
+    if args.scheduler is not None:
+        spec["batch"] = dict(spec.get("batch", {}), scheduler=args.scheduler)
+
+    if args.dir is not None:
+        _os.chdir(args.dir)
+
+    from .campaign import campaign, COLUMNS
+    results = campaign(spec).run(workers=args.workers)
+
+    for (m, t), row in sorted(results.items()):
+        print("{} {}m: {} = {:f} +- {:f}".format(m, t, COLUMNS[0], row[0], row[1]))
+    return 0
+# end main (func)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
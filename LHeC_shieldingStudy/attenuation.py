@@ -0,0 +1,199 @@
+"""
+Analytic (Beer-Lambert) attenuation of photons for choosing the thickness range of a study.
+
+A beam of photons of energy E is attenuated in a material of density rho as
+
+    I/I0 = exp(-(mu/rho)(E) * rho * t)
+
+with the mass attenuation coefficients mu/rho from 'Atten-Coeffs.xlsx' (first
+row density in g/cm^3, then one row per energy in MeV of mu/rho in cm^2/g). The
+table is read once and cached as arrays, thickness() and transmission() then
+evaluate every combination of materials x energies x transmissions (or
+thicknesses) in one broadcast numpy operation. Energies between the tabulated
+ones are interpolated log-log, missing coefficients (0 in the table) and energies
+outside the table give nan.
+
+Example:
+
+>>> t = thickness(["Pb", "W", "Cu"], [0.2, 0.3], np.linspace(0.01, 0.0002, 50))
+>>> t.shape                     # (materials, energies, transmissions) in cm
+(3, 2, 50)
+
+The synchrotron radiation is not mono-energetic, foldedTransmission() weights the
+attenuation of each energy bin of a photon spectrum (e.g. the E_photons_dDRIFT50
+histogram of EnergyDistr/rebdsim-input.txt) to estimate the fraction left after
+each thickness of a grid for the real spectrum:
+
+>>> energies, weights = spectrumFromHistogram(d.histogramspy['Event/SimpleHistograms/E_photons_dDRIFT50'])
+>>> f = foldedTransmission(["Pb", "W"], np.linspace(0, 5, 200), energies, weights)
+>>> t = foldedThickness(["Pb", "W"], [1e-3], energies, weights)      # cm for 99.9% absorbed
+"""
+
+import functools as _functools
+import os as _os
+
+import numpy as _np
+
+# Table shipped with the material investigation
+DEFAULT_TABLE = _os.path.join(_os.path.dirname(_os.path.abspath(__file__)), "..", "Example Studies",
+                              "Material Investigation", "Atten-Coeffs.xlsx")
+
+# bdsim material names of the columns of the table
+MATERIALS = {"bariteConcrete" : "Barite-Concrete",
+             "steelMagnetite" : "Steel-Magnetite",
+             "Fe"             : "Iron",
+             "Cu"             : "Copper",
+             "W"              : "Tungsten",
+             "Pb"             : "Lead",
+             "U"              : "Uranium",
+             "G4_WATER"       : "Water"}
+
+
+class coefficientTable:
+    """
+    Mass attenuation coefficients of a set of materials, 'mu' has shape
+    (materials, energies) in cm^2/g, 'density' is in g/cm^3 and 'energies' in MeV.
+    """
+
+    def __init__(self, materials, energies, density, mu):
+        order          = _np.argsort(energies)
+        self.materials = list(materials)
+        self.energies  = _np.asarray(energies, dtype=float)[order]
+        self.density   = _np.asarray(density, dtype=float)
+        self.mu        = _np.asarray(mu, dtype=float)[:, order]
+        with _np.errstate(divide='ignore'):
+            self._logMu = _np.log(self.mu)
+        self._logMu[~(self.mu > 0)] = _np.nan
+        self._index = {m: i for i, m in enumerate(self.materials)}
+        for a in [self.energies, self.density, self.mu, self._logMu]:
+            a.setflags(write=False)
+    # end __init__ (func)
+
+    def index(self, materials):
+        """
+        Column numbers of the given materials, by table name or bdsim name (see MATERIALS).
+        """
+        try:
+            return _np.asarray([self._index[MATERIALS.get(m, m)] for m in materials], dtype=int)
+        except KeyError as e:
+            raise ValueError("Unknown material {}, choose from {}".format(e, self.materials))
+    # end index (func)
+
+    def linear(self, materials, energies, clip=False):
+        """
+        Linear attenuation coefficients mu (1/cm) of shape (materials, energies).
+
+        With 'clip' energies outside the table use the coefficient of the nearest tabulated
+        energy instead of nan.
+        """
+        cols = self.index(materials)
+        e    = _np.log(_np.asarray(energies, dtype=float))
+        x    = _np.log(self.energies)
+        if clip:
+            e = _np.clip(e, x[0], x[-1])
+        hi   = _np.clip(_np.searchsorted(x, e), 1, len(x)-1)
+        w    = (e-x[hi-1])/(x[hi]-x[hi-1])
+        w    = _np.where((e < x[0]) | (e > x[-1]), _np.nan, w)
+        lo   = self._logMu[cols][:, hi-1]
+        up   = self._logMu[cols][:, hi]
+        # tabulated energies must not pick up a missing neighbour
+        L    = _np.where(w == 0, lo, _np.where(w == 1, up, ((1-w)*lo) + (w*up)))
+        mu   = _np.exp(L)
+        return mu*self.density[cols, None]
+    # end linear (func)
+
+# end coefficientTable (class)
+
+@_functools.lru_cache(maxsize=None)
+def _load(path, mtime):
+    import pandas as _pd
+    data = _pd.read_excel(path)
+    data = data.dropna(axis=1, how='all').dropna(axis=0, how='all')
+    n    = data.pop('n').to_numpy(dtype=float)
+    vals = data.to_numpy(dtype=float).T
+    return coefficientTable(data.columns, n[1:], vals[:, 0], vals[:, 1:])
+# end _load (func)
+
+def loadTable(path=DEFAULT_TABLE):
+    """
+    Read a table of attenuation coefficients (layout of 'Atten-Coeffs.xlsx'), the table is only
+    read again if the file changes.
+    """
+    path = _os.path.abspath(path)
+    return _load(path, _os.stat(path).st_mtime_ns)
+# end loadTable (func)
+
+def thickness(materials, energies, transmission, table=None):
+    """
+    Thickness (cm) needed so only 'transmission' (fraction) of the photons are left, for every
+    material x energy x transmission. Return an array of shape
+    (len(materials), len(energies), len(transmission)).
+    """
+    table = loadTable() if table is None else table
+    mu    = table.linear(materials, energies)
+    return -_np.log(_np.asarray(transmission, dtype=float))[None, None, :]/mu[:, :, None]
+# end thickness (func)
+
+def transmission(materials, energies, thickness, table=None):
+    """
+    Fraction of photons left after 'thickness' (cm) for every material x energy x thickness,
+    the inverse of thickness().
+    """
+    table = loadTable() if table is None else table
+    mu    = table.linear(materials, energies)
+    return _np.exp(-mu[:, :, None]*_np.asarray(thickness, dtype=float)[None, None, :])
+# end transmission (func)
+
+def spectrumFromHistogram(hist, unit=1.0):
+    """
+    Return the bin centres (MeV) and contents of a pybdsim 1D histogram of photon energy,
+    'unit' converts the histogram axis to MeV (e.g. 1000 for an axis in GeV).
+    """
+    return _np.asarray(hist.xcentres, dtype=float)*unit, _np.asarray(hist.contents, dtype=float)
+# end spectrumFromHistogram (func)
+
+def foldedTransmission(materials, thickness, energies, weights, table=None, clip=True):
+    """
+    Fraction of the photons of a spectrum (bin energies in MeV and number of photons in each
+    bin) left after each 'thickness' (cm). Return an array of shape
+    (len(materials), len(thickness)).
+
+    By default energies outside the table use the nearest tabulated coefficient, below the
+    table this overestimates the fraction left (mu only increases to lower energies apart
+    from absorption edges) so the estimate is conservative for the soft part of the fan.
+    """
+    table = loadTable() if table is None else table
+    w     = _np.asarray(weights, dtype=float)
+    w     = w/w.sum()
+    mu    = table.linear(materials, energies, clip=clip)
+    return _np.exp(-mu[:, :, None]*_np.asarray(thickness, dtype=float)[None, None, :]).transpose(0, 2, 1) @ w
+# end foldedTransmission (func)
+
+def foldedThickness(materials, transmission, energies, weights, table=None, clip=True, tol=1e-6, maxIter=200):
+    """
+    Thickness (cm) at which foldedTransmission() is 'transmission' (0 < transmission <= 1) for
+    every material x transmission, shape (len(materials), len(transmission)). Solved by bisection
+    for all points at once, at most 'maxIter' steps, as the folded curve is not a single
+    exponential.
+    """
+    t = _np.asarray(transmission, dtype=float)
+    if not ((t > 0) & (t <= 1)).all():
+        raise ValueError("The transmission must be in (0, 1], not {}".format(t[~((t > 0) & (t <= 1))]))
+    table  = loadTable() if table is None else table
+    w      = _np.asarray(weights, dtype=float)
+    w      = w/w.sum()
+    mu     = table.linear(materials, energies, clip=clip)[:, None, :]     # (materials, 1, energies)
+    target = _np.asarray(transmission, dtype=float)[None, :]
+    # upper bound: the fraction left if every photon had the smallest mu of the spectrum
+    hi     = -_np.log(target)/_np.nanmin(_np.where(w > 0, mu, _np.nan), axis=2)
+    lo     = _np.zeros_like(hi)
+    for _ in range(maxIter):
+        if not _np.nanmax(hi-lo) > tol:
+            break
+        mid  = (lo+hi)/2
+        f    = _np.exp(-mu*mid[:, :, None]) @ w
+        lo   = _np.where(f > target, mid, lo)
+        hi   = _np.where(f > target, hi, mid)
+    missing = _np.isnan(mu[:, 0, w > 0]).any(axis=1)[:, None]
+    return _np.where(missing, _np.nan, (lo+hi)/2)
+# end foldedThickness (func)
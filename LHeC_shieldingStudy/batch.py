@@ -0,0 +1,367 @@
+"""
+Run the seeds of a study or campaign as job arrays on a batch cluster.
+
+A campaign of materials x thicknesses x seeds quickly needs more cores than one
+node has. batchExecutor is a concurrent.futures.Executor, like the process pool
+runSeeds() and campaign.run() use, which sends every call to a batch scheduler
+instead of a local process:
+
+- the calls submitted together are pickled into '<directory>/array-*/tasks/'
+  and a job script running 'python -m LHeC_shieldingStudy.batch <array> <task>'
+  is written next to them,
+- the script is submitted once as a job array of one task per call,
+- the result files of the tasks are polled and each future is completed with the
+  counts of its run (or the exception raised in the job), a task whose job left
+  the queue without writing a result fails with its log file in the message.
+
+The scheduler only has to submit, poll and cancel an array, slurm and htcondor
+are provided as well as localScheduler, which runs the same job scripts in
+subprocesses so the whole submit/collect cycle can be tried on one machine.
+The directory must be on a filesystem shared with the nodes and the jobs run
+from the current directory of the submitting process (GMAD/, DATA/, ...).
+
+Example:
+
+>>> ex = batchExecutor(slurm(options=["--partition=long", "--mem=2G"]), directory="batch",
+...                    setup=["source /opt/geant4/bin/geant4.sh"])
+>>> value, err, val_range = s.runStudy(executor=ex)
+>>> results = campaign(spec).run(executor=ex)
+
+or in a campaign spec: "batch": {"scheduler": "slurm", "options": ["--mem=2G"]}.
+"""
+
+import concurrent.futures as _futures
+import os as _os
+import pickle as _pickle
+import shlex as _shlex
+import subprocess as _subprocess
+import sys as _sys
+import tempfile as _tempfile
+import threading as _threading
+import traceback as _traceback
+
+# directory containing the package, added to the PYTHONPATH of the jobs
+_PACKAGE_ROOT = _os.path.dirname(_os.path.dirname(_os.path.abspath(__file__)))
+
+
+def _writeAtomic(path, data):
+    fd, tmp = _tempfile.mkstemp(dir=_os.path.dirname(path), suffix=".tmp")
+    with _os.fdopen(fd, "wb") as f:
+        f.write(data)
+    _os.replace(tmp, path)
+# end _writeAtomic (func)
+
+def _taskFile(array, k):
+    return _os.path.join(array, "tasks", "{}.pkl".format(k))
+# end _taskFile (func)
+
+def _resultFile(array, k):
+    return _os.path.join(array, "results", "{}.pkl".format(k))
+# end _resultFile (func)
+
+def logFile(array, k):
+    """
+    Output of task k of the array in directory 'array'.
+    """
+    return _os.path.join(array, "logs", "{}.log".format(k))
+# end logFile (func)
+
+def runTask(array, k):
+    """
+    Perform task k of an array (called by the job script) and write its result, either
+    ("ok", value) or ("error", exception, traceback). Return the exit status of the job.
+    """
+    try:
+        with open(_taskFile(array, k), "rb") as f:
+            fn, args, kwargs = _pickle.load(f)
+        result = ("ok", fn(*args, **kwargs))
+        status = 0
+    except Exception as e:
+        tb     = _traceback.format_exc()
+        result = ("error", e, tb)
+        status = 1
+        _sys.stderr.write(tb)
+    try:
+        data = _pickle.dumps(result)
+    except Exception:
+        # an exception which can not be pickled is sent as its traceback
+        data = _pickle.dumps(("error", RuntimeError(result[-1]), result[-1]))
+    _writeAtomic(_resultFile(array, k), data)
+    return status
+# end runTask (func)
+
+def _run(cmd, **kwargs):
+    return _subprocess.run(cmd, check=True, stdout=_subprocess.PIPE, universal_newlines=True, **kwargs).stdout.strip()
+# end _run (func)
+
+class localScheduler:
+    """
+    Stand-in for a batch scheduler running the tasks of each array as subprocesses of this
+    process, at most 'slots' at once (default the cpu count).
+    """
+
+    def __init__(self, slots=None):
+        self.slots  = slots or _os.cpu_count() or 1
+        self._jobs  = {}            # (job id -> [thread, cancel event, running processes])
+        self._next  = 0
+    # end __init__ (func)
+
+    def _runArray(self, array, script, n, cancel, procs):
+        def task(k):
+            if cancel.is_set():
+                return
+            with open(logFile(array, k), "w") as log:
+                p = _subprocess.Popen(["sh", script, str(k)], stdout=log, stderr=_subprocess.STDOUT)
+                procs.add(p)
+                p.wait()
+                procs.discard(p)
+
+        with _futures.ThreadPoolExecutor(max_workers=min(self.slots, n)) as pool:
+            list(pool.map(task, range(n)))
+    # end _runArray (func)
+
+    def submit(self, array, script, n):
+        """
+        Start the n tasks of the array in the background and return the job id.
+        """
+        jobId, self._next = str(self._next), self._next+1
+        cancel, procs     = _threading.Event(), set()
+        t = _threading.Thread(target=self._runArray, args=(array, script, n, cancel, procs), daemon=True)
+        t.start()
+        self._jobs[jobId] = [t, cancel, procs]
+        return jobId
+    # end submit (func)
+
+    def running(self, jobId):
+        """
+        Whether any task of the array is still queued or running.
+        """
+        return self._jobs[jobId][0].is_alive()
+    # end running (func)
+
+    def cancel(self, jobId):
+        t, cancel, procs = self._jobs[jobId]
+        cancel.set()
+        for p in list(procs):
+            p.kill()
+    # end cancel (func)
+
+# end localScheduler (class)
+
+class slurm:
+    """
+    Slurm scheduler, each array is submitted with sbatch --array and polled with squeue.
+    'options' are extra arguments of sbatch (partition, memory, time limit, ...).
+    """
+
+    def __init__(self, options=()):
+        self.options = list(options)
+    # end __init__ (func)
+
+    def submit(self, array, script, n):
+        out = _run(["sbatch", "--parsable", "--array=0-{}".format(n-1),
+                    "--job-name=shielding", "--output={}".format(_os.path.join(array, "logs", "%a.log"))]
+                   + self.options + [script])
+        return out.split(";")[0]
+    # end submit (func)
+
+    def running(self, jobId):
+        try:
+            return bool(_run(["squeue", "--noheader", "--jobs={}".format(jobId), "--format=%T"]))
+        except _subprocess.CalledProcessError:
+            # squeue fails for a job id which has left the queue
+            return False
+    # end running (func)
+
+    def cancel(self, jobId):
+        _subprocess.call(["scancel", jobId])
+    # end cancel (func)
+
+# end slurm (class)
+
+class htcondor:
+    """
+    HTCondor scheduler, each array is one cluster of n processes written to a submit file,
+    'options' are extra lines of the submit description (e.g. "request_memory = 2GB").
+    """
+
+    def __init__(self, options=()):
+        self.options = list(options)
+    # end __init__ (func)
+
+    def submit(self, array, script, n):
+        sub = _os.path.join(array, "job.sub")
+        with open(sub, "w") as f:
+            f.write("\n".join(["executable = {}".format(script),
+                               "arguments  = $(Process)",
+                               "initialdir = {}".format(_os.getcwd()),
+                               "output     = {}".format(_os.path.join(array, "logs", "$(Process).log")),
+                               "error      = {}".format(_os.path.join(array, "logs", "$(Process).err")),
+                               "log        = {}".format(_os.path.join(array, "condor.log"))]
+                              + self.options + ["queue {}".format(n), ""]))
+        out = _run(["condor_submit", "-terse", sub])
+        return out.split(".")[0]
+    # end submit (func)
+
+    def running(self, jobId):
+        return bool(_run(["condor_q", jobId, "-af", "ProcId"]))
+    # end running (func)
+
+    def cancel(self, jobId):
+        _subprocess.call(["condor_rm", jobId])
+    # end cancel (func)
+
+# end htcondor (class)
+
+# schedulers which can be named in a campaign spec
+SCHEDULERS = {"local": localScheduler, "slurm": slurm, "htcondor": htcondor}
+
+class batchExecutor(_futures.Executor):
+    """
+    Executor submitting calls as job arrays of 'scheduler' (default localScheduler), the files
+    of each array are kept in 'directory'. The calls submitted within a second of each other
+    form one array and the results are polled every 'poll' seconds. 'setup' are shell lines run
+    by every job before python (e.g. to source the geant4 environment) and 'python' is the
+    interpreter of the jobs, default the one running this process.
+    """
+
+    def __init__(self, scheduler=None, directory="batch", poll=10, setup=(), python=None):
+        self.scheduler = scheduler if scheduler is not None else localScheduler()
+        self.directory = _os.path.abspath(directory)
+        self.poll      = poll
+        self.setup     = list(setup)
+        self.python    = python or _sys.executable
+        self._pending  = []         # ([(future, fn, args, kwargs)] not submitted yet)
+        self._arrays   = []         # ([job id, array dir, {task: future}, num polls without the job])
+        self._lock     = _threading.Condition()
+        self._thread   = None
+        self._shutdown = False
+        _os.makedirs(self.directory, exist_ok=True)
+    # end __init__ (func)
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot submit to a batchExecutor after shutdown")
+            f = _futures.Future()
+            self._pending.append((f, fn, args, kwargs))
+            if self._thread is None:
+                self._thread = _threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+            return f
+    # end submit (func)
+
+    def _script(self, array):
+        lines = ["#!/bin/sh",
+                 "cd {}".format(_shlex.quote(_os.getcwd())),
+                 "export PYTHONPATH={}${{PYTHONPATH:+:$PYTHONPATH}}".format(_shlex.quote(_PACKAGE_ROOT))]
+        lines += self.setup
+        lines += ['exec {} -m {} {} "${{1:-$SLURM_ARRAY_TASK_ID}}"'.format(_shlex.quote(self.python), __name__,
+                                                                          _shlex.quote(array)), ""]
+        script = _os.path.join(array, "job.sh")
+        with open(script, "w") as f:
+            f.write("\n".join(lines))
+        _os.chmod(script, 0o755)
+        return script
+    # end _script (func)
+
+    def _submitArray(self, calls):
+        calls = [c for c in calls if c[0].set_running_or_notify_cancel()]
+        if not calls:
+            return
+        array = _tempfile.mkdtemp(prefix="array-", dir=self.directory)
+        for d in ["tasks", "results", "logs"]:
+            _os.makedirs(_os.path.join(array, d))
+        futures = {}
+        for k, (f, fn, args, kwargs) in enumerate(calls):
+            try:
+                _writeAtomic(_taskFile(array, k), _pickle.dumps((fn, args, kwargs)))
+                futures[k] = f
+            except Exception as e:
+                f.set_exception(e)
+        if not futures:
+            return
+        try:
+            jobId = self.scheduler.submit(array, self._script(array), len(calls))
+        except Exception as e:
+            for f in futures.values():
+                f.set_exception(e)
+            return
+        self._arrays.append([jobId, array, futures, 0])
+    # end _submitArray (func)
+
+    def _collect(self):
+        for a in list(self._arrays):
+            jobId, array, futures, _ = a
+            running = self.scheduler.running(jobId)
+            for k in [k for k in futures if _os.path.exists(_resultFile(array, k))]:
+                with open(_resultFile(array, k), "rb") as f:
+                    result = _pickle.load(f)
+                f = futures.pop(k)
+                if result[0] == "ok":
+                    f.set_result(result[1])
+                else:
+                    f.set_exception(result[1])
+            if futures and not running:
+                # results on a shared filesystem can show up late, wait one more poll
+                a[3] += 1
+                if a[3] > 1:
+                    for k, f in futures.items():
+                        f.set_exception(RuntimeError("Task {} of batch job {} finished without a result, see {}"
+                                                     .format(k, jobId, logFile(array, k))))
+                    futures.clear()
+            if not futures:
+                self._arrays.remove(a)
+    # end _collect (func)
+
+    def _loop(self):
+        with self._lock:
+            while not (self._shutdown and not self._pending and not self._arrays):
+                # a second is left for the rest of a burst of submits to join the same array
+                self._lock.wait(self.poll if self._arrays and not self._pending else min(1, self.poll))
+                pending, self._pending = self._pending, []
+                if pending:
+                    self._submitArray(pending)
+                self._collect()
+            self._thread = None
+    # end _loop (func)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                for c in self._pending:
+                    c[0].cancel()
+                self._pending = []
+                for jobId, array, futures, _ in self._arrays:
+                    self.scheduler.cancel(jobId)
+                    for f in futures.values():
+                        f.cancel()
+                self._arrays = []
+            thread = self._thread
+            self._lock.notify_all()
+        if wait and thread is not None:
+            thread.join()
+    # end shutdown (func)
+
+# end batchExecutor (class)
+
+def fromSpec(spec):
+    """
+    batchExecutor of the "batch" dict of a campaign spec, with the keys scheduler (one of
+    SCHEDULERS, default local), options (of the scheduler), slots (of the local scheduler),
+    directory, poll, setup and python (see batchExecutor).
+    """
+    name = spec.get("scheduler", "local")
+    if name not in SCHEDULERS:
+        raise ValueError("Unknown scheduler '{}', choose from {}".format(name, list(SCHEDULERS)))
+    if name == "local":
+        scheduler = localScheduler(spec.get("slots"))
+    else:
+        scheduler = SCHEDULERS[name](spec.get("options", ()))
+    return batchExecutor(scheduler, directory=spec.get("directory", "batch"), poll=spec.get("poll", 10),
+                         setup=spec.get("setup", ()), python=spec.get("python"))
+# end fromSpec (func)
+
+if __name__ == "__main__":
+    raise SystemExit(runTask(_sys.argv[1], int(_sys.argv[2])))
@@ -0,0 +1,789 @@
+"""
+Benchmarks of every stage of a shieldingStudy and of the counting kernels, without bdsim.
+
+standIn replaces bdsim, rebdsim and pybdsim by a deterministic local generator, so
+neither bdsim, ROOT nor pybdsim have to be installed:
+
+- the study imports a small pybdsim of the stand-in (Builder, Beam, Options, Run and
+  Data, see fakePybdsim) which writes the lattice as a plain gmad file,
+- 'bdsim' reads the shielding from the gmad (the last collimators of the beam line,
+  their apertures, thickness, pieces and bias, see gmadGeometry) and writes synthetic
+  sampler data (x, zp, partID) of a configurable number of photons, the photons
+  incident on the shielding survive each slab with probability exp(-mu*t),
+- 'rebdsim' evaluates the selections of the analysis config on this data and
+  'Data.Load' returns the histogram entries, the readers of reduction.py read the
+  synthetic data directly.
+
+bdsim and rebdsim are put on the PATH as executables and the pybdsim of the
+stand-in on the PYTHONPATH (loaded by a sitecustomize at the start of every python
+process), so the stand-in drives the worker processes of runStudy(workers=N), the
+jobs of a batch.batchExecutor and the subprocesses of a pipeline.stagePipeline in
+the same way. The output files carry the header of a
+ROOT file so pipeline.rootFileComplete() can check them. The study code itself is
+unchanged so the whole pipeline can be timed and tested on any machine.
+
+timeStudy() runs a study with the stand-in and times each stage (genGMAD, bdsim,
+rebdsim or count, load, _getNum, _getNumAper and statistics), timeKernels() times
+the region counting on 10^6 ... 10^8 synthetic photons. Both report the time,
+throughput (photons per second) and peak memory of every stage, main() appends them
+with the git commit to a json lines file so regressions can be followed across
+commits. checkStudy() runs the regression checks of the running of a study: the
+result is the same with workers, a batch executor or a stage pipeline as in serial,
+resuming from a cache or journal reruns nothing and the pooled statistics match the
+counts of the runs.
+
+Example:
+
+>>> stages = timeStudy("Dipole_half", photons=200000, nruns=5, rebdsim=False)
+>>> kernels = timeKernels([1e6, 1e7])
+>>> report(stages, kernels)
+>>> checks = checkStudy("quads", workers=4)
+
+or from the command line:
+
+    python -m LHeC_shieldingStudy.benchmark --photons 200000 --runs 5 --kernels 1e6 1e7 1e8 --output bench.jsonl
+    python -m LHeC_shieldingStudy.benchmark --check --workers 4
+"""
+
+import argparse as _argparse
+import collections as _collections
+import contextlib as _contextlib
+import datetime as _datetime
+import io as _io
+import json as _json
+import os as _os
+import re as _re
+import resource as _resource
+import shutil as _shutil
+import struct as _struct
+import subprocess as _subprocess
+import sys as _sys
+import tempfile as _tempfile
+import time as _time
+import tracemalloc as _tracemalloc
+import types as _types
+
+import numpy as _np
+
+from . import reduction as _reduction
+from . import regions as _regions
+
+# selection of the rebdsim config, e.g. DRIFT_1.zp>=0
+_TERM = _re.compile(r"^(\w+)\.(\w+)(==|!=|>=|<=|>|<)(.+)$")
+
+_OPS = {"==": _np.equal, "!=": _np.not_equal, ">=": _np.greater_equal,
+        "<=": _np.less_equal, ">": _np.greater, "<": _np.less}
+
+# environment variable of the directory of the running stand-in (config.json and the log of calls)
+STANDIN = "LHEC_STANDIN"
+
+# directory containing the package, added to the PYTHONPATH of the stand-in processes
+_PACKAGE_ROOT = _os.path.dirname(_os.path.dirname(_os.path.abspath(__file__)))
+
+# this module, also when it is run with python -m
+_MODULE = "{}.benchmark".format(__package__)
+
+# size of the ROOT like header of the stand-in files, see _writeFile
+_HEADER = 100
+
+
+def syntheticSamplers(regions, names, nphotons, thickness, seed=0, nevents=1, mu=60.0, weighted=False):
+    """
+    Synthetic data of the sampler in front of the shielding followed by the samplers after each
+    slab in 'names', as a dict of '<sampler>.<branch>' -> flat array. The photons hitting the
+    shielding (see regions.apertureRegions.shielded) are left after slab k of a shielding of
+    'thickness' with probability exp(-mu*t_k), all others go through.
+    """
+    rng    = _np.random.default_rng(seed)
+    x      = rng.uniform(regions.edges[0]-0.01, regions.edges[-1]+0.01, nphotons)
+    zp     = _np.where(rng.random(nphotons) < 0.98, 1.0, -1.0)
+    partID = _np.where(rng.random(nphotons) < 0.95, 22, 11).astype(_np.int32)
+    event  = _np.sort(rng.integers(0, nevents, nphotons)).astype(_np.int32)
+    region = _np.searchsorted(regions.edges, x, side='right')
+    hits   = _np.isin(region, [i for i, n in enumerate(regions.names) if n not in ("below", "eAper", "pAper", "outside")])
+    u      = rng.random(nphotons)
+
+    data = {}
+    for k, name in enumerate(names):
+        t    = thickness*k/(len(names)-1)
+        keep = (~hits) | (u < _np.exp(-mu*t)) if k > 0 else _np.ones(nphotons, dtype=bool)
+        for b, v in [("x", x), ("zp", zp), ("partID", partID), ("event", event)]:
+            data["{}.{}".format(name, b)] = v[keep]
+        if weighted:
+            data["{}.weight".format(name)] = _np.ones(int(keep.sum()))
+    return data
+# end syntheticSamplers (func)
+
+def _number(value):
+    # gmad numbers may carry a unit, e.g. 0.05*m
+    return float(_re.sub(r"\*\s*\w+$", "", value.strip()))
+# end _number (func)
+
+def _parseGmad(path, elements, lines):
+    if not _os.path.exists(path):
+        # e.g. the material definitions which are copied next to the gmad by hand
+        return
+    with open(path) as f:
+        text = _re.sub(r"!.*", "", f.read())
+    for statement in text.split(";"):
+        statement = statement.strip()
+        include   = _re.match(r'^include\s+"?([^"\s]+)"?$', statement)
+        line      = _re.match(r'^(\w+)\s*:\s*line\s*=\s*\((.*)\)$', statement, _re.S)
+        element   = _re.match(r'^(\w+)\s*:\s*(\w+)\s*(?:,(.*))?$', statement, _re.S)
+        if include:
+            _parseGmad(_os.path.join(_os.path.dirname(path), include.group(1)), elements, lines)
+        elif line:
+            lines.append([n.strip() for n in line.group(2).split(",") if n.strip()])
+        elif element:
+            params = {k: v.strip().strip('"') for k, v in _re.findall(r'(\w+)\s*=\s*("[^"]*"|[^,]+)', element.group(3) or "")}
+            elements[element.group(1)] = (element.group(2), params)
+# end _parseGmad (func)
+
+def gmadGeometry(gmadFile):
+    """
+    Shielding of the lattice of a main gmad file (and the files it includes): the collimators
+    at the end of the beam line are the slabs of the shielding and the element in front of them
+    the sampler before it. Return a dict with the 'regions' (regions.apertureRegions), the
+    'samplers' (before and after each slab), the 'thickness' and whether it is 'weighted'
+    (biased, see biasing.py).
+    """
+    elements, lines = {}, []
+    _parseGmad(gmadFile, elements, lines)
+    if not lines:
+        raise ValueError("No beam line in {}".format(gmadFile))
+    sequence = lines[-1]
+
+    slabs = []
+    for name in reversed(sequence):
+        if elements.get(name, (None,))[0] != "rcol":
+            break
+        slabs.insert(0, name)
+    if not slabs or len(slabs) == len(sequence):
+        raise ValueError("No shielding at the end of the beam line of {}".format(gmadFile))
+
+    last   = elements[slabs[-1]][1]
+    width  = _number(last["horizontalWidth"])
+    sep    = _number(last["offsetX"])
+    pieces = 1+sum(1 for kind, params in elements.values()
+                   if kind == "placement" and params.get("referenceElement") == slabs[-1])
+    return {"regions"  : _regions.apertureRegions(sep-(width/2), _number(last["xsize"]), sep, pieces=pieces),
+            "samplers" : [sequence[-len(slabs)-1]]+slabs,
+            "thickness": sum(_number(elements[s][1]["l"]) for s in slabs),
+            "weighted" : "biasMaterial" in last}
+# end gmadGeometry (func)
+
+def _config():
+    directory = _os.environ.get(STANDIN)
+    config    = {"photons": 100000, "mu": 60.0}
+    if directory:
+        with open(_os.path.join(directory, "config.json")) as f:
+            config.update(_json.load(f))
+    return config
+# end _config (func)
+
+def _logCall(stage, output):
+    directory = _os.environ.get(STANDIN)
+    if directory:
+        with open(_os.path.join(directory, "calls"), "a") as f:
+            f.write("{} {}\n".format(stage, output))
+# end _logCall (func)
+
+def _writeFile(path, payload):
+    # the header of a ROOT file (magic, version, begin, end) so that the file can be checked with
+    # pipeline.rootFileComplete, followed by the payload
+    header = b"root"+_struct.pack(">iii", 62400, _HEADER, _HEADER+len(payload))
+    with open(path, "wb") as f:
+        f.write(header.ljust(_HEADER, b"\0"))
+        f.write(payload)
+# end _writeFile (func)
+
+def _readFile(path):
+    with open(path, "rb") as f:
+        f.seek(_HEADER)
+        return f.read()
+# end _readFile (func)
+
+def _loadData(filename):
+    return _np.load(_io.BytesIO(_readFile(filename)))
+# end _loadData (func)
+
+def bdsim(gmadFile, outfile, ngenerate=1, seed=0):
+    """
+    Stand-in of a bdsim run: write the synthetic samplers of the shielding of gmadFile for seed
+    to outfile.root, with the number of photons and mu of the running standIn.
+    """
+    config = _config()
+    shield = gmadGeometry(gmadFile)
+    data   = syntheticSamplers(shield["regions"], shield["samplers"], int(config["photons"]), shield["thickness"],
+                               seed=seed, nevents=ngenerate, mu=config["mu"], weighted=shield["weighted"])
+    buf = _io.BytesIO()
+    _np.savez(buf, nevents=ngenerate, **data)
+    _writeFile("{}.root".format(outfile), buf.getvalue())
+    _logCall("bdsim", "{}.root".format(outfile))
+# end bdsim (func)
+
+def _select(data, selection):
+    mask = True
+    for term in filter(None, _re.split("&+", selection)):
+        m = _TERM.match(term.strip())
+        if m is None:
+            raise ValueError("Selection '{}' is not supported by the stand-in".format(term))
+        s, b, op, v = m.groups()
+        mask = mask & _OPS[op](data["{}.{}".format(s, b)], float(v))
+    return mask
+# end _select (func)
+
+def rebdsim(config, infile, outfile):
+    """
+    Stand-in of rebdsim: write the number of entries of each SimpleHistogram1D of the analysis
+    config filled from the synthetic samplers of infile to outfile.
+    """
+    entries = {}
+    with _loadData(infile) as data, open(config) as f:
+        for line in f:
+            words = line.split()
+            if len(words) < 6 or not words[0].startswith("SimpleHistogram1D"):
+                continue
+            name, var = words[2], words[5]
+            n = len(data[var])
+            if len(words) > 6:
+                n = int(_np.count_nonzero(_np.broadcast_to(_select(data, words[6]), (n,))))
+            entries[name] = n
+    _writeFile(outfile, _json.dumps(entries).encode())
+    _logCall("rebdsim", outfile)
+# end rebdsim (func)
+
+def bdsimMain(argv):
+    """
+    Command line of the bdsim executable of the stand-in (--file, --outfile, --ngenerate, --seed).
+    """
+    parser = _argparse.ArgumentParser(prog="bdsim")
+    parser.add_argument("--file", required=True)
+    parser.add_argument("--outfile", required=True)
+    parser.add_argument("--ngenerate", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", action="store_true")
+    args, _ = parser.parse_known_args(argv)
+    bdsim(args.file, args.outfile, ngenerate=args.ngenerate, seed=args.seed)
+    return 0
+# end bdsimMain (func)
+
+def rebdsimMain(argv):
+    """
+    Command line of the rebdsim executable of the stand-in (config, input and output file).
+    """
+    if len(argv) < 3:
+        _sys.stderr.write("usage: rebdsim config infile outfile\n")
+        return 1
+    rebdsim(*argv[:3])
+    return 0
+# end rebdsimMain (func)
+
+class _histogram:
+    def __init__(self, entries):
+        self.entries = entries
+    # end __init__ (func)
+# end _histogram (class)
+
+class _histograms:
+    def __init__(self, entries):
+        self.histogramspy = {"Event/SimpleHistograms/{}".format(k): _histogram(v) for k, v in entries.items()}
+    # end __init__ (func)
+# end _histograms (class)
+
+def _load(filename):
+    return _histograms(_json.loads(_readFile(filename).decode()))
+# end _load (func)
+
+def _readSamplers(filename, samplers, branches=("x", "zp", "partID"), start=None, stop=None):
+    out = {}
+    with _loadData(filename) as data:
+        for s in samplers:
+            event = data["{}.event".format(s)]
+            lo    = 0 if start is None else _np.searchsorted(event, start)
+            hi    = len(event) if stop is None else _np.searchsorted(event, stop)
+            out[s] = _regions.samplerColumns(s, {b: data["{}.{}".format(s, b)][lo:hi] for b in branches})
+    return out
+# end _readSamplers (func)
+
+def _numEvents(filename):
+    with _loadData(filename) as data:
+        return int(data["nevents"])
+# end _numEvents (func)
+
+def _iterChunks(filename, samplers, branches=("x", "zp", "partID"), chunkSize=1000):
+    for start in range(0, _numEvents(filename), chunkSize):
+        yield _readSamplers(filename, samplers, branches, start, start+chunkSize)
+# end _iterChunks (func)
+
+def _gmadValue(value):
+    if isinstance(value, str):
+        return value if value.startswith('"') else '"{}"'.format(value)
+    return repr(value)
+# end _gmadValue (func)
+
+def _gmadParameters(params):
+    return "".join(", {}={}".format(k, _gmadValue(v)) for k, v in params.items())
+# end _gmadParameters (func)
+
+class _machine:
+    """
+    Builder.Machine of the pybdsim of the stand-in, writes the lattice as one gmad file.
+    """
+
+    def __init__(self):
+        self.includes   = []
+        self.elements   = []        # (name, type, parameters in beam order)
+        self.placements = []        # (name, parameters)
+        self.samplers   = []
+        self.beam       = {}
+        self.options    = {}
+    # end __init__ (func)
+
+    def AddIncludePre(self, filename):
+        self.includes.append(filename)
+    # end AddIncludePre (func)
+
+    def AddDrift(self, name, length, **kwargs):
+        self.elements.append((name, "drift", dict(l=length, **kwargs)))
+    # end AddDrift (func)
+
+    def AddDipole(self, name, category="sbend", length=0.1, angle=0.0, **kwargs):
+        self.elements.append((name, category, dict(l=length, angle=angle, **kwargs)))
+    # end AddDipole (func)
+
+    def AddRCol(self, name, length, **kwargs):
+        self.elements.append((name, "rcol", dict(l=length, **kwargs)))
+    # end AddRCol (func)
+
+    def AddPlacement(self, name, **kwargs):
+        self.placements.append((name, kwargs))
+    # end AddPlacement (func)
+
+    def AddSampler(self, *names):
+        self.samplers += names
+    # end AddSampler (func)
+
+    def AddBeam(self, beam):
+        self.beam = beam
+    # end AddBeam (func)
+
+    def AddOptions(self, options):
+        self.options = options
+    # end AddOptions (func)
+
+    def Write(self, filename):
+        lines  = ["include {};".format(f) for f in self.includes]
+        lines += ["{}: {}{};".format(name, kind, _gmadParameters(p)) for name, kind, p in self.elements]
+        lines += ["{}: placement{};".format(name, _gmadParameters(p)) for name, p in self.placements]
+        lines += ["lattice: line=({});".format(", ".join(name for name, _, _ in self.elements)),
+                  "use, period=lattice;"]
+        lines += ["sample, {};".format(name) for name in self.samplers]
+        lines += ["beam{};".format(_gmadParameters(self.beam)),
+                  "option{};".format(_gmadParameters(self.options))]
+        with open("{}.gmad".format(filename), "w") as f:
+            f.write("\n".join(lines)+"\n")
+    # end Write (func)
+
+# end _machine (class)
+
+def _runBdsim(gmadFile, outfile, ngenerate=1, options="", **kwargs):
+    seed = _re.search(r"--seed=(\d+)", options)
+    bdsim(gmadFile, outfile, ngenerate=ngenerate, seed=int(seed.group(1)) if seed else 0)
+# end _runBdsim (func)
+
+def fakePybdsim(saved=None):
+    """
+    Module standing in for pybdsim (Builder.Machine, Beam.Beam, Options.Options, Run.Bdsim,
+    Run.Rebdsim, Data.Load and Data.LoadROOTLibraries) on the stand-in files. The readers of
+    reduction.py are replaced by ones of the stand-in files, their originals are appended to
+    'saved' as (object, name, value).
+    """
+    module = _types.ModuleType("pybdsim", "pybdsim of the bdsim stand-in, see {}".format(_MODULE))
+    module.Builder = _types.SimpleNamespace(Machine=_machine)
+    module.Beam    = _types.SimpleNamespace(Beam=dict)
+    module.Options = _types.SimpleNamespace(Options=dict)
+    module.Run     = _types.SimpleNamespace(Bdsim=_runBdsim, Rebdsim=rebdsim)
+    module.Data    = _types.SimpleNamespace(Load=_load, LoadROOTLibraries=lambda: None)
+
+    for name, value in [("readSamplers", _readSamplers), ("numEvents", _numEvents), ("iterChunks", _iterChunks)]:
+        if saved is not None:
+            saved.append((_reduction, name, getattr(_reduction, name)))
+        setattr(_reduction, name, value)
+    return module
+# end fakePybdsim (func)
+
+# files of the stand-in written by standIn to its directory
+_PYBDSIM = """import sys
+from {module} import fakePybdsim
+sys.modules[__name__] = fakePybdsim()
+"""
+
+# the ROOT readers of reduction.py are replaced as soon as a python process starts
+_SITECUSTOMIZE = """import pybdsim
+"""
+
+_EXECUTABLE = """#!{python}
+import sys
+from {module} import {main}
+sys.exit({main}(sys.argv[1:]))
+"""
+
+class standIn:
+    """
+    Context manager running bdsim, rebdsim and pybdsim on synthetic data of 'photons' photons
+    per run, in this process and in every process started inside it (see the module doc). The
+    time, number of calls and peak memory (with 'memory') of each stage run in this process are
+    collected in 'stages', bdsim and rebdsim from the monitor events of a study whose monitor
+    is event(). calls() lists the bdsim and rebdsim runs of every process.
+    """
+
+    def __init__(self, photons=100000, mu=60.0, memory=True):
+        self.photons   = int(photons)
+        self.mu        = mu
+        self.memory    = memory
+        self.stages    = _collections.OrderedDict()
+        self.directory = None       # (pybdsim, executables and log of the stand-in)
+        self._saved    = []
+    # end __init__ (func)
+
+    def time(self, stage, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs) and add its time and peak memory to 'stage'.
+        """
+        s = self.stages.setdefault(stage, {"time": 0.0, "calls": 0, "peak": 0, "photons": 0})
+        if self.memory:
+            _tracemalloc.reset_peak()
+            start = _tracemalloc.get_traced_memory()[0]
+        t0 = _time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            s["time"]  += _time.perf_counter()-t0
+            s["calls"] += 1
+            if self.memory:
+                s["peak"] = max(s["peak"], _tracemalloc.get_traced_memory()[1]-start)
+    # end time (func)
+
+    def _timed(self, stage, func, photons=None):
+        def wrapper(*args, **kwargs):
+            self.stages.setdefault(stage, {"time": 0.0, "calls": 0, "peak": 0, "photons": 0})["photons"] += photons or self.photons
+            return self.time(stage, func, *args, **kwargs)
+        return wrapper
+    # end _timed (func)
+
+    def event(self, event):
+        """
+        Monitor of a study (see monitor.py) adding the wall time and the peak memory of the
+        process of its bdsim and rebdsim stages to 'stages'.
+        """
+        if event["stage"] not in ("bdsim", "rebdsim"):
+            return
+        s = self.stages.setdefault(event["stage"], {"time": 0.0, "calls": 0, "peak": 0, "photons": 0})
+        s["time"]    += event["wall"]
+        s["calls"]   += 1
+        s["photons"] += self.photons
+        s["peak"]     = max(s["peak"], (event["childMaxRSS"] or 0)*1024)
+    # end event (func)
+
+    def calls(self):
+        """
+        List of (stage, output file) of every bdsim and rebdsim run of the stand-in so far.
+        """
+        path = _os.path.join(self.directory, "calls")
+        if not _os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [tuple(line.split(" ", 1)) for line in f.read().splitlines()]
+    # end calls (func)
+
+    def _write(self, path, text, mode=0o644):
+        with open(path, "w") as f:
+            f.write(text)
+        _os.chmod(path, mode)
+    # end _write (func)
+
+    def _setenv(self, name, value):
+        self._saved.append((_os.environ, name, _os.environ.get(name)))
+        _os.environ[name] = value
+    # end _setenv (func)
+
+    def __enter__(self):
+        self.directory = _tempfile.mkdtemp(prefix="standIn-")
+        _os.makedirs(_os.path.join(self.directory, "pybdsim"))
+        _os.makedirs(_os.path.join(self.directory, "bin"))
+        with open(_os.path.join(self.directory, "config.json"), "w") as f:
+            _json.dump({"photons": self.photons, "mu": self.mu}, f)
+        self._write(_os.path.join(self.directory, "pybdsim", "__init__.py"), _PYBDSIM.format(module=_MODULE))
+        self._write(_os.path.join(self.directory, "sitecustomize.py"), _SITECUSTOMIZE)
+        for name, main in [("bdsim", "bdsimMain"), ("rebdsim", "rebdsimMain")]:
+            self._write(_os.path.join(self.directory, "bin", name),
+                        _EXECUTABLE.format(python=_sys.executable, module=_MODULE, main=main), 0o755)
+
+        # the processes started by the study find the stand-in first
+        self._setenv(STANDIN, self.directory)
+        self._setenv("PATH", _os.pathsep.join([_os.path.join(self.directory, "bin"), _os.environ.get("PATH", "")]))
+        self._setenv("PYTHONPATH", _os.pathsep.join([self.directory, _PACKAGE_ROOT]+
+                                                    ([_os.environ["PYTHONPATH"]] if _os.environ.get("PYTHONPATH") else [])))
+        self._saved.append((_sys.modules, "pybdsim", _sys.modules.get("pybdsim")))
+        module = _sys.modules["pybdsim"] = fakePybdsim(self._saved)
+
+        patches = [(module.Data, "Load", self._timed("load", module.Data.Load)),
+                   (_reduction, "readSamplers", self._timed("load", _reduction.readSamplers)),
+                   (_reduction, "countSamplers", self._timed("count", _reduction.countSamplers))]
+        for obj, name, value in patches:
+            self._saved.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+        if self.memory and not _tracemalloc.is_tracing():
+            _tracemalloc.start()
+            self._saved.append((None, "tracemalloc", None))
+        return self
+    # end __enter__ (func)
+
+    def __exit__(self, *exc):
+        for obj, name, value in reversed(self._saved):
+            if obj is None:
+                _tracemalloc.stop()
+            elif isinstance(obj, dict) or obj is _os.environ:
+                if value is None:
+                    obj.pop(name, None)
+                else:
+                    obj[name] = value
+            else:
+                setattr(obj, name, value)
+        self._saved = []
+        _shutil.rmtree(self.directory, ignore_errors=True)
+        return False
+    # end __exit__ (func)
+
+# end standIn (class)
+
+@_contextlib.contextmanager
+def _inDirectory(path):
+    cwd = _os.getcwd()
+    _os.chdir(path)
+    try:
+        yield path
+    finally:
+        _os.chdir(cwd)
+# end _inDirectory (func)
+
+def _newStudy(ir, material, thickness, nruns, ngenerate=1000, **attrs):
+    from .campaign import getModule
+    s = getModule(ir).shieldingStudy(material, ngenerate, nruns, thickness, ir, workspace=True)
+    for name, value in attrs.items():
+        setattr(s, name, value)
+    _os.makedirs("GMAD", exist_ok=True)
+    _os.makedirs(s._dataDir(), exist_ok=True)
+    return s
+# end _newStudy (func)
+
+def timeStudy(ir="Dipole_half", material="Pb", thickness=0.05, photons=100000, nruns=5, ngenerate=1000,
+              rebdsim=True, slabs=1, mu=60.0, memory=True):
+    """
+    Run a study of the IR variant 'ir' (see campaign.IRS) with the stand-in in a temporary
+    directory and return a dict of stage -> {"time", "calls", "peak", "photons", "throughput"}.
+    """
+    with _tempfile.TemporaryDirectory() as d, _inDirectory(d):
+        with standIn(photons=photons, mu=mu, memory=memory) as sim:
+            s = _newStudy(ir, material, thickness, nruns, ngenerate, slabs=slabs, _rebdsim=rebdsim, monitor=sim.event, keep=True)
+            sim.time("genGMAD", s.genGMAD)
+            sim.time("genGMAD", s._prepareRuns)
+            runs = [s._runSeed(i) for i in range(nruns)]
+            sim.time("statistics", s._finishStudy, runs)
+
+            data = _readSamplers(sim.calls()[0][1], [s._samplerNames[0], s._samplerNames[1]])
+            for name in s._samplerNames:
+                sim._timed("getNum", s._getNum, len(data[name].data["x"]))(data[name])
+            sim._timed("getNumAper", s._getNumAper, len(data[s._samplerNames[0]].data["x"]))(data[s._samplerNames[0]])
+
+        stages = sim.stages
+    for v in stages.values():
+        v["throughput"] = v["photons"]/v["time"] if v["photons"] and v["time"] > 0 else None
+    return dict(stages)
+# end timeStudy (func)
+
+def _same(a, b):
+    return all(_np.array_equal(_np.asarray(x), _np.asarray(y)) for x, y in zip(a, b))
+# end _same (func)
+
+def checkStudy(ir="Dipole_half", material="Pb", thickness=0.05, photons=20000, nruns=4, workers=2, mu=60.0):
+    """
+    Regression checks of running a study of the IR variant 'ir' with the stand-in, return a dict
+    of check -> whether it passed:
+
+    workers     runStudy(workers=workers) gives the same result as a serial run
+    batch       so does a batch.batchExecutor of a localScheduler with 'workers' slots
+    pipeline    and a pipeline.stagePipeline with 'workers' simulations at once
+    cache       running again with the same cache.resultCache reruns nothing, same result
+    journal     running again with checkpoint reruns nothing, same result
+    pooled      the pooled fraction absorbed and the mean total match the counts in the journal
+    reduction   counting in process (rebdsim=False) gives the same counts of every run as rebdsim
+    cleanup     no bdsim or rebdsim output is left behind unless the study has keep set
+    campaign    a campaign of two thicknesses gives the same rows with workers and with a
+                pipeline as in serial
+    """
+    from . import batch as _batch
+    from . import campaign as _campaign
+    from . import cache as _cache
+    from . import journal as _journal
+    from . import pipeline as _pipeline
+
+    checks = _collections.OrderedDict()
+    with _tempfile.TemporaryDirectory() as d, _inDirectory(d), standIn(photons=photons, mu=mu, memory=False) as sim:
+        def study(**attrs):
+            s = _newStudy(ir, material, thickness, nruns, **attrs)
+            s.genGMAD()
+            return s
+
+        serial = study().runStudy()
+        outputs = lambda: sorted(set(c[1] for c in sim.calls() if _os.path.exists(c[1])))
+        kept    = study(keep=True)
+        kept.runStudy()
+        checks["cleanup"] = len(outputs()) == 2*nruns
+        for path in outputs():
+            _os.remove(path)
+        checks["workers"] = _same(study().runStudy(workers=workers), serial)
+        with _batch.batchExecutor(_batch.localScheduler(workers), directory="batch", poll=0.2) as executor:
+            checks["batch"] = _same(study().runStudy(executor=executor), serial)
+        checks["pipeline"] = _same(study().runStudy(workers=workers, pipeline=_pipeline.stagePipeline()), serial)
+
+        cache = _cache.resultCache("cache")
+        study().runStudy(cache=cache)
+        n = len(sim.calls())
+        checks["cache"] = _same(study().runStudy(cache=cache), serial) and len(sim.calls()) == n
+
+        s = study()
+        s.runStudy(checkpoint=True)
+        n = len(sim.calls())
+        checks["journal"] = _same(study().runStudy(checkpoint=True), serial) and len(sim.calls()) == n
+
+        s = study(pooled=True)
+        value, err, val_range = s.runStudy(checkpoint=True)
+        runs = list(_journal.studyJournal(s).load().values())
+        checks["pooled"] = (len(runs) == nruns and
+                            _np.isclose(value, 1-(sum(r[5] for r in runs)/sum(r[4] for r in runs))) and
+                            _np.isclose(s.getTotalPhotons()[0], sum(r[0] for r in runs)/nruns) and
+                            len(sim.calls()) == n)
+
+        counts = []
+        for rebdsim in (True, False):
+            s = study()
+            s.runStudy(checkpoint=True, rebdsim=rebdsim)
+            counts.append(_journal.studyJournal(s).load())
+        checks["reduction"] = (sorted(counts[0]) == sorted(counts[1]) and
+                               all(_same(counts[0][i], counts[1][i]) for i in counts[0]))
+        checks["cleanup"] = checks["cleanup"] and not outputs()
+
+        spec = {"ir": ir, "materials": [material], "thicknesses": [thickness, 2*thickness], "ngenerate": 1000,
+                "nruns": nruns, "runKey": "check-{}".format(ir), "workspaces": "campaign"}
+        rows  = _campaign.campaign(spec).run(workers=1, write=False)
+        pool  = _campaign.campaign(spec).run(workers=workers, write=False)
+        piped = _campaign.campaign(dict(spec, pipeline={})).run(workers=workers, write=False)
+        checks["campaign"] = all(_same(pool[p], r) and _same(piped[p], r) for p, r in rows.items())
+    return dict(checks)
+# end checkStudy (func)
+
+def timeKernels(sizes=(1e6, 1e7), repeat=3, memory=True):
+    """
+    Time the region counting (regions.apertureRegions.count) of two samplers and its weighted
+    version on synthetic samplers of each size (number of photons). Return a dict of
+    '<kernel>-<size>' -> {"time" (best of 'repeat'), "peak", "photons", "throughput"}.
+    """
+    r   = _regions.apertureRegions(eAperture=0.005, pAperture=0.02, sep=0.121896, pieces=2)
+    out = _collections.OrderedDict()
+    for n in sizes:
+        n    = int(n)
+        data = syntheticSamplers(r, ["DRIFT_1", "COL_0"], n, 0.05, weighted=True)
+        samplers = [_regions.samplerColumns(s, {b: data["{}.{}".format(s, b)] for b in ("x", "zp", "partID", "weight")})
+                    for s in ["DRIFT_1", "COL_0"]]
+        del data
+        photons = sum(len(s.data["x"]) for s in samplers)
+        for kernel, kwargs in [("count", {}), ("countWeighted", {"weighted": True})]:
+            best, peak = None, 0
+            started = memory and not _tracemalloc.is_tracing()
+            if started:
+                _tracemalloc.start()
+            for _ in range(repeat):
+                if memory:
+                    _tracemalloc.reset_peak()
+                    start = _tracemalloc.get_traced_memory()[0]
+                t0 = _time.perf_counter()
+                r.count(*samplers, **kwargs)
+                t  = _time.perf_counter()-t0
+                best = t if best is None else min(best, t)
+                if memory:
+                    peak = max(peak, _tracemalloc.get_traced_memory()[1]-start)
+            if started:
+                _tracemalloc.stop()
+            out["{}-{:.0e}".format(kernel, n)] = {"time": best, "calls": repeat, "peak": peak, "photons": photons,
+                                                 "throughput": photons/best if best > 0 else None}
+    return dict(out)
+# end timeKernels (func)
+
+def _commit():
+    try:
+        return _subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=_os.path.dirname(_os.path.abspath(__file__)),
+                                        stderr=_subprocess.DEVNULL).decode().strip()
+    except (OSError, _subprocess.CalledProcessError):
+        return None
+# end _commit (func)
+
+def report(*results):
+    """
+    Print each dict of stage -> timing as a table.
+    """
+    print("{:<22} {:>6} {:>12} {:>14} {:>12}".format("stage", "calls", "time [s]", "photons/s", "peak [MB]"))
+    for result in results:
+        for name, v in result.items():
+            rate = "-" if v.get("throughput") is None else "{:.3e}".format(v["throughput"])
+            print("{:<22} {:>6} {:>12.4f} {:>14} {:>12.1f}".format(name, v["calls"], v["time"], rate, v["peak"]/1e6))
+# end report (func)
+
+def main(argv=None):
+    parser = _argparse.ArgumentParser(prog="python -m LHeC_shieldingStudy.benchmark",
+                                      description="Benchmark the stages of a shielding study with a bdsim stand-in.")
+    parser.add_argument("--ir", default="Dipole_half", help="IR variant of the study")
+    parser.add_argument("--material", default="Pb")
+    parser.add_argument("--thickness", type=float, default=0.05, help="metre")
+    parser.add_argument("--photons", type=float, default=1e5, help="photons at the sampler in front of the shielding per run")
+    parser.add_argument("--runs", type=int, default=5, help="num runs of the study")
+    parser.add_argument("--slabs", type=int, default=1)
+    parser.add_argument("--no-rebdsim", dest="rebdsim", action="store_false", help="reduce the runs in process")
+    parser.add_argument("--kernels", type=float, nargs="*", default=[1e6, 1e7], help="num photons of the kernel benchmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="do not trace the peak memory")
+    parser.add_argument("--output", default=None, help="json lines file the results are appended to")
+    parser.add_argument("--check", action="store_true", help="run the regression checks (see checkStudy) of every IR instead")
+    parser.add_argument("--workers", type=int, default=2, help="num workers of the regression checks")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        from .campaign import IRS
+        failed = 0
+        for ir in IRS:
+            checks = checkStudy(ir, args.material, args.thickness, photons=args.photons, nruns=args.runs, workers=args.workers)
+            for name, passed in checks.items():
+                print("{:<12} {:<10} {}".format(ir, name, "ok" if passed else "FAILED"))
+                failed += not passed
+        return 1 if failed else 0
+
+    stages  = timeStudy(args.ir, args.material, args.thickness, photons=args.photons, nruns=args.runs,
+                        rebdsim=args.rebdsim, slabs=args.slabs, memory=args.memory)
+    kernels = timeKernels(args.kernels, repeat=args.repeat, memory=args.memory)
+    report(stages, kernels)
+    print("max resident memory: {:.1f} MB".format(_resource.getrusage(_resource.RUSAGE_SELF).ru_maxrss/1e3))
+
+    if args.output is not None:
+        with open(args.output, "a") as f:
+            f.write(_json.dumps({"commit"   : _commit(),
+                                 "date"     : _datetime.datetime.now().isoformat(),
+                                 "args"     : vars(args),
+                                 "stages"   : stages,
+                                 "kernels"  : kernels,
+                                 "maxrss_kB": _resource.getrusage(_resource.RUSAGE_SELF).ru_maxrss})+"\n")
+    return 0
+# end main (func)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,56 @@
+"""
+Cross-section biasing of the photons in the shielding for deep penetration studies.
+
+At the thicknesses of interest (99.9% absorbed and more) only a handful of
+photons reach the sampler after the shielding in each run, so the fraction
+absorbed is dominated by the Poisson noise of these few photons. With
+study.bias = f (0 < f < 1) the cross-sections of the photon processes in the
+shielding material are multiplied by f through a bdsim xsecBias object, so many
+more photons get through. Geant4 gives every biased particle a weight which
+undoes the bias, the counts after the shielding are then sums of the sampler
+'weight' branch instead of numbers of photons, which keeps the fraction absorbed
+unbiased while its error for the same number of primaries is much smaller.
+
+The histograms of rebdsim only count entries, a biased study is therefore always
+reduced in this process (see reduction.py).
+
+Example:
+
+>>> s = shieldingStudy("Pb", 1000, 10, 0.1, "run2b")
+>>> s.bias = 0.2
+>>> s.genGMAD()
+>>> value, err, val_range = s.runStudy()
+"""
+
+# name of the bias object in the extra gmad file
+NAME = "shieldingBias"
+
+# Geant4 processes of photons
+PROCESSES = ("phot", "compt", "conv")
+
+# particles an xsecBias applies to: 1 all, 2 only primaries, 3 only secondaries. The photons
+# reaching the shielding are secondaries of the electron beam but primaries when they are
+# replayed from a phaseSpace.photonBank, so all of them are biased.
+FLAG = 1
+
+
+def biasName(bias):
+    """
+    Name of the bias object to attach to the shielding material, None if not biased.
+    """
+    return None if bias is None else NAME
+# end biasName (func)
+
+def definitions(bias, processes=PROCESSES):
+    """
+    Return the gmad definition of the bias object for a cross-section factor 'bias' as a list of
+    lines (empty if bias is None). The factor applies to all photons in the material, primaries
+    and secondaries (flag 1, see FLAG).
+    """
+    if bias is None:
+        return []
+    if not 0 < bias:
+        raise ValueError("The bias factor must be positive, not {}".format(bias))
+    return ['{}: xsecBias, particle="gamma", proc="{}", xsecfact={{{}}}, flag={{{}}};'.format(
+            NAME, " ".join(processes), ",".join([str(bias)]*len(processes)), ",".join([str(FLAG)]*len(processes)))]
+# end definitions (func)
@@ -0,0 +1,186 @@
+"""
+Local cache of the photon counts of each simulated run.
+
+genGMAD() writes the lattice, beam and options deterministically and the seed of
+run i is always (i*42)+23, so a run with identical gmad files, seed, ngenerate
+and analysis cuts gives identical counts. The key of each run is a hash of all
+of these, the gmad files are followed through their 'include' statements so the
+extra*.gmad and material_Concretes.gmad files are part of the key. Only the
+content counts, not the file names, and comment lines ('!') are ignored as
+pybdsim writes the date in the header of every file.
+
+Entries are small json files in the cache directory, when the cache grows beyond
+'maxSize' (bytes) or 'maxEntries' the least recently used entries are removed.
+
+Example:
+
+>>> c = resultCache("cache", maxSize=100e6)
+>>> value, err, val_range = s.runStudy(cache=c)
+"""
+
+import hashlib as _hashlib
+import json as _json
+import os as _os
+import re as _re
+import tempfile as _tempfile
+
+_INCLUDE = _re.compile(r'^\s*include\s+([^;\s]+)\s*;', _re.MULTILINE)
+
+
+def _fileHash(path, seen=()):
+    """
+    Return the sha256 of a gmad file where each include statement is replaced by the hash of the
+    included file, so the hash depends on the content of the files and not on their names.
+    """
+    path = _os.path.normpath(path)
+    if path in seen or not _os.path.exists(path):
+        return _hashlib.sha256(b"<missing>").hexdigest()
+
+    with open(path) as f:
+        text = f.read()
+    # drop the comments, pybdsim writes the date in the header
+    text = "\n".join(l for l in text.splitlines() if not l.lstrip().startswith("!"))
+
+    include = lambda m: "include {};".format(_fileHash(_os.path.join(_os.path.dirname(path), m.group(1).strip('"')), seen+(path,)))
+    text    = _INCLUDE.sub(include, text)
+    return _hashlib.sha256(text.encode()).hexdigest()
+# end _fileHash (func)
+
+def gmadHash(gmadFile):
+    """
+    Return the sha256 of a main gmad file including all the files it includes.
+    """
+    return _fileHash(gmadFile)
+# end gmadHash (func)
+
+def _keyHash(study, rebdsimConfig, **extra):
+    if rebdsimConfig is None:
+        rebdsimConfig = study._rebdsimConfig()
+    h = _hashlib.sha256()
+    h.update(gmadHash(study._gmadFile()).encode())
+    # key on the reduction which is actually used, slabs and weights are always counted in process
+    inProcess = getattr(study, "_reduceInProcess", lambda: not getattr(study, "_rebdsim", True))
+    rebdsim   = not inProcess()
+    if rebdsim and _os.path.exists(rebdsimConfig):
+        with open(rebdsimConfig, "rb") as f:
+            h.update(f.read())
+    bank = getattr(study, "bank", None)
+    if bank is not None:
+        h.update(bank.key().encode())
+    h.update(_json.dumps(dict(extra,
+                              rebdsim   = rebdsim,
+                              ngenerate = study._ngenerate,
+                              eAperture = study.eAperture,
+                              pAperture = study.pAperture,
+                              sep       = study.sep), sort_keys=True).encode())
+    return h.hexdigest()
+# end _keyHash (func)
+
+def runKey(study, i, rebdsimConfig=None):
+    """
+    Return the cache key of run i of a shieldingStudy, 'rebdsimConfig' defaults to the
+    analysis config of the study.
+    """
+    return _keyHash(study, rebdsimConfig, seed=(i*42)+23)
+# end runKey (func)
+
+def configKey(study, rebdsimConfig=None):
+    """
+    Return the hash of everything which determines the runs of a study apart from the seed.
+    """
+    return _keyHash(study, rebdsimConfig)
+# end configKey (func)
+
+class resultCache:
+    """
+    Directory of cached run results, one json file per key.
+    """
+
+    def __init__(self, path="cache", maxSize=None, maxEntries=None):
+        self.path       = path
+        self.maxSize    = maxSize       # bytes
+        self.maxEntries = maxEntries
+        _os.makedirs(path, exist_ok=True)
+    # end __init__ (func)
+
+    def _file(self, key):
+        return _os.path.join(self.path, "{}.json".format(key))
+    # end _file (func)
+
+    def get(self, key):
+        """
+        Return the cached counts for key or None if not cached.
+        """
+        f = self._file(key)
+        try:
+            with open(f) as fh:
+                counts = _json.load(fh)
+        except (OSError, ValueError):
+            return None
+        # mark as recently used
+        try:
+            _os.utime(f)
+        except OSError:
+            pass
+        return counts
+    # end get (func)
+
+    def put(self, key, counts):
+        """
+        Store the counts of a run, written atomically so workers can share the cache.
+        """
+        fd, tmp = _tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with _os.fdopen(fd, "w") as fh:
+            _json.dump([float(c) for c in counts], fh)
+        _os.replace(tmp, self._file(key))
+        self.evict()
+    # end put (func)
+
+    def entries(self):
+        """
+        Return a list of (last used, size, file) of all entries, least recently used first.
+        """
+        out = []
+        for name in _os.listdir(self.path):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = _os.stat(_os.path.join(self.path, name))
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, _os.path.join(self.path, name)))
+        return sorted(out)
+    # end entries (func)
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is within its limits.
+        """
+        if self.maxSize is None and self.maxEntries is None:
+            return
+        entries = self.entries()
+        size    = sum(e[1] for e in entries)
+        while entries and ((self.maxSize is not None and size > self.maxSize)
+                           or (self.maxEntries is not None and len(entries) > self.maxEntries)):
+            _, s, f = entries.pop(0)
+            try:
+                _os.remove(f)
+            except OSError:
+                pass
+            size -= s
+    # end evict (func)
+
+    def run(self, study, i):
+        """
+        Return the counts of run i of study, from the cache if available otherwise the run is
+        simulated and stored.
+        """
+        key    = runKey(study, i)
+        counts = self.get(key)
+        if counts is None:
+            counts = study._runSeed(i)
+            self.put(key, counts)
+        return counts
+    # end run (func)
+
+# end resultCache (class)
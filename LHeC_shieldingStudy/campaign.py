@@ -0,0 +1,356 @@
+"""
+Run a campaign of shielding studies, i.e. a scan over materials and thicknesses
+for one IR, as a single queue of jobs on a shared pool of workers.
+
+Every (material, thickness, seed) is a separate job, the jobs are ordered so the
+longest start first and the number of jobs running at once is limited by the
+number of workers and the memory/disk each job needs. When every seed of a
+point is finished the statistics are calculated exactly as runStudy() would and
+the results are merged into 'DATA/<runKey>/<material>_runData.csv' by thickness.
+
+Example:
+
+>>> spec = {"ir": "Dipole_half", "materials": ["Cu", "Pb"], "thicknesses": [0.11, 0.12],
+...         "ngenerate": 10000, "nruns": 30}
+>>> c = campaign(spec)
+>>> results = c.run(workers=64)
+
+The same can be run from the command line with a json file containing the spec:
+
+    python -m LHeC_shieldingStudy spec.json --workers 64
+"""
+
+import concurrent.futures as _futures
+import importlib as _importlib
+import warnings as _warnings
+import shutil as _shutil
+import csv as _csv
+import os as _os
+
+from . import parallel as _parallel
+from . import cache as _cache
+from . import journal as _journal
+from . import phaseSpace as _phaseSpace
+from . import monitor as _monitor
+from . import results as _results
+from . import batch as _batch
+from . import pipeline as _pipeline
+
+# IR variants which can be studied and the module containing their lattice
+IRS = {"Dipole_full" : "dipoleOptimised_full",
+       "Dipole_half" : "dipoleOptimised_half",
+       "quads"       : "quadsHalfQuads_full"}
+
+# Columns written to the runData csv, same as the runSim scripts
+COLUMNS = ["Frac. survival", "Frac. err", "Frac. min", "Frac. max",
+           "Tot. w/o cuts", "Tot. w/o cuts err",
+           "Tot. e Aper", "Tot. e Aper err", "Tot. p Aper", "Tot. p Aper err",
+           "Tot. only w/ zp", "Tot. onyl w/ zp err"]
+
+
+def getModule(ir):
+    """
+    Return the study module of an IR variant (see IRS).
+    """
+    if ir not in IRS:
+        raise ValueError("Unknown IR '{}', choose from {}".format(ir, list(IRS)))
+    return _importlib.import_module("{}.{}".format(__package__, IRS[ir]))
+# end getModule (func)
+
+def estimateCost(ngenerate, thickness):
+    """
+    Relative estimate of the cost of one run, the number of primaries tracked with a small
+    increase for thicker material where more of the shower is tracked inside the shielding.
+    """
+    return ngenerate*(1+(10*thickness))
+# end estimateCost (func)
+
+def _availableMemory():
+    try:
+        return _os.sysconf('SC_PAGE_SIZE')*_os.sysconf('SC_AVPHYS_PAGES')/1e9
+    except (ValueError, OSError, AttributeError):
+        return None
+# end _availableMemory (func)
+
+def _thicknessOf(row):
+    try:
+        return float(row[0])
+    except (IndexError, ValueError):
+        return None
+# end _thicknessOf (func)
+
+def mergeCSV(path, header, rows):
+    """
+    Write 'rows' (first column the thickness) to the csv 'path' after the rows of the other
+    thicknesses already in it, sorted by thickness. The rows of a thickness in 'rows' replace
+    all rows of that thickness in the file, repeated headers (appended runs) are dropped. A file
+    with a different first header column (another format) is replaced.
+    """
+    new  = set(float(r[0]) for r in rows)
+    keep = []
+    if _os.path.exists(path):
+        with open(path, newline="") as f:
+            old = list(_csv.reader(f))
+        if old and old[0][:1] == [str(header[0])]:
+            keep = [r for r in old[1:] if _thicknessOf(r) is not None and _thicknessOf(r) not in new]
+
+    # sorted is stable, the rows of one thickness keep their order
+    merged = sorted(keep+[[str(v) for v in r] for r in rows], key=_thicknessOf)
+    with open(path, "w", newline="") as f:
+        w = _csv.writer(f)
+        w.writerow(header)
+        w.writerows(merged)
+# end mergeCSV (func)
+
+class campaign:
+    """
+    A scan of materials x thicknesses for one IR, described by a spec (dict) with the keys:
+
+    ir              IR variant, one of IRS
+    materials       list of shielding materials
+    thicknesses     list of thicknesses (metre)
+    ngenerate       num primary particles per run
+    nruns           num runs (seeds) per point
+    runKey          (optional) key of the output directories, default is the IR name
+    workers         (optional) max number of jobs running at once, default is the cpu count
+    memoryPerJob    (optional) memory used by one job in GB
+    maxMemory       (optional) memory available to the campaign in GB, default is the free memory
+    diskPerJob      (optional) disk used by the output of one job in GB
+    maxDisk         (optional) disk available to the campaign in GB, default is the free disk
+    cache           (optional) directory of a cache.resultCache, runs already simulated are reused
+    cacheSize       (optional) max size of the cache in bytes
+    checkpoint      (optional) journal each finished run so the campaign can be resumed
+    workspaces      (optional) directory in which each point gets its own workspace.py workspace
+    slabs           (optional) split the shielding of each point into this many slabs, see curves()
+    bank            (optional) directory of a phaseSpace.photonBank, the lattice in front of the
+                    shielding is simulated once per seed and replayed for every point
+    keep            (optional) keep the bdsim and rebdsim output of every run, by default only the
+                    counts are kept
+    pooled          (optional) report the pooled fraction absorbed of each point, the min and max
+                    columns are then its exact one sigma interval (see countStatistics.py)
+    events          (optional) json lines file receiving the timing events of every stage of
+                    every run (see monitor.py)
+    results         (optional) sqlite file of a results.resultsDB the counts of every run are
+                    written to
+    batch           (optional) dict of a batch.batchExecutor (scheduler, options, setup, ...) running
+                    the jobs as job arrays on a batch cluster (see batch.fromSpec)
+    pipeline        (optional) dict of the arguments of a pipeline.stagePipeline (timeouts, retries,
+                    reducers) running the stages of each job as subprocesses
+    """
+
+    def __init__(self, spec):
+        self._spec      = dict(spec)
+        self._ir        = spec["ir"]
+        self._module    = getModule(self._ir)
+        self._materials = list(spec["materials"])
+        self._thickness = list(spec["thicknesses"])
+        self._ngenerate = spec["ngenerate"]
+        self._nruns     = spec["nruns"]
+        self._runKey    = spec.get("runKey", self._ir)
+
+        self._bank      = None  # (phaseSpace.photonBank shared by every point)
+        self._studies   = {}    # (material, thickness) -> shieldingStudy
+        self._results   = {}    # (material, thickness) -> row of COLUMNS
+    # end __init__ (func)
+
+    def _newStudy(self, material, thickness):
+        # each point needs its own gmad files as they are all queued at the same time
+        key = "{}-{}-{}m".format(self._runKey, material, thickness)
+        if self._spec.get("workspaces"):
+            s = self._module.shieldingStudy(material, self._ngenerate, self._nruns, thickness, self._runKey,
+                                            workspace=_os.path.join(self._spec["workspaces"], key))
+        else:
+            s = self._module.shieldingStudy(material, self._ngenerate, self._nruns, thickness, self._runKey)
+        s._gmadKey = key
+        s.slabs    = self._spec.get("slabs", 1)
+        s.bank     = self._bank
+        s.pooled   = self._spec.get("pooled", False)
+        s.keep     = self._spec.get("keep", False)
+        if self._spec.get("events"):
+            s.monitor = _monitor.eventLog(_os.path.abspath(self._spec["events"]))
+        if self._spec.get("results"):
+            s.results = _results.resultsDB(self._spec["results"])
+        if self._spec.get("cache"):
+            s._cache = _cache.resultCache(self._spec["cache"], maxSize=self._spec.get("cacheSize"))
+        return s
+    # end _newStudy (func)
+
+    def configKey(self, material, thickness):
+        """
+        Return the cache.configKey() of the study of one point, i.e. the config its journal
+        resumes. The gmad files of the point are generated as in prepare(), nothing is run.
+        """
+        s = self._newStudy(material, thickness)
+        if self._spec.get("bank"):
+            s.bank = _phaseSpace.photonBank(self._spec["bank"])
+        for d in ["GMAD", "tmp", s._dataDir()]:
+            _os.makedirs(d, exist_ok=True)
+        s.genGMAD()
+        s._prepareRuns()
+        return _cache.configKey(s)
+    # end configKey (func)
+
+    def points(self):
+        """
+        Return a list of all (material, thickness) points in the campaign.
+        """
+        return [(m, t) for m in self._materials for t in self._thickness]
+    # end points (func)
+
+    def jobs(self):
+        """
+        Return a list of all jobs as (material, thickness, run index), longest first.
+        """
+        jobs = [(m, t, i) for (m, t) in self.points() for i in range(self._nruns)]
+        return sorted(jobs, key=lambda j: estimateCost(self._ngenerate, j[1]), reverse=True)
+    # end jobs (func)
+
+    def concurrency(self, workers=None):
+        """
+        Number of jobs which can run at once, the number of workers limited by the memory
+        and disk each job requires.
+        """
+        spec = self._spec
+        n    = workers or spec.get("workers") or _os.cpu_count() or 1
+
+        if spec.get("memoryPerJob"):
+            memory = spec.get("maxMemory") or _availableMemory()
+            if memory is not None:
+                n = min(n, int(memory//spec["memoryPerJob"]))
+
+        if spec.get("diskPerJob"):
+            disk = spec.get("maxDisk") or _shutil.disk_usage(".").free/1e9
+            n    = min(n, int(disk//spec["diskPerJob"]))
+            # the output of every run is only kept with 'keep'
+            if spec.get("keep") and spec["diskPerJob"]*len(self.points())*self._nruns > disk:
+                _warnings.warn("The output of the whole campaign will not fit in {:.1f} GB of disk".format(disk))
+
+        return max(1, n)
+    # end concurrency (func)
+
+    def prepare(self):
+        """
+        Create the output directories and generate the gmad files of every point.
+        """
+        for d in ["GMAD", "tmp"]:
+            _os.makedirs(d, exist_ok=True)
+        if self._spec.get("bank"):
+            # record the photons in front of the shielding once for every seed
+            bank = _phaseSpace.photonBank(self._spec["bank"])
+            bank.recordAll(self._newStudy(*self.points()[0]), range(self._nruns), workers=self.concurrency(None))
+            self._bank = bank
+        for (m, t) in self.points():
+            s = self._newStudy(m, t)
+            _os.makedirs(s._dataDir(), exist_ok=True)
+            s.genGMAD()
+            s._prepareRuns()
+            self._studies[(m, t)] = s
+    # end prepare (func)
+
+    def run(self, workers=None, write=True, executor=None):
+        """
+        Run every job of the campaign and return a dict of (material, thickness) -> row of
+        COLUMNS. The results are also written to the runData csv of each material unless
+        'write' is False.
+
+        Given an 'executor' (or the spec key 'batch') the jobs are submitted to it, e.g. a
+        batch.batchExecutor running them on a cluster, instead of a local pool of workers.
+        """
+        if executor is None and self._spec.get("batch"):
+            with _batch.fromSpec(self._spec["batch"]) as ex:
+                return self.run(workers, write, executor=ex)
+        self.prepare()
+        runs     = {p: [None]*self._nruns for p in self.points()}
+        journals = {}
+
+        if self._spec.get("checkpoint"):
+            # resume from the runs which already finished
+            for p, s in self._studies.items():
+                journals[p] = _journal.studyJournal(s)
+                for i, counts in journals[p].load().items():
+                    if i < self._nruns:
+                        runs[p][i] = counts
+
+        def store(m, t, i, counts):
+            runs[(m, t)][i] = counts
+            if (m, t) in journals:
+                journals[(m, t)].append(i, counts)
+
+        jobs = [j for j in self.jobs() if runs[(j[0], j[1])][j[2]] is None]
+        n    = self.concurrency(workers)
+        if self._spec.get("pipeline") is not None and executor is None:
+            p = _pipeline.stagePipeline(**self._spec["pipeline"])
+            p.run([(self._studies[(m, t)], i, m, t) for (m, t, i) in jobs], lambda job, counts: store(job[2], job[3], job[1], counts), workers=n)
+        elif executor is not None:
+            # every job of the campaign goes to the cluster as one array, longest first
+            futures = {executor.submit(_parallel._runSeed, self._studies[(m, t)], i): (m, t, i) for (m, t, i) in jobs}
+            for f in _futures.as_completed(futures):
+                store(*futures[f], f.result())
+        elif n <= 1:
+            for (m, t, i) in jobs:
+                store(m, t, i, _parallel._runSeed(self._studies[(m, t)], i))
+        else:
+            with _futures.ProcessPoolExecutor(max_workers=n, initializer=_parallel._initWorker) as pool:
+                # jobs are submitted longest first and the pool starts them in that order
+                futures = {pool.submit(_parallel._runSeed, self._studies[(m, t)], i): (m, t, i) for (m, t, i) in jobs}
+                for f in _futures.as_completed(futures):
+                    store(*futures[f], f.result())
+
+        for p in self.points():
+            s = self._studies[p]
+            if s.results is not None:
+                s.results.store(s, dict(enumerate(runs[p])))
+            self._results[p] = self._summarise(s, runs[p])
+        if write:
+            self.writeCSV()
+        return dict(self._results)
+    # end run (func)
+
+    def _summarise(self, s, runs):
+        value, err, val_range    = s._finishStudy(runs)
+        totalPhotons, err_num    = s.getTotalPhotons()
+        ZpCut, err_zp            = s.getZpCut()
+        eNum, pNum, err_e, err_p = s.getTotalAper()
+        return [value, err, val_range[0], val_range[1],
+                totalPhotons, err_num,
+                eNum, err_e, pNum, err_p,
+                ZpCut, err_zp]
+    # end _summarise (func)
+
+    def curves(self):
+        """
+        Return a dict of (material, thickness) -> (thickness, value, err) of the fraction
+        absorbed after each slab, with the spec key 'slabs' a single thickness per material
+        gives the whole curve up to that thickness (see slabs.py).
+        """
+        return {p: self._studies[p].getCurve() for p in self._results}
+    # end curves (func)
+
+    def writeCSV(self):
+        """
+        Write the results of each material to '<data dir>/<material>_runData.csv' and the buffer
+        of each point to '<data dir>/<material>_runBuffer.csv', one row per thickness. With
+        slabs the curve of each point is written to '<data dir>/<material>_slabCurve.csv'.
+
+        The rows of other thicknesses already in the files (earlier campaigns, runSim scripts or
+        iterations of thickness.findThickness) are kept, the rows of the thicknesses of this
+        campaign are replaced (see mergeCSV).
+        """
+        for m in self._materials:
+            points = [(m, t) for t in self._thickness if (m, t) in self._results]
+            if not points:
+                continue
+            outdir = self._studies[points[0]]._dataDir()
+
+            mergeCSV("{}/{}_runData.csv".format(outdir, m), [""]+COLUMNS,
+                     [[p[1]]+["{:f}".format(v) for v in self._results[p]] for p in points])
+
+            mergeCSV("{}/{}_runBuffer.csv".format(outdir, m), ["Thickness"]+list(range(self._nruns)),
+                     [[p[1]]+["{:f}".format(v) for v in self._studies[p].getBuffer()] for p in points])
+
+            if self._spec.get("slabs", 1) > 1:
+                mergeCSV("{}/{}_slabCurve.csv".format(outdir, m), ["", "Thickness", "Frac. survival", "Frac. err"],
+                         [[p[1]]+["{:f}".format(v) for v in row] for p in points for row in zip(*self._studies[p].getCurve())])
+    # end writeCSV (func)
+
+# end campaign (class)
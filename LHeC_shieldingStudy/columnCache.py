@@ -0,0 +1,111 @@
+"""
+Sidecar cache of the sampler columns of a bdsim output as memory-mappable .npy files.
+
+Analysis and plotting scripts read the same few columns (x, y, zp, partID,
+energy) of the same ROOT files again and again, paying for ROOT and the file
+load every time. The first read of a file writes each column of each sampler to
+
+    <output>.columns/<sampler>.<branch>.npy
+
+next to the bdsim output in the DATA tree, later reads open these with
+np.load(mmap_mode='r') which does not copy the data and does not need ROOT at
+all. The size and mtime of the ROOT file are stored with the columns, if the
+ROOT file changes the sidecar is written again.
+
+Example:
+
+>>> d = loadColumns("DATA/run_Pb_quads/Pb-0.025m_quads.root", ["dDRIFT50", "COL_END_0"])
+>>> x = d["dDRIFT50"].data["x"][d["dDRIFT50"].data["partID"]==22]
+"""
+
+import json as _json
+import os as _os
+
+import numpy as _np
+
+from .regions import samplerColumns
+
+BRANCHES = ("x", "y", "zp", "partID", "energy")
+
+
+def sidecarDir(filename):
+    """
+    Directory holding the cached columns of a bdsim output file.
+    """
+    base = filename[:-len(".root")] if filename.endswith(".root") else filename
+    return base+".columns"
+# end sidecarDir (func)
+
+def _source(filename):
+    st = _os.stat(filename)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+# end _source (func)
+
+def _readMeta(path):
+    try:
+        with open(_os.path.join(path, "meta.json")) as f:
+            return _json.load(f)
+    except (OSError, ValueError):
+        return None
+# end _readMeta (func)
+
+def _writeMeta(path, meta):
+    tmp = _os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        _json.dump(meta, f)
+    _os.replace(tmp, _os.path.join(path, "meta.json"))
+# end _writeMeta (func)
+
+def isValid(filename, samplers, branches=BRANCHES):
+    """
+    True if the sidecar of filename holds the requested columns and the ROOT file has not
+    changed since they were written.
+    """
+    meta = _readMeta(sidecarDir(filename))
+    if meta is None or meta.get("source") != _source(filename):
+        return False
+    have = set(meta.get("columns", []))
+    return all("{}.{}".format(s, b) in have for s in samplers for b in branches)
+# end isValid (func)
+
+def writeColumns(filename, samplers, branches=BRANCHES):
+    """
+    Read the columns from the ROOT file and write them to the sidecar, keeping any columns
+    already cached if the ROOT file is unchanged.
+    """
+    # ROOT is only needed when the sidecar has to be (re)written
+    from . import reduction as _reduction
+
+    path   = sidecarDir(filename)
+    source = _source(filename)
+    meta   = _readMeta(path)
+    if meta is None or meta.get("source") != source:
+        meta = {"source": source, "columns": []}
+    _os.makedirs(path, exist_ok=True)
+
+    data = _reduction.readSamplers(filename, samplers, branches=branches)
+    for s in samplers:
+        for b in branches:
+            name = "{}.{}".format(s, b)
+            tmp  = _os.path.join(path, name+".tmp.npy")
+            _np.save(tmp, data[s].data[b])
+            _os.replace(tmp, _os.path.join(path, name+".npy"))
+            if name not in meta["columns"]:
+                meta["columns"].append(name)
+    _writeMeta(path, meta)
+# end writeColumns (func)
+
+def loadColumns(filename, samplers, branches=BRANCHES):
+    """
+    Return a dict of sampler name -> samplerColumns with the requested branches memory-mapped
+    from the sidecar, writing the sidecar first if it is missing or out of date.
+    """
+    if not isValid(filename, samplers, branches):
+        writeColumns(filename, samplers, branches)
+
+    path = sidecarDir(filename)
+    out  = {}
+    for s in samplers:
+        out[s] = samplerColumns(s, {b: _np.load(_os.path.join(path, "{}.{}.npy".format(s, b)), mmap_mode='r') for b in branches})
+    return out
+# end loadColumns (func)
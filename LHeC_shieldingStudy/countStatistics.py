@@ -0,0 +1,308 @@
+"""
+Pooled counting statistics of the runs of a study, accumulated as the runs finish.
+
+The fraction absorbed of a study is the mean of the fraction of each run, with
+its standard error from the spread of the runs. At low counts (thick shielding,
+a handful of photons after it per run) the ratio of each run is very noisy and
+the mean of ratios is biased, while the photons of all runs together give the
+pooled estimate
+
+    absorbed = 1 - sum(numAfter)/sum(numBefore)
+
+with a smaller error for the same number of runs. runStatistics keeps only
+running sums of the counts (Welford means and co-moments, merged with the
+formula of Chan et al. so the runs of parallel workers can be combined in any
+order) and gives
+
+- the mean of the per run fractions and its standard error, as before
+- the pooled fraction with the standard error of a ratio estimator, from the
+  run to run (co)variance of the counts so correlated photons of a shower are
+  accounted for
+- the exact (Clopper-Pearson) binomial interval of the pooled counts, without
+  scipy approximated when there are many photons both after and absorbed
+- a bootstrap interval over runs, by giving every run a Poisson(1) weight in each
+  of 'nboot' replicates as it is added (online bootstrap), so the runs do not have
+  to be kept to resample them
+
+With slabs (see slabs.py) every statistic is given for each slab, the last one is
+the full shielding.
+
+Example:
+
+>>> stats = runStatistics.fromRuns(runs)
+>>> value, err = stats.pooled(), stats.pooledError()
+>>> lo, hi = stats.exact(conf=0.95)
+>>> stats.merge(runStatistics.fromRuns(moreRuns, start=len(runs)))
+"""
+
+import math as _math
+import statistics as _statistics
+
+import numpy as _np
+
+# confidence of a one standard deviation interval
+ONE_SIGMA = 0.6826894921370859
+
+# smallest of the beta parameters above which betaQuantile() uses the normal approximation
+# (without scipy), it is then within 1e-3 of a standard deviation of the exact quantile
+NORMAL_ABOVE = 1000
+
+
+def _lnBeta(a, b):
+    lgamma = _np.vectorize(_math.lgamma, otypes=[float])
+    return lgamma(a) + lgamma(b) - lgamma(a+b)
+# end _lnBeta (func)
+
+def _betaFraction(a, b, x, eps=1e-14, maxIter=100000):
+    # continued fraction of the incomplete beta function (modified Lentz)
+    tiny = 1e-300
+    c    = _np.ones_like(x)
+    d    = 1-((a+b)*x/(a+1))
+    d    = 1/_np.where(_np.abs(d) < tiny, tiny, d)
+    h    = d
+    for m in range(1, maxIter):
+        for aa in [m*(b-m)*x/((a+(2*m)-1)*(a+(2*m))), -(a+m)*(a+b+m)*x/((a+(2*m))*(a+(2*m)+1))]:
+            d = 1+(aa*d)
+            d = 1/_np.where(_np.abs(d) < tiny, tiny, d)
+            c = 1+(aa/c)
+            c = _np.where(_np.abs(c) < tiny, tiny, c)
+            h = h*d*c
+        if _np.all(_np.abs((d*c)-1) < eps):
+            break
+    return h
+# end _betaFraction (func)
+
+def betaInc(a, b, x):
+    """
+    Regularised incomplete beta function I_x(a, b), element-wise on broadcast arrays.
+    """
+    a, b, x = _np.broadcast_arrays(*[_np.asarray(v, dtype=float) for v in (a, b, x)])
+    xc      = _np.clip(x, 1e-300, 1-1e-16)
+    with _np.errstate(divide='ignore'):
+        front = _np.exp((a*_np.log(xc)) + (b*_np.log1p(-xc)) - _lnBeta(a, b))
+    # the fraction converges quickly below the mean, use the symmetry I_x(a,b) = 1-I_1-x(b,a) above it
+    swap = xc > (a+1)/(a+b+2)
+    aa   = _np.where(swap, b, a)
+    bb   = _np.where(swap, a, b)
+    f    = front*_betaFraction(aa, bb, _np.where(swap, 1-xc, xc))/aa
+    out  = _np.where(swap, 1-f, f)
+    return _np.where(x <= 0, 0.0, _np.where(x >= 1, 1.0, out))
+# end betaInc (func)
+
+def _normalQuantile(q, a, b):
+    # normal approximation of the beta quantile with the skewness correction (Cornish-Fisher)
+    z    = _np.vectorize(_statistics.NormalDist().inv_cdf, otypes=[float])(q)
+    mean = a/(a+b)
+    sd   = _np.sqrt(a*b/(((a+b)**2)*(a+b+1)))
+    skew = 2*(b-a)*_np.sqrt(a+b+1)/((a+b+2)*_np.sqrt(a*b))
+    return _np.clip(mean + (sd*(z+(((z**2)-1)*skew/6))), 0, 1)
+# end _normalQuantile (func)
+
+def betaQuantile(q, a, b, tol=1e-15):
+    """
+    Quantile q of the beta distribution (a, b), element-wise. Uses scipy if it is installed,
+    otherwise betaInc() is inverted by bisection of all elements at once, apart from those
+    with a and b both above NORMAL_ABOVE (many counts on either side, e.g. photons before and
+    after thin shielding) which use the normal approximation as the bisection is slow there.
+    """
+    try:
+        from scipy.special import betaincinv as _betaincinv
+    except ImportError:
+        _betaincinv = None
+    if _betaincinv is not None:
+        return _betaincinv(a, b, q)
+
+    q, a, b = _np.broadcast_arrays(*[_np.asarray(v, dtype=float) for v in (q, a, b)])
+    large   = _np.minimum(a, b) > NORMAL_ABOVE
+    if _np.any(large):
+        out        = _np.zeros(q.shape)
+        out[large] = _normalQuantile(q[large], a[large], b[large])
+        if not _np.all(large):
+            out[~large] = betaQuantile(q[~large], a[~large], b[~large], tol)
+        return out
+
+    lo, hi  = _np.zeros(q.shape), _np.ones(q.shape)
+    while _np.max(hi-lo, initial=0) > tol*_np.max(lo+hi, initial=0):
+        mid = (lo+hi)/2
+        low = betaInc(a, b, mid) < q
+        lo  = _np.where(low, mid, lo)
+        hi  = _np.where(low, hi, mid)
+        if _np.all(mid == (lo+hi)/2):
+            break
+    return (lo+hi)/2
+# end betaQuantile (func)
+
+def clopperPearson(k, n, conf=ONE_SIGMA):
+    """
+    Exact binomial interval (lo, hi) of the probability of k successes out of n trials with
+    confidence 'conf', element-wise.
+    """
+    k     = _np.asarray(k, dtype=float)
+    n     = _np.asarray(n, dtype=float)
+    k     = _np.clip(k, 0, n)
+    alpha = 1-conf
+    with _np.errstate(invalid='ignore', divide='ignore'):
+        lo = _np.where(k > 0, betaQuantile(alpha/2, _np.maximum(k, 1e-300), n-k+1), 0.0)
+        hi = _np.where(k < n, betaQuantile(1-(alpha/2), k+1, _np.maximum(n-k, 1e-300)), 1.0)
+    return lo, hi
+# end clopperPearson (func)
+
+class runStatistics:
+    """
+    Running statistics of the counts [total, eAper, pAper, zp, numBefore, numAfter, slabs...]
+    of the runs of a study (see _runSeed), run i is given the bootstrap weights of seed
+    (seed, i) so the result does not depend on how the runs are split and merged.
+    """
+
+    def __init__(self, nboot=1000, seed=0):
+        self.n      = 0             # (num runs added)
+        self.nboot  = nboot         # (num bootstrap replicates)
+        self.seed   = seed          # (seed of the bootstrap weights)
+        self._mean  = None          # (mean of each count)
+        self._M2    = None          # (co-moment matrix of the counts)
+        self._fMean = None          # (mean of the per run fraction absorbed after each slab)
+        self._fM2   = None          # (sum of squared deviations of the per run fractions)
+        self._fMin  = None
+        self._fMax  = None
+        self._boot  = None          # (weighted sums of numBefore and numAfter of each slab per replicate)
+    # end __init__ (func)
+
+    @classmethod
+    def fromRuns(cls, runs, start=0, **kwargs):
+        """
+        Statistics of a list of counts, the first of which is run number 'start'.
+        """
+        stats = cls(**kwargs)
+        for i, counts in enumerate(runs):
+            stats.add(counts, start+i)
+        return stats
+    # end fromRuns (func)
+
+    @staticmethod
+    def _afterIndex(ncounts):
+        # index of the number after each slab, in beam order (see slabs.slabFractions)
+        return list(range(6, ncounts)) + [5]
+    # end _afterIndex (func)
+
+    def add(self, counts, i=None):
+        """
+        Add the counts of run i (by default the next run number).
+        """
+        i      = self.n if i is None else i
+        x      = _np.asarray(counts, dtype=float)
+        pair   = x[[4]+self._afterIndex(len(x))]
+        if not pair[0] > 0:
+            raise ValueError("Run {} has no photons in front of the shielding (numBefore is {}), "
+                             "its fraction absorbed is undefined".format(i, x[4]))
+        one    = runStatistics(self.nboot, self.seed)
+        one.n  = 1
+        one._mean, one._M2 = x, _np.zeros((len(x), len(x)))
+        one._fMean = 1-(pair[1:]/pair[0])
+        one._fM2   = _np.zeros_like(one._fMean)
+        one._fMin, one._fMax = one._fMean, one._fMean
+        w          = _np.random.default_rng([self.seed, i]).poisson(1, self.nboot)
+        one._boot  = w[:, None]*pair[None, :]
+        return self.merge(one)
+    # end add (func)
+
+    def merge(self, other):
+        """
+        Add the runs of another runStatistics (with the same bootstrap) to this one.
+        """
+        if other.n == 0:
+            return self
+        if (other.nboot, other.seed) != (self.nboot, self.seed):
+            raise ValueError("Only statistics with the same nboot and seed can be merged")
+        if self.n == 0:
+            self.n = other.n
+            self._mean, self._M2, self._fMean, self._fM2 = other._mean, other._M2, other._fMean, other._fM2
+            self._fMin, self._fMax, self._boot = other._fMin, other._fMax, other._boot
+            return self
+        if len(other._mean) != len(self._mean):
+            raise ValueError("Only runs with the same number of slabs can be merged")
+
+        n      = self.n + other.n
+        delta  = other._mean - self._mean
+        fDelta = other._fMean - self._fMean
+        self._M2    = self._M2 + other._M2 + (_np.outer(delta, delta)*self.n*other.n/n)
+        self._mean  = self._mean + (delta*other.n/n)
+        self._fM2   = self._fM2 + other._fM2 + ((fDelta**2)*self.n*other.n/n)
+        self._fMean = self._fMean + (fDelta*other.n/n)
+        self._fMin  = _np.minimum(self._fMin, other._fMin)
+        self._fMax  = _np.maximum(self._fMax, other._fMax)
+        self._boot  = self._boot + other._boot
+        self.n      = n
+        return self
+    # end merge (func)
+
+    def count(self, j):
+        """
+        Mean of count j of a run and its standard error.
+        """
+        return self._mean[j], _np.sqrt(self._M2[j, j]/self.n)/_np.sqrt(self.n)
+    # end count (func)
+
+    def sums(self):
+        """
+        Sum of numBefore and of the number after each slab over all runs.
+        """
+        return self.n*self._mean[4], self.n*self._mean[self._afterIndex(len(self._mean))]
+    # end sums (func)
+
+    def fractions(self):
+        """
+        Mean of the per run fraction absorbed after each slab and its standard error.
+        """
+        return self._fMean, _np.sqrt(self._fM2/self.n)/_np.sqrt(self.n)
+    # end fractions (func)
+
+    def fractionRange(self):
+        """
+        Smallest and largest per run fraction absorbed after each slab.
+        """
+        return self._fMin, self._fMax
+    # end fractionRange (func)
+
+    def pooled(self):
+        """
+        Fraction absorbed after each slab from the counts of all runs together.
+        """
+        before, after = self.sums()
+        return 1-(after/before)
+    # end pooled (func)
+
+    def pooledError(self):
+        """
+        Standard error of pooled(), from the run to run variance of numAfter - R*numBefore
+        (R the pooled fraction left) as for any ratio estimator.
+        """
+        j     = self._afterIndex(len(self._mean))
+        R     = 1-self.pooled()
+        cov   = self._M2/self.n
+        var   = cov[j, j] - (2*R*cov[j, 4]) + ((R**2)*cov[4, 4])
+        return _np.sqrt(_np.maximum(var, 0)/self.n)/self._mean[4]
+    # end pooledError (func)
+
+    def exact(self, conf=ONE_SIGMA):
+        """
+        Clopper-Pearson interval (lo, hi) of the pooled fraction absorbed after each slab, taking
+        the photons after the slab as a binomial sample of those before it. With biasing the
+        counts are sums of weights and the interval is only approximate, use bootstrap().
+        """
+        before, after = self.sums()
+        lo, hi = clopperPearson(_np.round(after), _np.round(before), conf)
+        return 1-hi, 1-lo
+    # end exact (func)
+
+    def bootstrap(self, conf=ONE_SIGMA):
+        """
+        Percentile bootstrap interval (lo, hi) of the pooled fraction absorbed after each slab,
+        resampling whole runs.
+        """
+        with _np.errstate(invalid='ignore', divide='ignore'):
+            f = 1-(self._boot[:, 1:]/self._boot[:, :1])
+        f = f[self._boot[:, 0] > 0]
+        return tuple(_np.quantile(f, [(1-conf)/2, (1+conf)/2], axis=0))
+    # end bootstrap (func)
+
+# end runStatistics (class)
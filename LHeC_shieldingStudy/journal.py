@@ -0,0 +1,104 @@
+"""
+Journal of the runs of a study which have finished, so a study can be resumed
+after a crash without losing the runs which were already completed.
+
+Each finished run is appended to the journal as one line of json and flushed to
+disk (fsync) before the next result is accepted. When the study is started again
+the runs found in the journal are not simulated again, their counts are used
+as they are so the result is the same as an uninterrupted study.
+
+Every line records the cache.configKey() of the study (gmad files, analysis
+config, ngenerate, apertures, ...) and only the lines of the current config are
+resumed, so after e.g. changing the slabs or an aperture and generating the
+gmad again the runs are simulated again instead of reusing the old counts.
+
+Example:
+
+>>> value, err, val_range = s.runStudy(checkpoint=True)
+"""
+
+import json as _json
+import os as _os
+
+from . import cache as _cache
+
+
+def journalFile(study):
+    """
+    Default journal of a shieldingStudy, next to its bdsim output.
+    """
+    return "{}/{}-{}m.journal".format(study._dataDir(), study._colMat, study._thickness)
+# end journalFile (func)
+
+def studyJournal(study):
+    """
+    Journal of a shieldingStudy at journalFile(), resuming only the runs of its current config.
+    Must be called after genGMAD() as the key includes the gmad files.
+    """
+    return runJournal(journalFile(study), study._ngenerate, _cache.configKey(study))
+# end studyJournal (func)
+
+class runJournal:
+    """
+    Append only journal of (run index, counts), only runs with the same ngenerate (and the
+    same config key, if one is given) are resumed.
+    """
+
+    def __init__(self, path, ngenerate, config=None):
+        self.path       = path
+        self._ngenerate = ngenerate
+        self._config    = config        # (cache.configKey of the study, None accepts any)
+    # end __init__ (func)
+
+    def load(self):
+        """
+        Return a dict of run index -> counts of the runs already in the journal.
+
+        A line which was only partly written when a crash occurred is ignored.
+        """
+        done = {}
+        if not _os.path.exists(self.path):
+            return done
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    r = _json.loads(line)
+                except ValueError:
+                    continue
+                if r.get("ngenerate") != self._ngenerate:
+                    continue
+                if self._config is None or r.get("config") == self._config:
+                    done[r["run"]] = r["counts"]
+        return done
+    # end load (func)
+
+    def append(self, i, counts):
+        """
+        Write the counts of run i to the journal and make sure they are on disk.
+        """
+        line = _json.dumps({"run"       : i,
+                            "seed"      : (i*42)+23,
+                            "ngenerate" : self._ngenerate,
+                            "config"    : self._config,
+                            "counts"    : [float(c) for c in counts]})
+        with open(self.path, "ab") as f:
+            # start on a new line if the last write was cut short by a crash
+            if f.tell() > 0:
+                with open(self.path, "rb") as r:
+                    r.seek(-1, _os.SEEK_END)
+                    if r.read(1) != b"\n":
+                        line = "\n"+line
+            f.write((line+"\n").encode())
+            f.flush()
+            _os.fsync(f.fileno())
+    # end append (func)
+
+    def clear(self):
+        """
+        Remove the journal, e.g. to start a study again from the first run.
+        """
+        if _os.path.exists(self.path):
+            _os.remove(self.path)
+    # end clear (func)
+
+# end runJournal (class)
@@ -0,0 +1,215 @@
+"""
+Structured events of the stages of each run of a study, to see where the time goes.
+
+With study.monitor set to a callable (e.g. an eventLog) every stage of every
+seed (bdsim, rebdsim, load, reduce and the statistics at the end) produces an
+event, a dict with
+
+    stage, seed, runKey, material, thickness, host, pid, time (unix start time)
+    wall            wall time of the stage (s)
+    cpu             cpu time of this process during the stage (s)
+    childCpu        cpu time of the processes (bdsim, rebdsim) run by the stage (s)
+    childMaxRSS     largest peak resident memory of the processes run by the stage (kB),
+                    None if it ran none
+    maxRSS          peak resident memory of this process since it started (kB), not
+                    only during the stage
+    bytes           size of the output files of the stage
+    events          num events simulated or analysed
+    eventsPerSec    events/wall
+    photons         num photons counted in front of the shielding (load and reduce)
+    error           the exception if the stage failed
+
+The ratio of childCpu to wall of the bdsim stage against the rebdsim/load/reduce
+stages shows whether a campaign is bound by the simulation, the ROOT I/O or the
+analysis in python, summarise() adds them up per stage. When the monitor is None
+(the default) nothing is measured.
+
+The usage of bdsim and rebdsim is that of their own process, collected with
+os.wait4 when the stage runs them with runProcess() (or the coroutine of a
+pipeline.stagePipeline), so the stages of other seeds running processes at the
+same time do not leak into it.
+
+Example:
+
+>>> s.monitor = eventLog("DATA/run2b/events.jsonl")
+>>> value, err, val_range = s.runStudy(workers=16)
+>>> summarise(loadEvents("DATA/run2b/events.jsonl"))
+"""
+
+import contextlib as _contextlib
+import json as _json
+import os as _os
+import resource as _resource
+import socket as _socket
+import subprocess as _subprocess
+import threading as _threading
+import time as _time
+
+
+class eventLog:
+    """
+    Monitor appending each event as a line of json to 'path'. Each line is written with a single
+    write in append mode so the workers of a parallel study can share the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+    # end __init__ (func)
+
+    def __call__(self, event):
+        line = (_json.dumps(event)+"\n").encode()
+        fd   = _os.open(self.path, _os.O_WRONLY | _os.O_APPEND | _os.O_CREAT, 0o644)
+        try:
+            _os.write(fd, line)
+        finally:
+            _os.close(fd)
+    # end __call__ (func)
+
+# end eventLog (class)
+
+def _cpu(usage):
+    return usage.ru_utime + usage.ru_stime
+# end _cpu (func)
+
+def bdsimCommand(gmadFile, outfile, ngenerate, options=(), executable="bdsim"):
+    """
+    Command line of a bdsim run in batch mode as started by pybdsim.Run.Bdsim.
+    """
+    return [executable, "--file={}".format(gmadFile), "--outfile={}".format(outfile), "--batch",
+            "--ngenerate={}".format(ngenerate)]+list(options)
+# end bdsimCommand (func)
+
+def rebdsimCommand(config, infile, outfile, executable="rebdsim"):
+    """
+    Command line of rebdsim analysing infile with the analysis config, as pybdsim.Run.Rebdsim.
+    """
+    return [executable, config, infile, outfile]
+# end rebdsimCommand (func)
+
+def addUsage(event, usage):
+    """
+    Add the cpu time and peak resident memory of the resource usage of one child process (as
+    returned by os.wait4) to the childCpu and childMaxRSS of 'event', if there is one.
+    """
+    if event is not None:
+        event["childCpu"]    = event.get("childCpu", 0.0)+_cpu(usage)
+        event["childMaxRSS"] = max(event.get("childMaxRSS") or 0, usage.ru_maxrss)
+# end addUsage (func)
+
+def runProcess(cmd, event=None, stdout=None, timeout=None, check=True):
+    """
+    Run cmd as a child process and return its exit status. The cpu time and peak resident memory
+    of this process alone (os.wait4) are added to the childCpu and childMaxRSS of 'event', the
+    event of the stage running it. The output goes to the file 'stdout' if given.
+
+    A process still running after 'timeout' seconds is killed and subprocess.TimeoutExpired
+    raised, with 'check' a non zero exit status raises a RuntimeError.
+    """
+    proc  = _subprocess.Popen(cmd, stdout=stdout, stderr=None if stdout is None else _subprocess.STDOUT)
+    state = {"killed": False}
+
+    def kill():
+        state["killed"] = True
+        proc.kill()
+
+    timer = _threading.Timer(timeout, kill) if timeout is not None else None
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    try:
+        _, status, usage = _os.wait4(proc.pid, 0)
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+    # reaped here, so Popen must not wait for it again
+    proc.returncode = _os.waitstatus_to_exitcode(status)
+
+    addUsage(event, usage)
+    if state["killed"]:
+        raise _subprocess.TimeoutExpired(cmd, timeout)
+    if check and proc.returncode != 0:
+        raise RuntimeError("{} exited with status {}".format(cmd[0], proc.returncode))
+    return proc.returncode
+# end runProcess (func)
+
+@_contextlib.contextmanager
+def stage(study, name, seed=None, files=(), events=None):
+    """
+    Measure the code in the with block as stage 'name' of run 'seed' and send the event to
+    study.monitor. 'files' are the outputs of the stage whose size is recorded once it ends.
+    Yield the event so the block can add to it (e.g. the photons counted).
+    """
+    monitor = getattr(study, "monitor", None)
+    event   = {}
+    if monitor is None:
+        yield event
+        return
+
+    selfBefore = _resource.getrusage(_resource.RUSAGE_SELF)
+    start, t0  = _time.time(), _time.perf_counter()
+    try:
+        yield event
+    except BaseException as e:
+        event["error"] = repr(e)
+        raise
+    finally:
+        wall = _time.perf_counter()-t0
+        us   = _resource.getrusage(_resource.RUSAGE_SELF)
+        # added by runProcess for the processes of this stage
+        event.setdefault("childCpu", 0.0)
+        event.setdefault("childMaxRSS", None)
+        event.update({"stage"       : name,
+                      "seed"        : seed,
+                      "runKey"      : study._runKey,
+                      "material"    : study._colMat,
+                      "thickness"   : study._thickness,
+                      "host"        : _socket.gethostname(),
+                      "pid"         : _os.getpid(),
+                      "time"        : start,
+                      "wall"        : wall,
+                      "cpu"         : _cpu(us)-_cpu(selfBefore),
+                      "maxRSS"      : us.ru_maxrss,
+                      "bytes"       : sum(_os.path.getsize(f) for f in files if _os.path.exists(f)),
+                      "events"      : events,
+                      "eventsPerSec": events/wall if events and wall > 0 else None})
+        monitor(event)
+# end stage (func)
+
+def loadEvents(path):
+    """
+    Return the events of an eventLog as a list of dicts, a partly written last line is ignored.
+    """
+    out = []
+    with open(path) as f:
+        for line in f:
+            try:
+                out.append(_json.loads(line))
+            except ValueError:
+                continue
+    return out
+# end loadEvents (func)
+
+def summarise(events):
+    """
+    Total wall, cpu and child cpu time, bytes written and photons counted of each stage, as a
+    dict of stage -> dict. 'fraction' is the share of the total wall time of all stages.
+    """
+    out = {}
+    for e in events:
+        s = out.setdefault(e["stage"], {"n": 0, "wall": 0.0, "cpu": 0.0, "childCpu": 0.0, "bytes": 0, "photons": 0, "errors": 0})
+        s["n"]        += 1
+        s["wall"]     += e["wall"]
+        s["cpu"]      += e["cpu"]
+        s["childCpu"] += e["childCpu"]
+        s["bytes"]    += e["bytes"]
+        s["photons"]  += e.get("photons") or 0
+        s["errors"]   += "error" in e
+    total = sum(s["wall"] for s in out.values())
+    for s in out.values():
+        s["fraction"] = s["wall"]/total if total > 0 else None
+    return out
+# end summarise (func)
@@ -0,0 +1,124 @@
+"""
+Run the seeds of a shieldingStudy on a pool of worker processes.
+
+Each seed of a study is independent (bdsim -> rebdsim -> load) so they can be
+spread over the cores of a node. The study instance is sent to every worker
+and its '_runSeed' method is called there, the counts from each seed are then
+returned to the parent process in seed order so that the buffer and the
+statistics are identical to a serial run.
+
+Example:
+
+>>> s = shieldingStudy(colMat="Cu", ngenerate=10000, nruns=30, thickness=0.05, runKey="Dipole_half")
+>>> s.genGMAD()
+>>> value, err, val_range = s.runStudy(workers=16)
+
+Instead of a fixed number of runs the study can run until the standard error on
+the fraction absorbed reaches a target, see runUntil().
+"""
+
+import concurrent.futures as _futures
+from . import countStatistics as _countStatistics
+
+
+def _initWorker():
+    """
+    Load the ROOT libraries once when each worker process starts.
+    """
+    import pybdsim as _pybdsim
+    _pybdsim.Data.LoadROOTLibraries()
+# end _initWorker (func)
+
+def _runSeed(study, i):
+    """
+    Run number i of study, reusing the result from the study's cache if it has one.
+    """
+    cache = getattr(study, '_cache', None)
+    if cache is not None:
+        return cache.run(study, i)
+    return study._runSeed(i)
+# end _runSeed (func)
+
+def runSeeds(study, runs, workers=1, journal=None, executor=None, pipeline=None):
+    """
+    Call study._runSeed(i) for every run index in 'runs' and return the results as a list
+    in the same order as 'runs'.
+
+    With workers <= 1 the runs are performed one after another in this process, otherwise
+    a pool of 'workers' processes is used. Given an 'executor' (e.g. a batch.batchExecutor) the
+    runs are submitted to it instead and it is left running for the next call. With a
+    pipeline.stagePipeline the stages of 'workers' runs at a time are run as subprocesses
+    with its timeouts and retries.
+
+    If a journal.runJournal is given the runs already in it are not performed again and each
+    run is written to it as soon as it finishes. With study.results set the counts of all the
+    runs are written to that results.resultsDB at the end.
+    """
+    runs    = list(runs)
+    results = journal.load() if journal is not None else {}
+    todo    = [i for i in runs if i not in results]
+
+    def store(i, counts):
+        results[i] = counts
+        if journal is not None:
+            journal.append(i, counts)
+
+    if pipeline is not None:
+        pipeline.run([(study, i) for i in todo], lambda job, counts: store(job[1], counts), workers=workers)
+    elif executor is not None:
+        futures = {executor.submit(_runSeed, study, i): i for i in todo}
+        for f in _futures.as_completed(futures):
+            store(futures[f], f.result())
+    elif workers is None or workers <= 1 or len(todo) <= 1:
+        for i in todo:
+            store(i, _runSeed(study, i))
+    else:
+        with _futures.ProcessPoolExecutor(max_workers=min(workers, len(todo)), initializer=_initWorker) as pool:
+            futures = {pool.submit(_runSeed, study, i): i for i in todo}
+            for f in _futures.as_completed(futures):
+                store(futures[f], f.result())
+
+    db = getattr(study, 'results', None)
+    if db is not None:
+        db.store(study, {i: results[i] for i in runs})
+
+    # return in the order of the seeds so the buffer is the same as a serial run
+    return [results[i] for i in runs]
+# end runSeeds (func)
+
+def absorbed(counts):
+    """
+    Fraction absorbed of one run from the counts returned by _runSeed.
+    """
+    if not counts[4] > 0:
+        raise ValueError("A run with no photons in front of the shielding (numBefore is {}) has no "
+                         "fraction absorbed".format(counts[4]))
+    return 1-(counts[5]/counts[4])
+# end absorbed (func)
+
+def runUntil(study, target_err, min_runs=5, max_runs=30, workers=1, journal=None, executor=None, pipeline=None):
+    """
+    Perform runs 0, 1, 2, ... until the standard error on the mean fraction absorbed (on the
+    pooled fraction if study.pooled is set) is at most 'target_err', or 'max_runs' is reached.
+    At least 'min_runs' are always performed so the spread of the runs is known before stopping.
+
+    The runs are performed in batches of 'workers' (also with an executor or pipeline) and the
+    results are returned in seed order, the number of runs used is the length of the list.
+    """
+    runs  = []
+    stats = _countStatistics.runStatistics()
+    step  = max(1, workers or 1)
+    while len(runs) < max_runs:
+        n     = len(runs)
+        batch = max(step, min_runs-n)
+        batch = min(batch, max_runs-n)
+        new   = runSeeds(study, range(n, n+batch), workers=workers, journal=journal, executor=executor, pipeline=pipeline)
+        stats.merge(_countStatistics.runStatistics.fromRuns(new, start=n))
+        runs += new
+
+        if len(runs) >= min_runs:
+            err = stats.pooledError()[-1] if getattr(study, 'pooled', False) else stats.fractions()[1][-1]
+            if err <= target_err:
+                break
+    return runs
+# end runUntil (func)
@@ -0,0 +1,256 @@
+"""
+Record the photons entering the shielding once and replay them for every material and thickness.
+
+Every job of a scan tracks the 50 GeV electrons through the bends with
+synchrotron radiation again although only the shielding differs. With a
+photonBank this is split in two stages:
+
+1. record: the lattice in front of the shielding (genGMAD(upstream=True), the
+   shielding removed and the drift in front of it at full length) is run once
+   per seed and the photons at the sampler in front of the shielding are saved
+   as '<bank>/<seed>.npy' (columns x, xp, y, yp, zp, energy) which can be opened
+   memory-mapped.
+
+2. replay: with study.bank set genGMAD() only writes a short drift and the
+   shielding, the beam is the forward photons of the bank read by bdsim as a
+   userfile distribution. As the shielding of thickness t starts t before the
+   recording plane the photons are drifted back in straight lines to the start
+   of the replay lattice.
+
+The upstream cost is paid once per seed of a campaign instead of once per
+material x thickness. Only photons are replayed, the electrons and other
+particles at the recording plane are not (the study only counts photons). The
+counts of a replayed run are the same as the normal run apart from photons
+which reach the sampler in front of the shielding going backwards from further
+upstream.
+
+Example:
+
+>>> bank = photonBank("BANK/Dipole_half")
+>>> bank.recordAll(shieldingStudy("Pb", 10000, 30, 0.05, "run2b"), range(30), workers=8)
+>>> s = shieldingStudy("W", 10000, 30, 0.03, "run2b")
+>>> s.bank = bank
+>>> s.genGMAD()
+>>> value, err, val_range = s.runStudy()
+"""
+
+import concurrent.futures as _futures
+import copy as _copy
+import json as _json
+import os as _os
+
+import numpy as _np
+
+from . import biasing as _biasing
+from . import cache as _cache
+from . import monitor as _monitor
+from . import reduction as _reduction
+from . import slabs as _slabs
+
+# columns of a bank
+COLUMNS = ("x", "xp", "y", "yp", "zp", "energy")
+
+# length of the drift in front of the shielding in the replay lattice (metre)
+REPLAY_DRIFT = 0.001
+
+
+def _seed(i):
+    return (i*42)+23
+# end _seed (func)
+
+def upstreamStudy(study):
+    """
+    Copy of study which writes the lattice in front of the shielding to its own gmad files.
+    """
+    up = _copy.copy(study)
+    up.bank     = None
+    up._gmadKey = "{}-upstream".format(study._gmadKey or study._runKey)
+    return up
+# end upstreamStudy (func)
+
+class photonBank:
+    """
+    Directory of the recorded photons of each seed in front of the shielding of an IR.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        _os.makedirs(path, exist_ok=True)
+    # end __init__ (func)
+
+    def file(self, i):
+        """
+        Bank file of run i.
+        """
+        return _os.path.join(self.path, "{}.npy".format(_seed(i)))
+    # end file (func)
+
+    def _meta(self):
+        try:
+            with open(_os.path.join(self.path, "meta.json")) as f:
+                return _json.load(f)
+        except (OSError, ValueError):
+            return None
+    # end _meta (func)
+
+    def _checkMeta(self, up):
+        meta = {"ngenerate": up._ngenerate, "gmad": _cache.gmadHash(up._gmadFile()), "sampler": up._samplerNames[0]}
+        old  = self._meta()
+        if old is None:
+            with open(_os.path.join(self.path, "meta.json"), "w") as f:
+                _json.dump(meta, f)
+        elif old != meta:
+            raise ValueError("Bank {} was recorded with a different upstream lattice or ngenerate".format(self.path))
+    # end _checkMeta (func)
+
+    def key(self):
+        """
+        Description of the recorded upstream lattice, part of the cache key of replayed runs.
+        """
+        return _json.dumps(self._meta(), sort_keys=True)
+    # end key (func)
+
+    def has(self, i):
+        return _os.path.exists(self.file(i))
+    # end has (func)
+
+    def load(self, i):
+        """
+        Recorded photons of run i as a memory-mapped array with the columns COLUMNS.
+        """
+        return _np.load(self.file(i), mmap_mode='r')
+    # end load (func)
+
+    def record(self, study, i):
+        """
+        Run the lattice in front of the shielding of study for run i and save the photons at the
+        sampler in front of the shielding. genGMAD(upstream=True) of upstreamStudy(study) must
+        have been written (see recordAll).
+        """
+        up      = upstreamStudy(study)
+        seed    = _seed(i)
+        outfile = _os.path.join(_os.path.abspath(self.path), "upstream_{}".format(seed))
+        _monitor.runProcess(_monitor.bdsimCommand(up._gmadFile(), outfile, up._ngenerate, options=["--seed={}".format(seed)]))
+
+        name = up._samplerNames[0]
+        d    = _reduction.readSamplers("{}.root".format(outfile), [name], branches=COLUMNS+("partID",))[name].data
+        keep = d["partID"] == 22
+        bank = _np.stack([d[c][keep] for c in COLUMNS], axis=1).astype(_np.float64)
+
+        tmp = self.file(i)[:-len(".npy")]+".tmp.npy"
+        _np.save(tmp, bank)
+        _os.replace(tmp, self.file(i))
+        _os.remove("{}.root".format(outfile))
+    # end record (func)
+
+    def recordAll(self, study, runs, workers=1):
+        """
+        Write the upstream gmad files of study and record every run not in the bank yet, on
+        'workers' processes.
+        """
+        up = upstreamStudy(study)
+        up.genGMAD(upstream=True)
+        self._checkMeta(up)
+
+        runs = [i for i in runs if not self.has(i)]
+        if workers <= 1:
+            for i in runs:
+                self.record(study, i)
+            return
+        from . import parallel as _parallel
+        with _futures.ProcessPoolExecutor(max_workers=workers, initializer=_parallel._initWorker) as pool:
+            for f in _futures.as_completed([pool.submit(self.record, study, i) for i in runs]):
+                f.result()
+    # end recordAll (func)
+
+    def replayFile(self, i, distance):
+        """
+        Write the forward photons of run i drifted back by 'distance' (metre) as a bdsim userfile
+        (x, xp, y, yp, E) and return its path and the number of photons. The file is only written
+        once for each distance.
+        """
+        b    = self.load(i)
+        fwd  = b[b[:, 4] > 0]
+        path = _os.path.join(_os.path.abspath(self.path), "{}-{:g}m.dat".format(_seed(i), distance))
+        if not _os.path.exists(path):
+            x   = fwd[:, 0] - (distance*fwd[:, 1]/fwd[:, 4])
+            y   = fwd[:, 2] - (distance*fwd[:, 3]/fwd[:, 4])
+            tmp = "{}.{}.tmp".format(path, _os.getpid())
+            _np.savetxt(tmp, _np.stack([x, fwd[:, 1], y, fwd[:, 3], fwd[:, 5]], axis=1), fmt="%.9e")
+            _os.replace(tmp, path)
+        return path, len(fwd)
+    # end replayFile (func)
+
+# end photonBank (class)
+
+def genReplayGMAD(study):
+    """
+    Write the replay lattice of study, a drift named as the sampler in front of the shielding
+    followed by the shielding, with the photons of study.bank as the beam.
+    """
+    import pybdsim as _pybdsim
+    a = _pybdsim.Builder.Machine()
+    a.AddIncludePre("material_Concretes.gmad")
+    extra = "extra-{}-replay.gmad".format(study._gmadKey or study._runKey)
+    a.AddIncludePre(extra)
+
+    a.AddDrift(study._samplerNames[0], REPLAY_DRIFT)
+    name = study._samplerNames[1].rsplit("_", 1)[0]
+    cols = _slabs.addCollimator(a, name, study._thickness, study._colMat, study.eAperture, study.pAperture, study.sep, study._colPieces, nslabs=study.slabs, bias=_biasing.biasName(study.bias))
+    f = open(study._path("GMAD", extra), "w")
+    f.write('\n'.join(_biasing.definitions(study.bias)+cols))
+    f.close()
+    a.AddSampler('all')
+
+    # the file of each seed is given on the command line, see replayRun
+    b = _pybdsim.Beam.Beam(particle="gamma",
+                           energy=1,
+                           distrtype="userfile",
+                           distrFile='"{}"'.format(study.bank.file(0)),
+                           distrFileFormat='"x[m]:xp[rad]:y[m]:yp[rad]:E[GeV]"')
+    a.AddBeam(b)
+
+    # the primaries are photons so synchrotron radiation is not needed
+    o = _pybdsim.Options.Options(magnetGeometryType='"none"',
+                                 physicsList='"em"',
+                                 beampipeMaterial='"Cu"',
+                                 apertureType='"elliptical"',
+                                 aper1=0.5,
+                                 aper2=0.3,
+                                 horizontalWidth=1.05,
+                                 worldMaterial='"vacuum"',
+                                 maximumStepLength=0.1)
+    a.AddOptions(o)
+    a.Write(study._gmadFile()[:-len(".gmad")])
+# end genReplayGMAD (func)
+
+def replayFiles(study, i, attempt=0, executable="bdsim"):
+    """
+    Seed, bdsim command, output file and number of photons of the replay of run i through the
+    shielding of study, writing the beam file of the run if needed. A retried run (attempt > 0,
+    see pipeline.py) writes to a new output file.
+    """
+    seed          = _seed(i)
+    path, nphoton = study.bank.replayFile(i, study._thickness+REPLAY_DRIFT)
+    retry         = "_retry{}".format(attempt) if attempt else ""
+    outfile       = "{}/{}-{}m_replay_{}{}".format(study._dataDir(), study._colMat, study._thickness, seed, retry)
+    cmd           = _monitor.bdsimCommand(study._gmadFile(), outfile, nphoton,
+                                          options=["--seed={}".format(seed), "--distrFile={}".format(path)],
+                                          executable=executable)
+    return seed, cmd, "{}.root".format(outfile), nphoton
+# end replayFiles (func)
+
+def replayRun(study, i):
+    """
+    Replay the bank of run i through the shielding of study and return the counts of the run
+    (see reduction.reduceRun).
+    """
+    seed, cmd, output, nphoton = replayFiles(study, i)
+    with _monitor.stage(study, "bdsim", seed, files=[output], events=nphoton) as event:
+        _monitor.runProcess(cmd, event)
+    with _monitor.stage(study, "reduce", seed, events=nphoton) as event:
+        counts = _reduction.reduceRun(study, output)
+        event["photons"] = counts[4]
+    study._cleanup(output)
+    return counts
+# end replayRun (func)
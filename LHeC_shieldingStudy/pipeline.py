@@ -0,0 +1,269 @@
+"""
+Run the seeds of a study with asyncio, with timeouts, retries and the stages of
+consecutive seeds overlapping.
+
+_runSeed() runs bdsim, rebdsim and Data.Load strictly in turn and without a
+timeout, so a hung Geant4 job stalls the whole study and a crashed one raises
+and the runs already done are lost. stagePipeline runs the same stages of
+every seed as a coroutine:
+
+- bdsim and rebdsim are subprocesses whose exit is awaited on the event loop
+  (runProcess), at most 'workers' simulations and 'reducers' rebdsim jobs run
+  at once and a stage running longer than its timeout is killed,
+- the output of bdsim and rebdsim is checked to be a complete ROOT file (the end
+  recorded in its header matches its size, see rootFileComplete),
+- the load or in-process reduction of a seed runs on a thread while the next
+  seeds are simulated, so the cores are not idle while a file is read,
+- a failed seed is retried (up to 'retries' times) writing to new files, the
+  other seeds carry on and the seeds which still fail are reported together at
+  the end, after every other run was stored (and journaled with checkpoint).
+
+The output of each bdsim and rebdsim job is written next to its file as .log,
+the ROOT files of a run are removed once it is counted unless study.keep is set
+(a failed attempt leaves its files).
+Studies replaying a photonBank run the replay bdsim the same way, with its
+timeout, and reduce its output on the thread.
+
+asyncio.create_subprocess_exec reaps its children with waitpid, which loses
+their resource usage, so the processes are started with subprocess.Popen and
+their exit is awaited on a pidfd (os.pidfd_open, Linux) registered with the
+loop, or by polling where there is none. They are reaped with os.wait4 so the
+monitor events of each stage have the usage of its own process.
+
+Example:
+
+>>> p = stagePipeline(timeouts={"bdsim": 3600, "rebdsim": 600}, retries=2)
+>>> value, err, val_range = s.runStudy(workers=16, pipeline=p, checkpoint=True)
+"""
+
+import asyncio as _asyncio
+import concurrent.futures as _futures
+import functools as _functools
+import os as _os
+import struct as _struct
+import subprocess as _subprocess
+
+from . import cache as _cache
+from . import monitor as _monitor
+from . import phaseSpace as _phaseSpace
+from . import reduction as _reduction
+
+# interval (s) to poll for the exit of a process where there is no os.pidfd_open
+POLL = 0.05
+
+
+def rootFileComplete(path):
+    """
+    Whether 'path' is a ROOT file which was closed, i.e. the end of the file recorded in its
+    header (fEND) is its size. A file cut short by a crash or a killed job is not complete.
+    """
+    try:
+        size = _os.path.getsize(path)
+        with open(path, "rb") as f:
+            head = f.read(20)
+    except OSError:
+        return False
+    if len(head) < 20 or head[:4] != b"root":
+        return False
+    version = _struct.unpack(">i", head[4:8])[0]
+    end     = _struct.unpack(">q", head[12:20])[0] if version >= 1000000 else _struct.unpack(">i", head[12:16])[0]
+    return end == size
+# end rootFileComplete (func)
+
+async def _exited(pid):
+    """
+    Wait until the child process pid has exited, without reaping it.
+    """
+    try:
+        fd = _os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        # no pidfd, poll whether the process can be reaped
+        while _os.waitid(_os.P_PID, pid, _os.WEXITED | _os.WNOHANG | _os.WNOWAIT) is None:
+            await _asyncio.sleep(POLL)
+        return
+    loop = _asyncio.get_running_loop()
+    done = loop.create_future()
+    loop.add_reader(fd, lambda: done.done() or done.set_result(None))
+    try:
+        await done
+    finally:
+        loop.remove_reader(fd)
+        _os.close(fd)
+# end _exited (func)
+
+async def runProcess(cmd, event=None, stdout=None, timeout=None):
+    """
+    Coroutine running cmd as a child process, as monitor.runProcess, and returning its exit
+    status. A process still running after 'timeout' seconds is killed and
+    subprocess.TimeoutExpired raised.
+    """
+    proc   = _subprocess.Popen(cmd, stdout=stdout, stderr=None if stdout is None else _subprocess.STDOUT)
+    killed = False
+    try:
+        try:
+            await _asyncio.wait_for(_exited(proc.pid), timeout)
+        except _asyncio.TimeoutError:
+            killed = True
+            proc.kill()
+    except BaseException:
+        # cancelled, the process must not outlive its stage
+        proc.kill()
+        raise
+    finally:
+        # the usage of this process alone, reaped here so Popen must not wait for it again
+        _, status, usage = _os.wait4(proc.pid, 0)
+        proc.returncode  = _os.waitstatus_to_exitcode(status)
+        _monitor.addUsage(event, usage)
+    if killed:
+        raise _subprocess.TimeoutExpired(cmd, timeout)
+    return proc.returncode
+# end runProcess (func)
+
+class stagePipeline:
+    """
+    Runner of the seeds of studies with the stages as coroutines (see the module doc).
+    'timeouts' is a dict of stage ("bdsim", "rebdsim") -> seconds, 'reducers' the number of
+    rebdsim jobs at once (default the number of workers) and 'bdsim'/'rebdsim' the executables.
+    """
+
+    def __init__(self, timeouts=None, retries=2, reducers=None, bdsim="bdsim", rebdsim="rebdsim"):
+        self.timeouts = dict(timeouts or {})
+        self.retries  = retries
+        self.reducers = reducers
+        self.bdsim    = bdsim
+        self.rebdsim  = rebdsim
+    # end __init__ (func)
+
+    async def _exec(self, study, stage, seed, cmd, output, events=None):
+        """
+        Run cmd as stage of seed, its output goes to output.log. Raise if it fails, times out or
+        does not leave a complete ROOT file 'output'.
+        """
+        timeout = self.timeouts.get(stage)
+        events  = study._ngenerate if events is None else events
+        with _monitor.stage(study, stage, seed, files=[output], events=events) as event:
+            with open(output+".log", "w") as log:
+                try:
+                    status = await runProcess(cmd, event, stdout=log, timeout=timeout)
+                except _subprocess.TimeoutExpired:
+                    raise RuntimeError("{} of seed {} timed out after {} s, see {}.log".format(stage, seed, timeout, output))
+        if status != 0:
+            raise RuntimeError("{} of seed {} exited with status {}, see {}.log".format(stage, seed, status, output))
+        if not rootFileComplete(output):
+            raise RuntimeError("{} of seed {} left an incomplete file {}".format(stage, seed, output))
+    # end _exec (func)
+
+    async def _onThread(self, study, stage, seed, fn, *args, events=None):
+        events = study._ngenerate if events is None else events
+        with _monitor.stage(study, stage, seed, events=events) as event:
+            counts = await _asyncio.get_running_loop().run_in_executor(self._thread, fn, *args)
+            event["photons"] = counts[4]
+        return counts
+    # end _onThread (func)
+
+    async def _replay(self, study, i, attempt):
+        # the beam file of the run is written on the thread, it reads the bank
+        loop = _asyncio.get_running_loop()
+        seed, cmd, output, nphoton = await loop.run_in_executor(self._thread, _functools.partial(
+            _phaseSpace.replayFiles, study, i, attempt, executable=self.bdsim))
+
+        async with self._sims:
+            await self._exec(study, "bdsim", seed, cmd, output, events=nphoton)
+        counts = await self._onThread(study, "reduce", seed, _reduction.reduceRun, study, output, events=nphoton)
+        study._cleanup(output)
+        return counts
+    # end _replay (func)
+
+    async def _attempt(self, study, i, attempt):
+        if study.bank is not None:
+            # only the shielding is simulated, see phaseSpace.py
+            return await self._replay(study, i, attempt)
+
+        seed, outfile, tmpfile = study._runFiles(i, attempt)
+        output = "{}.root".format(outfile)
+
+        # the next seed starts its simulation as soon as this one is released
+        async with self._sims:
+            await self._exec(study, "bdsim", seed, _monitor.bdsimCommand(study._gmadFile(), outfile, study._ngenerate,
+                                                                          options=["--seed={}".format(seed)],
+                                                                          executable=self.bdsim), output)
+
+        if study._reduceInProcess():
+            counts = await self._onThread(study, "reduce", seed, _reduction.reduceRun, study, output)
+            study._cleanup(output)
+            return counts
+
+        async with self._rebdsims:
+            await self._exec(study, "rebdsim", seed, _monitor.rebdsimCommand(study._rebdsimConfig(), output, tmpfile,
+                                                                            executable=self.rebdsim), tmpfile)
+        counts = await self._onThread(study, "load", seed, study._loadCounts, tmpfile)
+        study._cleanup(output, tmpfile)
+        return counts
+    # end _attempt (func)
+
+    async def _runJob(self, study, i):
+        """
+        Counts of run i of study, from its cache if it has one, retrying a failed run.
+        """
+        cache = getattr(study, "_cache", None)
+        key   = _cache.runKey(study, i) if cache is not None else None
+        if key is not None:
+            counts = cache.get(key)
+            if counts is not None:
+                return counts
+
+        errors = []
+        for attempt in range(self.retries+1):
+            try:
+                counts = await self._attempt(study, i, attempt)
+                break
+            except Exception as e:
+                errors.append(e)
+        else:
+            raise RuntimeError("; ".join(str(e) for e in errors))
+
+        if key is not None:
+            cache.put(key, counts)
+        return counts
+    # end _runJob (func)
+
+    async def _runAll(self, jobs, store, workers):
+        self._sims     = _asyncio.Semaphore(workers)
+        self._rebdsims = _asyncio.Semaphore(self.reducers or workers)
+        failed = []
+
+        async def one(job):
+            try:
+                counts = await self._runJob(job[0], job[1])
+            except Exception as e:
+                failed.append((job, e))
+                return
+            store(job, counts)
+
+        with _futures.ThreadPoolExecutor(max_workers=1) as thread:
+            # ROOT and the reduction are used from a single thread
+            self._thread = thread
+            await _asyncio.gather(*[one(job) for job in jobs])
+        if failed:
+            raise RuntimeError("{} of {} runs failed after {} attempts:\n{}".format(
+                len(failed), len(jobs), self.retries+1,
+                "\n".join("run {} of {}: {}".format(job[1], job[0]._colMat, e) for job, e in failed)))
+    # end _runAll (func)
+
+    def run(self, jobs, store, workers=1):
+        """
+        Perform the jobs, a list of (study, run index, ...), calling store(job, counts) as each one
+        finishes. Raise once every job is done if any of them failed on every attempt.
+        """
+        jobs    = list(jobs)
+        workers = max(1, workers or 1)
+        try:
+            _asyncio.get_running_loop()
+        except RuntimeError:
+            return _asyncio.run(self._runAll(jobs, store, workers))
+        # already inside an event loop (e.g. a notebook), use a loop of our own on a thread
+        with _futures.ThreadPoolExecutor(max_workers=1) as t:
+            return t.submit(_asyncio.run, self._runAll(jobs, store, workers)).result()
+    # end run (func)
+
+# end stagePipeline (class)
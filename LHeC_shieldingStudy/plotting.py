@@ -0,0 +1,193 @@
+"""
+Declarative figures of the fraction absorbed against thickness, rendered in parallel.
+
+The genPlots scripts read the same runData csv several times (once per figure)
+and repeat a block of code for every material. Here each dataset, the points of
+one material of one IR, is read once into a cache (memoised on the file and its
+modification time) from either
+
+- the runData csv 'DATA/<runKey>/<material>_runData.csv' (duplicated headers and
+  rows of appended reruns are dropped, the last row of a thickness is kept), or
+- a results.resultsDB when the figure has a 'source' ending in '.sqlite'
+
+and a figure is only a dict describing its panels:
+
+    file        output file (pdf)
+    runKey      IR of the data (the DATA/<runKey> directory or the ir in the database)
+    source      (optional) sqlite file of a results.resultsDB instead of the csv files
+    size        (width, height) in inches
+    grid        (rows, cols) of panels, default one panel per entry of 'panels'
+    panels      list of dicts with 'materials' and optional title, xlim, ylim, xticks,
+                xlabel, ylabel, legend (kwargs of Axes.legend)
+    errorbars   draw the standard error of the fraction absorbed, default True
+    styles      (optional) material -> dict(fmt, label, markersize, ...) replacing STYLES
+    legend      (optional) kwargs of Figure.legend
+    style       (optional) matplotlib style(s) used for the figure
+    tight       call tight_layout before saving, default True
+
+renderAll() loads every dataset needed by the figures once and renders each
+figure on a pool of processes, the figures are independent so a full report of
+all IRs and materials takes about as long as the slowest figure.
+
+Example:
+
+>>> figs = [{"file": "Dipole_half_1.pdf", "runKey": "Dipole_half", "size": (2.5, 3),
+...          "panels": [{"materials": ["Cu", "Pb", "W"], "xlim": [99, 100.01]}],
+...          "legend": {"loc": "upper left"}}]
+>>> renderAll(figs, workers=8)
+"""
+
+import concurrent.futures as _futures
+import functools as _functools
+import os as _os
+
+import numpy as _np
+
+# marker and label of each material
+STYLES = {"Cu"             : {"fmt": ".r", "label": "Copper"},
+          "Pb"             : {"fmt": ".k", "label": "Lead"},
+          "W"              : {"fmt": ".c", "label": "Tungsten"},
+          "Fe"             : {"fmt": ".m", "label": "Iron"},
+          "steelMagnetite" : {"fmt": ".g", "label": "Steel magnetite"},
+          "bariteConcrete" : {"fmt": ".b", "label": "Barite"}}
+
+
+def _mtime(path):
+    try:
+        return max(_os.stat(p).st_mtime_ns for p in [path, path+"-wal"] if _os.path.exists(p))
+    except ValueError:
+        raise FileNotFoundError(path)
+# end _mtime (func)
+
+@_functools.lru_cache(maxsize=None)
+def _loadCSV(path, mtime):
+    with open(path) as f:
+        lines = f.read().splitlines()
+    header = lines[0].split(",")
+    rows   = {}
+    for line in lines[1:]:
+        cells = line.split(",")
+        try:
+            values = [float(c) for c in cells]
+        except ValueError:
+            continue        # header of an appended rerun
+        rows[values[0]] = values
+    data = _np.array([rows[t] for t in sorted(rows)], dtype=float).reshape(-1, len(header))
+    out  = {name: data[:, j] for j, name in enumerate(header) if name}
+    out.update({"thickness": data[:, 0], "value": data[:, 1], "err": data[:, 2]})
+    return out
+# end _loadCSV (func)
+
+@_functools.lru_cache(maxsize=None)
+def _loadDB(path, mtime, runKey, material):
+    from . import results as _results
+    return _results.resultsDB(path).points(ir=runKey, material=material)
+# end _loadDB (func)
+
+def readRunData(path):
+    """
+    Columns of a runData csv as a dict of arrays, one row per thickness (the last row of a
+    thickness appended by a rerun, repeated headers are skipped) with 'thickness', 'value' and
+    'err' as well as the named columns. The file is only read again if it changes.
+    """
+    path = _os.path.abspath(path)
+    return _loadCSV(path, _mtime(path))
+# end readRunData (func)
+
+def dataset(runKey, material, source=None, root="."):
+    """
+    Points of 'material' of the IR 'runKey' as a dict of arrays with at least 'thickness',
+    'value' (fraction absorbed) and 'err', read from the runData csv under 'root' or from
+    the resultsDB 'source'. Each file is only read again if it changes.
+    """
+    if source is not None and source.endswith(".sqlite"):
+        path = _os.path.abspath(_os.path.join(root, source))
+        return _loadDB(path, _mtime(path), runKey, material)
+    return readRunData(_os.path.join(root, "DATA", runKey, "{}_runData.csv".format(material)))
+# end dataset (func)
+
+def _datasets(figure):
+    return set((figure["runKey"], m, figure.get("source")) for p in figure["panels"] for m in p["materials"])
+# end _datasets (func)
+
+def render(figure, data=None, root="."):
+    """
+    Draw one figure (see the module doc) and save it, 'data' is a dict of (runKey, material,
+    source) -> dataset, missing datasets are loaded. Return the path of the file.
+    """
+    from matplotlib import style as _style
+    from matplotlib.figure import Figure as _Figure
+
+    data   = {} if data is None else data
+    styles = dict(STYLES, **figure.get("styles", {}))
+    panels = figure["panels"]
+    rows, cols = figure.get("grid", (len(panels), 1))
+
+    with _style.context(figure.get("style", [])):
+        fig = _Figure(figsize=figure.get("size"))
+        axs = _np.atleast_1d(fig.subplots(rows, cols, squeeze=False)).ravel()
+        for ax, panel in zip(axs, panels):
+            for m in panel["materials"]:
+                key = (figure["runKey"], m, figure.get("source"))
+                d   = data[key] if key in data else dataset(*key, root=root)
+                st  = dict({"fmt": ".k", "label": m, "markersize": 5}, **styles.get(m, {}))
+                if figure.get("errorbars", True):
+                    ax.errorbar(d["value"]*100, d["thickness"]*100, xerr=d["err"]*100, capsize=1.2, elinewidth=0.7, **st)
+                else:
+                    fmt = st.pop("fmt")
+                    ax.plot(d["value"]*100, d["thickness"]*100, fmt, **st)
+            if "xticks" in panel:
+                ax.set_xticks(panel["xticks"])
+            if "xlim" in panel:
+                ax.set_xlim(panel["xlim"])
+            if "ylim" in panel:
+                ax.set_ylim(panel["ylim"])
+            ax.set_xlabel(panel.get("xlabel", "% absorbed"))
+            ax.set_ylabel(panel.get("ylabel", "Material thickness [cm]"))
+            if "title" in panel:
+                ax.set_title(panel["title"])
+            if "legend" in panel:
+                ax.legend(**panel["legend"])
+        if "legend" in figure:
+            fig.legend(**dict({"frameon": True, "framealpha": 1, "fancybox": False}, **figure["legend"]))
+        if figure.get("tight", True):
+            fig.tight_layout()
+        path = _os.path.join(root, figure["file"])
+        fig.savefig(path, format=_os.path.splitext(path)[1][1:] or "pdf")
+    return path
+# end render (func)
+
+def renderAll(figures, workers=None, root="."):
+    """
+    Load each dataset used by the figures once and render every figure, on 'workers'
+    processes (default the cpu count). Return the paths of the files in the order of figures.
+    """
+    figures = list(figures)
+    data    = {k: dataset(*k, root=root) for k in set(k for f in figures for k in _datasets(f))}
+    workers = min(workers or _os.cpu_count() or 1, len(figures))
+    if workers <= 1:
+        return [render(f, data, root) for f in figures]
+    with _futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render, f, {k: data[k] for k in _datasets(f)}, root) for f in figures]
+        return [f.result() for f in futures]
+# end renderAll (func)
+
+def reportFigures(runKeys, materials, source=None, outdir="."):
+    """
+    Figures of a standard report: for every IR one panel per material and one figure with all
+    the materials together.
+    """
+    figures = []
+    for r in runKeys:
+        figures.append({"file"   : _os.path.join(outdir, "{}_materials.pdf".format(r)),
+                        "runKey" : r,
+                        "source" : source,
+                        "size"   : (2.5, 2*len(materials)),
+                        "panels" : [{"materials": [m], "title": STYLES.get(m, {}).get("label", m)} for m in materials]})
+        figures.append({"file"   : _os.path.join(outdir, "{}_all.pdf".format(r)),
+                        "runKey" : r,
+                        "source" : source,
+                        "size"   : (3, 3),
+                        "panels" : [{"materials": list(materials), "legend": {"loc": "best"}}]})
+    return figures
+# end reportFigures (func)
@@ -8,14 +8,23 @@ study of the LHeC IR regarding synchrotron radiation shielding.
 This lattice setup is for the optimised IR (Full).
 Change seperation when other IR is used (self.sep).
 
-TODO:   Add a option to write data at end of study, can prevent complete data
-        loss when a crash occurs.
+Use runStudy(checkpoint=True) to journal each finished run, a study which crashed
+can then be resumed without losing the runs already completed.
 """
 
 import numpy as _np
-from numpy.core.fromnumeric import std
-import pybdsim as _pybdsim
+from . import parallel as _parallel
+from . import journal as _journal
+from . import regions as _regions
+from . import reduction as _reduction
+from . import workspace as _workspace
+from . import slabs as _slabs
+from . import phaseSpace as _phaseSpace
+from . import biasing as _biasing
+from . import countStatistics as _countStatistics
+from . import monitor as _monitor
 import sys
+import os as _os
 
 class shieldingStudy:
     """
@@ -27,31 +36,59 @@ class shieldingStudy:
     >>> s.genGMAD()
     >>> value, err = s.runStudy()
 
+    The seeds can be spread over several processes with runStudy(workers=N).
+
+    Give the study a workspace (a directory or True for the default) to keep its gmad files,
+    analysis config and temporary files seperate from any other study running at the same time.
+
     Optional parameters can be set afterwards like changing the electron aperture
     and the proton aperture including the seperation of the two beam centroids.  
+    Setting 'slabs' splits the shielding into thin slabs so getCurve() gives the fraction
+    absorbed at every slab thickness from the same runs.
+    Setting 'bank' replays recorded photons into the shielding instead of simulating the
+    whole lattice for every run.
+    Setting 'bias' reduces the photon cross-sections in the shielding and counts weighted
+    photons, for thick shielding where only a few photons get through.
+    Setting 'keep' keeps the bdsim and rebdsim output of every run, by default they are
+    removed once the counts of the run are read.
     """
 
-    def __init__(self, colMat, ngenerate, nruns, thickness, runKey, extraShielding=False, extraT=0):
+    def __init__(self, colMat, ngenerate, nruns, thickness, runKey, extraShielding=False, extraT=0, workspace=None):
         self._colMat    = colMat        # (the material of the shielding being studied)
         self._ngenerate = ngenerate     # (num primary particles i.e. eletrons)
         self._nruns     = nruns         # (num iterations)
         self._thickness = thickness     # metre
         self._buffer    = None          # (buffer containing the percentage from each run)
+        self._nrunsUsed = 0             # (num runs performed by the last study)
         self._runKey    = runKey
+        self._root      = _os.getcwd()  # (directory the DATA tree is in)
+        self._workspace = None          # (directory of the gmad, rebdsim and tmp files of this study)
+        if workspace is not None:
+            path = _workspace.defaultPath(runKey, colMat, thickness) if workspace is True else workspace
+            self._workspace = _workspace.setup(path, root=self._root)
+        self._cache     = None          # (cache.resultCache of previous runs)
+        self._rebdsim   = True          # (reduce each run with rebdsim, otherwise in this process)
+        self._gmadKey   = None          # (name given to the generated gmad files)
 
         self._seed     = 12             # a particular seed, for reproducability
         self.eAperture = 0.00015        # metre (half x-y size)
         self.pAperture = 0.02           # metre (half x-y size)
         self.sep       = 0.106105       # metre (seperation of beam centroid)
+        self.slabs     = 1              # (num slabs the shielding is split into, see slabs.py)
+        self.bank      = None           # (phaseSpace.photonBank replayed into the shielding)
+        self.bias      = None           # (factor of the photon cross-sections in the shielding, see biasing.py)
+        self.pooled    = False          # (report the pooled fraction absorbed, see countStatistics.py)
+        self.monitor   = None           # (callable receiving the events of each stage of each run, see monitor.py)
+        self.results   = None           # (results.resultsDB the counts of every run are written to)
+        self.keep      = False          # (keep the bdsim and rebdsim output of every run)
+        self._colPieces = 3             # (num collimator pieces placed side by side)
+        self._samplerNames = ["dDRIFT50", "COL_END_0"]    # (samplers before and after the shielding)
         self._colNames = ["COL_END", "COL_BEND"]    # (names of collimaters)
         self._extra    = extraShielding
         self._extraT   = extraT
 
         # Storage for particular data
-        self._totalPhotons = []
-        self._eAperPhotons = []
-        self._pAperPhotons = []
-        self._zpPhotons    = []
+        self._stats        = None       # (countStatistics.runStatistics of the runs of the last study)
         
         ## Unfinished: store cut data to compare the data which is lost at each stage
         #self._cutDataBuffer = []
@@ -60,11 +97,26 @@ class shieldingStudy:
         self._aperBuffer    = []
     # end __init__ (func)
 
+    def _regions(self):
+        """
+        Aperture and collimator regions of this IR along x, see regions.apertureRegions.
+        """
+        return _regions.apertureRegions(self.eAperture, self.pAperture, self.sep, pieces=self._colPieces)
+    # end _regions (func)
+
+    def _slabSamplers(self):
+        """
+        Samplers after each slab of the shielding, the last is the sampler after the shielding.
+        """
+        return _slabs.slabNames(self._samplerNames[1], self.slabs)
+    # end _slabSamplers (func)
+
     def _storeZpCut(self, sampler, after=0, _partID=22, _xpos=None):
         """
         Store cut data to compare the data which is lost at each stage
         """
-        self._cutDataBuffer.append([_np.asarray(len(sampler.data['energy'][(sampler.data['partID']==_partID)&(sampler.data['zp']>=0)])), len(sampler.data['energy'][sampler.data['partID']==22])])
+        c = self._regions().count(sampler, _partID=_partID)[0]
+        self._cutDataBuffer.append([_np.asarray(c[_regions.FORWARD].sum()), c[_regions.FORWARD].sum()+c[_regions.BACKWARD].sum()])
     # end _storeCutData (func)
     
     def _getNum(self, sampler, _partID=22):
@@ -74,16 +126,10 @@ class shieldingStudy:
         By default what is returned is the number of photons at a sampler excluding photons in
         the electron or proton aperture.
         """
-        # Calc number of particles with _partID impinging between two apertures
-        num_1   = len(sampler.data['energy'][(sampler.data['partID']==_partID) 
-                                            &(sampler.data['zp']>=0)
-                                            &(sampler.data['x']>=self.eAperture)
-                                            &(sampler.data['x']<=(self.sep-self.pAperture))])
-        # Calc the rest of particles with _partID impinging beyond p aperture
-        num_2   = len(sampler.data['energy'][(sampler.data['partID']==_partID)
-                                            &(sampler.data['zp']>=0)
-                                            &(sampler.data['x']>=(self.sep+self.pAperture))])
-        return num_1+num_2 
+        # Count the particles with _partID impinging on the shielding, i.e. between the two
+        # apertures and beyond the p aperture, in a single pass
+        r = self._regions()
+        return int(r.shielded(r.count(sampler, _partID=_partID))[0])
     # end _getNum (func)
 
     def _getNumAper(self, sampler1, _partID=22, sampler2=None, studyAfter=False):
@@ -96,30 +142,56 @@ class shieldingStudy:
 
         'sampler2' is therefore the same type as 'sampler1' but for after the aperture. 
         """
-        # Calc number of particles with _partID passing through e aperture
-        eAper   = len(sampler1.data['energy'][(sampler1.data['partID']==_partID) 
-                                            &(sampler1.data['zp']>=0)
-                                            &(sampler1.data['x']<=self.eAperture)
-                                            &(sampler1.data['x']>=(-self.pAperture))])
-        # Calc the rest of particles with _partID passing through p aperture
-        pAper   = len(sampler1.data['energy'][(sampler1.data['partID']==_partID)
-                                            &(sampler1.data['zp']>=0)
-                                            &(sampler1.data['x']>=(self.sep-self.pAperture))
-                                            &(sampler1.data['x']<=(self.sep+self.pAperture))])
+        # Count the particles with _partID passing through the e and p apertures of both
+        # samplers in a single pass
+        r = self._regions()
+        samplers = [sampler1, sampler2] if studyAfter else [sampler1]
+        eAper, pAper = r.apertures(r.count(*samplers, _partID=_partID))
         if studyAfter: 
-            # Calc number of particles with _partID passing through e aperture
-            eAper_a = len(sampler2.data['energy'][(sampler2.data['partID']==_partID) 
-                                                &(sampler2.data['zp']>=0)
-                                                &(sampler2.data['x']<=self.eAperture)
-                                                &(sampler2.data['x']>=(-self.pAperture))])
-            # Calc the rest of particles with _partID passing through p aperture
-            pAper_a = len(sampler2.data['energy'][(sampler2.data['partID']==_partID)
-                                                &(sampler2.data['zp']>=0)
-                                                &(sampler2.data['x']>=(self.sep-self.pAperture))
-                                                &(sampler2.data['x']<=(self.sep+self.pAperture))])
-            return [eAper, pAper, eAper_a, pAper_a]
+            return [int(eAper[0]), int(pAper[0]), int(eAper[1]), int(pAper[1])]
         else: 
-            return [eAper, pAper]
+            return [int(eAper[0]), int(pAper[0])]
+    # end _getNumAper (func)
+
+    def _gmadSuffix(self):
+        """
+        Suffix added to the generated gmad files, by default there is none ('GMAD/input.gmad').
+        """
+        return "" if self._gmadKey is None else "-{}".format(self._gmadKey)
+    # end _gmadSuffix (func)
+
+    def _path(self, *parts):
+        """
+        Path of a file of this study, inside the workspace if the study has one otherwise
+        relative to where python is run from.
+        """
+        if self._workspace is None:
+            return "/".join(parts)
+        return _os.path.join(self._workspace, *parts)
+    # end _path (func)
+
+    def _rebdsimConfig(self):
+        """
+        rebdsim analysis config used by this study.
+        """
+        return self._path("rebdsim-input.txt")
+    # end _rebdsimConfig (func)
+
+    def _gmadFile(self):
+        """
+        Main gmad file of this study as written by genGMAD().
+        """
+        return self._path('GMAD', 'input{}.gmad'.format(self._gmadSuffix()))
+    # end _gmadFile (func)
+
+    def _dataDir(self):
+        """
+        Directory the bdsim output of this study is written to.
+        """
+        if self._workspace is None:
+            return 'DATA/run_{}_{}'.format(self._colMat,self._runKey)
+        return _os.path.join(self._root, 'DATA', 'run_{}_{}'.format(self._colMat,self._runKey))
+    # end _dataDir (func)
 
     def _addExtraShielding(self, a):
         sep = 0.029
@@ -128,11 +200,15 @@ class shieldingStudy:
         width = (sep-eAp)*2 # width of first collimater so that proton aperture is in correct place
         a.AddRCol('{}_0'.format(self._colNames[1]), self._extraT, material=self._colMat, xsize=pAp, ysize=pAp, horizontalWidth=width, offsetX=((width/2)+eAp))
 
-    def genGMAD(self):
+    def genGMAD(self, upstream=False):
         """
         Generate a set of GMAD files to the particular specification of this study as defined
         by the passed parameters when intiating this instance.
 
+        With 'upstream' only the lattice in front of the shielding is written (the drift in
+        front of it at full length) to record the photons of a phaseSpace.photonBank. If the
+        study has a bank only the shielding is written with the bank as the beam.
+
         This function is important to change when studying a different IR. 
 
         The shielding material parameters are calculated based on the aperture sizes.
@@ -141,6 +217,11 @@ class shieldingStudy:
                 resulting in no need to adapt this function.
                 this could be more streamlined and allow for much more studies
         """
+        import pybdsim as _pybdsim
+
+        if self.bank is not None and not upstream:
+            return _phaseSpace.genReplayGMAD(self)
+        thickness = 0 if upstream else self._thickness
 
         a = _pybdsim.Builder.Machine()
 
@@ -150,7 +231,7 @@ class shieldingStudy:
         # the definition of extra externally placed collimater which ensures the whole synchrotron 
         # fan is incident on the material.
         a.AddIncludePre("material_Concretes.gmad")
-        a.AddIncludePre("extra.gmad")
+        a.AddIncludePre("extra{}.gmad".format(self._gmadSuffix()))
 
         # Start definition of lattice
         a.AddDrift('uDRIFT50', 0.5)
@@ -168,19 +249,16 @@ class shieldingStudy:
         a.AddDipole('dBEND_QY', angle=0.002072436, length=2.1771258, k1=-18.36839/166.7778)  
         a.AddDrift('dDRIFT30_1', 0.3)
         a.AddDrift('dDRIFT_Q0', 1.871978)
-        a.AddDrift('dDRIFT50', 0.5-self._thickness)
+        a.AddDrift('dDRIFT50', 0.5-thickness)
 
         ##
         # Definitions and placements of the shielding material being studied.
         # Do not reccomend changing this unless required, the material placement is determined 
         # based in the definitions given at the start.
-        width = (self.sep-self.eAperture)*2 # width of first collimater so that proton aperture is in correct place
-        a.AddRCol('{}_0'.format(self._colNames[0]), self._thickness, material=self._colMat, xsize=self.pAperture, ysize=self.pAperture, horizontalWidth=width, offsetX=((width/2)+self.eAperture))
-        a.AddPlacement('{}_1_p'.format(self._colNames[0]), bdsimElement='"{}_1"'.format(self._colNames[0]), referenceElement='"{}_0"'.format(self._colNames[0]), x=((width/2)+width+self.eAperture))
-        a.AddPlacement('{}_2_p'.format(self._colNames[0]), bdsimElement='"{}_2"'.format(self._colNames[0]), referenceElement='"{}_0"'.format(self._colNames[0]), x=((width/2)+(width*2)+self.eAperture))
+        cols = [] if upstream else _slabs.addCollimator(a, self._colNames[0], self._thickness, self._colMat, self.eAperture, self.pAperture, self.sep, self._colPieces, nslabs=self.slabs, bias=_biasing.biasName(self.bias))
         # open the extra.gmad file and replace it with new definition with identical thickness and material
-        f = open("GMAD/extra.gmad", "w")
-        f.write('{}_1: rcol, horizontalWidth={}, l={}, material="{}", xsize=0.0, ysize=0.0;\n {}_2: rcol, horizontalWidth={}, l={}, material="{}", xsize=0.0, ysize=0.0;\n {}_1: rcol, horizontalWidth={}, l={}, material="{}", xsize=0.0, ysize=0.0;'.format(self._colNames[0],width,self._thickness, self._colMat,self._colNames[0],width,self._thickness, self._colMat, self._colNames[1],(0.029-0.005)*2,self._extraT, self._colMat))
+        f = open(self._path("GMAD", "extra{}.gmad".format(self._gmadSuffix())), "w")
+        f.write('\n '.join(([] if upstream else _biasing.definitions(self.bias))+cols+['{}_1: rcol, horizontalWidth={}, l={}, material="{}", xsize=0.0, ysize=0.0;'.format(self._colNames[1],(0.029-0.005)*2,self._extraT, self._colMat)]))
         f.close()
         ##
 
@@ -226,7 +304,7 @@ class shieldingStudy:
 
         # Path is relative to where run from so be careful these directories are created before 
         # the start of running, for example I have used the os package to ensure each run is in same place
-        a.Write('GMAD/input') # Write the gmad output to this location.
+        a.Write(self._path('GMAD', 'input{}'.format(self._gmadSuffix()))) # Write the gmad output to this location.
     # end genGMAD (func)
 
     def genRebdsim(self):
@@ -235,19 +313,133 @@ class shieldingStudy:
 
         See BDSIM docs for rebdsim examples and explanations. 
         """
-        f = open("rebdsim-input.txt", "w")
+        f = open(self._rebdsimConfig(), "w")
         lines = ["SimpleHistogram1D Event. NPhotons_dDRIFT50_cuts_1 {{100}} {{0:0.8}} dDRIFT50.x dDRIFT50.partID==22&dDRIFT50.zp>=0&dDRIFT50.x>={}&dDRIFT50.x<={}".format(self.eAperture, (self.sep-self.pAperture)), 
                 "\nSimpleHistogram1D Event. NPhotons_dDRIFT50_cuts_2 {{100}} {{0:0.8}} dDRIFT50.x dDRIFT50.partID==22&dDRIFT50.zp>=0&dDRIFT50.x>={}".format(self.sep+self.pAperture),
                 "\nSimpleHistogram1D Event. NPhotons_COL_END_0_cuts_1 {{100}} {{0:0.8}} COL_END_0.x COL_END_0.partID==22&COL_END_0.zp>=0&COL_END_0.x>={}&COL_END_0.x<={}".format(self.eAperture, (self.sep-self.pAperture)), 
                 "\nSimpleHistogram1D Event. NPhotons_COL_END_0_cuts_2 {{100}} {{0:0.8}} COL_END_0.x COL_END_0.partID==22&COL_END_0.zp>=0&COL_END_0.x>={}".format(self.sep+self.pAperture),
-                "\nSimpleHistogram1D Event. NPhotons_eAper {{100}} {{0:0.8}} dDRIFT50.x dDRIFT50.partID==22&dDRIFT50.zp>=0&dDRIFT50.x<={}&dDRIFT50.x>={}".format(self.eAperture, (-self.eAperture)),
-                "\nSimpleHistogram1D Event. NPhotons_pAper {{100}} {{0:0.8}} dDRIFT50.x dDRIFT50.partID==22&dDRIFT50.zp>=0&dDRIFT50.x>={}&dDRIFT50.x>={}".format(self.sep-self.pAperture, (self.sep+self.pAperture)),
+                "\nSimpleHistogram1D Event. NPhotons_eAper {{100}} {{0:0.8}} dDRIFT50.x dDRIFT50.partID==22&dDRIFT50.zp>=0&dDRIFT50.x<={}&dDRIFT50.x>={}".format(self.eAperture, (-self.pAperture)),
+                "\nSimpleHistogram1D Event. NPhotons_pAper {{100}} {{0:0.8}} dDRIFT50.x dDRIFT50.partID==22&dDRIFT50.zp>=0&dDRIFT50.x>={}&dDRIFT50.x<={}".format(self.sep-self.pAperture, (self.sep+self.pAperture)),
                 "\nSimpleHistogram1D Event. NPhotons_dDRIFT50_total {{100}} {{0:0.8}} dDRIFT50.x dDRIFT50.partID==22",
                 "\nSimpleHistogram1D Event. NPhotons_dDRIFT50_zp {{100}} {{0:0.8}} dDRIFT50.x dDRIFT50.partID==22&dDRIFT50.zp>=0"]
         f.writelines(lines)
         f.close()
 
-    def runStudy(self):
+    def _prepareRuns(self):
+        """
+        Prepare the files shared by every run of this study (the rebdsim analysis config).
+        """
+        if self._rebdsim:
+            self.genRebdsim()
+    # end _prepareRuns (func)
+
+    def _runFiles(self, i, attempt=0):
+        """
+        Seed, bdsim output (without .root) and rebdsim file of run number i, a retried run
+        (attempt > 0, see pipeline.py) writes to new files.
+        """
+        seed  = (i*42)+23
+        retry = "_retry{}".format(attempt) if attempt else ""
+
+        # Imprtant to make sure this directory exists where python being called from
+        outfile = '{}/{}-{}m_{}_{}'.format(self._dataDir(),self._colMat,self._thickness,self._runKey,seed)
+        tmpfile = self._path("tmp", "rebdsim-{}-{}-{}m-{}{}.root".format(self._runKey, self._colMat, self._thickness, seed, retry))
+        return seed, outfile+retry, tmpfile
+    # end _runFiles (func)
+
+    def _cleanup(self, *files):
+        # only the counts of a run are used (and cached or journaled), not its output files
+        if self.keep:
+            return
+        for f in files:
+            if _os.path.exists(f):
+                _os.remove(f)
+    # end _cleanup (func)
+
+    def _reduceInProcess(self):
+        # count the photons straight from the bdsim output, the slabs and weights are only counted here
+        return not self._rebdsim or self.slabs > 1 or self.bias is not None
+    # end _reduceInProcess (func)
+
+    def _loadCounts(self, tmpfile):
+        """
+        Counts [total, eAper, pAper, zp, numBefore, numAfter] of the histograms of a rebdsim file.
+        """
+        import pybdsim as _pybdsim
+        d = _pybdsim.Data.Load(tmpfile)
+        h = d.histogramspy
+
+        total = h['Event/SimpleHistograms/NPhotons_dDRIFT50_total'].entries
+        eAper = h['Event/SimpleHistograms/NPhotons_eAper'].entries
+        pAper = h['Event/SimpleHistograms/NPhotons_pAper'].entries
+        zp    = h['Event/SimpleHistograms/NPhotons_dDRIFT50_zp'].entries
+
+        numBefore = (h['Event/SimpleHistograms/NPhotons_dDRIFT50_cuts_1'].entries + h['Event/SimpleHistograms/NPhotons_dDRIFT50_cuts_2'].entries)
+        numAfter  = (h['Event/SimpleHistograms/NPhotons_COL_END_0_cuts_1'].entries + h['Event/SimpleHistograms/NPhotons_COL_END_0_cuts_2'].entries)
+        return [total, eAper, pAper, zp, numBefore, numAfter]
+    # end _loadCounts (func)
+
+    def _runSeed(self, i):
+        """
+        Run bdsim and rebdsim for run number i and return the photon counts of this run as
+        [total, eAper, pAper, zp, numBefore, numAfter].
+
+        Every seed writes its own output and rebdsim file so runs can be performed in parallel.
+        """
+        if self.bank is not None:
+            # only the shielding is simulated, see phaseSpace.py
+            return _phaseSpace.replayRun(self, i)
+
+        seed, outfile, tmpfile = self._runFiles(i)
+
+        runOptions = ["--seed={}".format(seed)]
+
+        # run bdsim
+        with _monitor.stage(self, "bdsim", seed, files=["{}.root".format(outfile)], events=self._ngenerate) as event:
+            _monitor.runProcess(_monitor.bdsimCommand(self._gmadFile(), outfile, self._ngenerate, options=runOptions), event)
+
+        if self._reduceInProcess():
+            with _monitor.stage(self, "reduce", seed, events=self._ngenerate) as event:
+                counts = _reduction.reduceRun(self, "{}.root".format(outfile))
+                event["photons"] = counts[4]
+            self._cleanup("{}.root".format(outfile))
+            return counts
+
+        # run rebdsim
+        with _monitor.stage(self, "rebdsim", seed, files=[tmpfile], events=self._ngenerate) as event:
+            _monitor.runProcess(_monitor.rebdsimCommand(self._rebdsimConfig(), "{}.root".format(outfile), tmpfile), event)
+
+        # load the bdsim data from this run
+        with _monitor.stage(self, "load", seed, events=self._ngenerate) as event:
+            counts = self._loadCounts(tmpfile)
+            event["photons"] = counts[4]
+        self._cleanup("{}.root".format(outfile), tmpfile)
+        return counts
+    # end _runSeed (func)
+
+    def _finishStudy(self, runs):
+        """
+        Accumulate the counts of each run (in seed order) and return the fraction absorbed, its
+        standard error and the range, as returned by runStudy().
+        """
+        self._stats     = _countStatistics.runStatistics.fromRuns(runs)
+        self._buffer    = [1-(counts[5]/counts[4]) for counts in runs]
+        self._nrunsUsed = self._stats.n
+
+        if self.pooled:
+            # photons of all runs together, the range is the exact one sigma interval
+            value      = self._stats.pooled()[-1]
+            err        = self._stats.pooledError()[-1]
+            val_range  = _np.asarray([b[-1] for b in self._stats.exact()])
+        else:
+            # mean of the runs and the standard error
+            mean, sem  = self._stats.fractions()
+            value, err = mean[-1], sem[-1]
+            val_range  = _np.asarray([b[-1] for b in self._stats.fractionRange()])
+        return value, err, val_range
+    # end _finishStudy (func)
+
+    def runStudy(self, workers=1, cache=None, checkpoint=False, target_err=None, min_runs=5, max_runs=None, rebdsim=True, executor=None, pipeline=None):
         """
         Runs the set study, must call genGMAD() before running (unless provided files manually).
         If providing manually the main gmad must be in the directory as 'GMAD/input.gmad'.
@@ -257,61 +449,82 @@ class shieldingStudy:
         
         Also returned is the standard error on the value. + the range as an array with two values
 
+        With self.pooled set the value is the fraction absorbed of the photons of all runs
+        together with the error of the pooled ratio and the exact one sigma interval as the
+        range instead of the mean of the runs (see countStatistics.py).
+
+        With self.monitor set every stage of every run sends an event with its wall, cpu and
+        child process time and peak memory (see monitor.py).
+
+        The seeds can be run in parallel by setting 'workers' to the number of processes to use,
+        the results are collected in seed order so they are identical to a serial run.
+        An 'executor' such as a batch.batchExecutor runs the seeds as a job array on a batch
+        cluster instead (see batch.py).
+        A pipeline.stagePipeline runs bdsim and rebdsim as subprocesses with timeouts and
+        retries, loading each run while the next ones are simulated (see pipeline.py).
+
+        Passing a cache.resultCache as 'cache' reuses the counts of any run which has already
+        been simulated with identical gmad files, seed, ngenerate and analysis cuts.
+
+        With 'checkpoint' each finished run is written to a journal next to the bdsim output,
+        running the study again skips the runs already in the journal which were made with the
+        same gmad files, analysis config and apertures.
+
+        If 'target_err' is given runs are performed until the standard error is at most
+        target_err (at least min_runs and at most max_runs, by default nruns) instead of always
+        doing nruns, getNumRuns() returns the number of runs which were used.
+
+        With rebdsim=False the samplers are read directly from the bdsim output and counted in
+        this process (see reduction.py) instead of running rebdsim on every run. The e and p
+        aperture counts follow _getNumAper() in both cases.
+
         TODO: Needs updating to study extra material
         """
-        self.genRebdsim()
-        _buffer = [] # buffer to store the percentage absorbed on each run 
-        for i in range(self._nruns):
-            # Imprtant to make sure this directory exists where python being called from
-            outfile = 'DATA/run_{}_{}/{}-{}m_{}'.format(self._colMat,self._runKey,self._colMat,self._thickness, self._runKey)
-
-            runOptions = "--seed={}".format((i*42)+23)
-
-            # run bdsim
-            _pybdsim.Run.Bdsim('GMAD/input.gmad', outfile, ngenerate=self._ngenerate, options=runOptions)
-
-            # run rebdsim
-            _pybdsim.Run.Rebdsim("rebdsim-input.txt", 'DATA/run_{}_{}/{}-{}m_{}.root'.format(self._colMat,self._runKey,self._colMat,self._thickness, self._runKey), "tmp/rebdsim-{}.root".format(self._runKey))
-  
-            # load the bdsim data from last run
-            d = _pybdsim.Data.Load("tmp/rebdsim-{}.root".format(self._runKey))
-
-            self._totalPhotons.append(d.histogramspy['Event/SimpleHistograms/NPhotons_dDRIFT50_total'].entries)
-            self._eAperPhotons.append(d.histogramspy['Event/SimpleHistograms/NPhotons_eAper'].entries)
-            self._pAperPhotons.append(d.histogramspy['Event/SimpleHistograms/NPhotons_pAper'].entries)
-            self._zpPhotons.append(d.histogramspy['Event/SimpleHistograms/NPhotons_dDRIFT50_zp'].entries)
-
-            numBefore = (d.histogramspy['Event/SimpleHistograms/NPhotons_dDRIFT50_cuts_1'].entries + d.histogramspy['Event/SimpleHistograms/NPhotons_dDRIFT50_cuts_2'].entries)
-            numAfter  = (d.histogramspy['Event/SimpleHistograms/NPhotons_COL_END_0_cuts_1'].entries + d.histogramspy['Event/SimpleHistograms/NPhotons_COL_END_0_cuts_2'].entries)
-            
-            # append to buffer the percentae absorbed
-            _buffer.append(1-(numAfter/numBefore))
-            self._buffer = _buffer
-        
-        # calculate the mean and the standard error
-        value     = _np.mean(_np.asarray(_buffer))
-        err       = (_np.std(_np.asarray(_buffer)))/(_np.sqrt(len(_buffer)))
-        val_range = _np.asarray([min(_buffer), max(_buffer)])
-        return value, err, val_range
+        self._cache   = cache
+        self._rebdsim = rebdsim
+        self._prepareRuns()
+        journal = _journal.studyJournal(self) if checkpoint else None
+        if target_err is None:
+            runs = _parallel.runSeeds(self, range(self._nruns), workers=workers, journal=journal, executor=executor, pipeline=pipeline)
+        else:
+            max_runs = self._nruns if max_runs is None else max_runs
+            runs = _parallel.runUntil(self, target_err, min_runs=min_runs, max_runs=max_runs, workers=workers, journal=journal, executor=executor, pipeline=pipeline)
+
+        with _monitor.stage(self, "statistics", events=len(runs)):
+            return self._finishStudy(runs)
     # end runStudy (func)
 
     def getBuffer(self):
         return self._buffer
     # end getBuffer (func)
 
+    def getNumRuns(self):
+        return self._nrunsUsed
+    # end getNumRuns (func)
+
+    def getCurve(self):
+        """
+        Fraction absorbed against thickness from the slabs of the last study, return the
+        cumulative thickness, mean and standard error of each slab (see slabs.py), pooled over
+        the runs if self.pooled is set.
+        """
+        if self.pooled:
+            value, err = self._stats.pooled(), self._stats.pooledError()
+        else:
+            value, err = self._stats.fractions()
+        return _slabs.slabEdges(self._thickness, len(value)), value, err
+    # end getCurve (func)
+
     def getTotalPhotons(self):
-        t = _np.asarray(self._totalPhotons)
-        return _np.mean(t), _np.std(t)/_np.sqrt(self._nruns)
+        return self._stats.count(0)
     # end getBuffer (func)
 
     def getTotalAper(self):
-        e = _np.asarray(self._eAperPhotons)
-        p = _np.asarray(self._pAperPhotons)
-        return _np.mean(e), _np.mean(p), _np.std(e)/_np.sqrt(self._nruns), _np.std(p)/_np.sqrt(self._nruns)
+        (e, err_e), (p, err_p) = self._stats.count(1), self._stats.count(2)
+        return e, p, err_e, err_p
     # end getBuffer (func)
 
     def getZpCut(self):
-        z = _np.asarray(self._zpPhotons)
-        return _np.mean(z), _np.std(z)/_np.sqrt(self._nruns)
+        return self._stats.count(3)
     
 # end shieldingStudy (class)
\ No newline at end of file
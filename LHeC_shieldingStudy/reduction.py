@@ -0,0 +1,157 @@
+"""
+Reduce the output of a bdsim run to photon counts inside this process.
+
+The rebdsim route writes a config of 100 bin histograms only to read back their
+number of entries, runs rebdsim as a separate process, writes a temporary ROOT
+file and loads that file again. Here the bdsim output is opened once and only
+the needed branches of the needed samplers are read (RDataFrame only reads the
+columns which are asked for), the counts are then calculated with the region
+classifier of regions.apertureRegions.
+
+The counts are the same as the rebdsim histograms. The e/p aperture counts follow
+_getNumAper(), i.e. the regions -pAperture <= x < eAperture and
+sep-pAperture <= x < sep+pAperture, which the rebdsim config selects as well.
+
+Example:
+
+>>> value, err, val_range = s.runStudy(rebdsim=False)
+"""
+
+import numpy as _np
+
+from . import regions as _regions
+from .regions import samplerColumns
+
+
+def _loadROOT():
+    # ROOT and the bdsim libraries are only loaded when a file is read
+    import pybdsim as _pybdsim
+    import ROOT as _ROOT
+    _pybdsim.Data.LoadROOTLibraries()
+    return _ROOT
+# end _loadROOT (func)
+
+def _flatten(column, dtype):
+    parts = [_np.asarray(v, dtype=dtype) for v in column]
+    return _np.concatenate(parts) if parts else _np.zeros(0, dtype=dtype)
+# end _flatten (func)
+
+def readSamplers(filename, samplers, branches=("x", "zp", "partID"), start=None, stop=None):
+    """
+    Read only 'branches' of each sampler in 'samplers' from a bdsim output file and return a
+    dict of sampler name -> samplerColumns, each branch flattened over all events.
+
+    'start' and 'stop' limit the read to the events [start, stop), each call is a separate
+    pass from the first event so use iterChunks() to read a whole file in chunks.
+    """
+    _ROOT = _loadROOT()
+    df    = _ROOT.RDataFrame("Event", filename)
+    if start is not None or stop is not None:
+        df = df.Range(start or 0, stop or 0)
+    columns = ["{}.{}".format(s, b) for s in samplers for b in branches]
+    arrays  = df.AsNumpy(columns)
+
+    out = {}
+    for s in samplers:
+        data = {}
+        for b in branches:
+            data[b] = _flatten(arrays["{}.{}".format(s, b)], _dtype(b))
+        out[s] = samplerColumns(s, data)
+    return out
+# end readSamplers (func)
+
+def _dtype(branch):
+    return _np.int32 if branch in ("partID", "trackID", "parentID", "turnNumber") else _np.float64
+# end _dtype (func)
+
+def _drawColumns(tree, expressions, nentries, first):
+    """
+    Values of 'expressions' for the entries [first, first+nentries) of tree, read in bulk by a
+    single TTree::Draw as in rebdsim, as float64 arrays.
+    """
+    while True:
+        rows = int(tree.Draw(":".join(expressions), "", "goff", nentries, first))
+        if rows < 0:
+            raise RuntimeError("Cannot read {} from the Event tree".format(", ".join(expressions)))
+        # the buffers of Draw hold GetEstimate() rows, draw again if there are more
+        if rows <= tree.GetEstimate():
+            break
+        tree.SetEstimate(rows+1)
+
+    columns = []
+    for k in range(len(expressions)):
+        if rows == 0:
+            columns.append(_np.zeros(0))
+            continue
+        v = tree.GetVal(k)
+        v.reshape((rows,))
+        columns.append(_np.array(v, dtype=_np.float64))
+    return columns
+# end _drawColumns (func)
+
+def iterChunks(filename, samplers, branches=("x", "zp", "partID"), chunkSize=1000):
+    """
+    Generator reading a bdsim output file in one pass, yielding for every chunkSize events a
+    dict of sampler name -> samplerColumns as readSamplers(). The Event tree is opened once and
+    the branches of each sampler are read for a whole chunk at once with TTree::Draw.
+    """
+    _ROOT = _loadROOT()
+    f     = _ROOT.TFile.Open(filename)
+    try:
+        tree = f.Get("Event")
+        n    = int(tree.GetEntries())
+        for start in range(0, n, chunkSize):
+            out = {}
+            for s in samplers:
+                columns = _drawColumns(tree, ["{}.{}".format(s, b) for b in branches], min(chunkSize, n-start), start)
+                out[s]  = samplerColumns(s, {b: c.astype(_dtype(b)) for b, c in zip(branches, columns)})
+            yield out
+    finally:
+        f.Close()
+# end iterChunks (func)
+
+def numEvents(filename):
+    """
+    Number of events in a bdsim output file.
+    """
+    _ROOT = _loadROOT()
+    f     = _ROOT.TFile.Open(filename)
+    n = int(f.Get("Event").GetEntries())
+    f.Close()
+    return n
+# end numEvents (func)
+
+def countSamplers(study, before, after, _partID=22, weighted=False):
+    """
+    Return the counts of a run as [total, eAper, pAper, zp, numBefore, numAfter] (same as
+    _runSeed) from the sampler data before and after the shielding. With 'weighted' the
+    counts are sums of the 'weight' branch (see biasing.py).
+    """
+    r      = study._regions()
+    counts = r.count(before, after, _partID=_partID, weighted=weighted)
+    num    = float if weighted else int
+
+    forward      = counts[0, _regions.FORWARD].sum()
+    total        = forward + counts[0, _regions.BACKWARD].sum()
+    eAper, pAper = r.apertures(counts[0])
+    numBefore, numAfter = r.shielded(counts)
+    return [num(total), num(eAper), num(pAper), num(forward), num(numBefore), num(numAfter)]
+# end countSamplers (func)
+
+def reduceRun(study, filename):
+    """
+    Read the samplers before and after the shielding of study from a bdsim output file and
+    return the counts of the run, with the number after each slab appended if the shielding
+    is split into slabs. The counts of a biased study are weighted.
+    """
+    before, after = study._samplerNames
+    weighted = getattr(study, "bias", None) is not None
+    slabs    = study._slabSamplers()
+    data     = readSamplers(filename, [before]+slabs, branches=("x", "zp", "partID")+(("weight",) if weighted else ()))
+    counts   = countSamplers(study, data[before], data[after], weighted=weighted)
+    if len(slabs) > 1:
+        # number after each slab before the last, see slabs.py
+        r = study._regions()
+        counts += [float(n) if weighted else int(n) for n in r.shielded(r.count(*[data[s] for s in slabs[:-1]], weighted=weighted))]
+    return counts
+# end reduceRun (func)
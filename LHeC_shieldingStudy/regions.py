@@ -0,0 +1,121 @@
+"""
+Classify the particles at a sampler into the regions of the collimator in one pass.
+
+The collimator is built from 'pieces' blocks of width (sep-eAperture)*2 placed
+side by side from x = eAperture, the first contains the proton aperture centred
+on sep. Along x this gives the regions (sorted bin edges):
+
+    below     x < -pAperture
+    eAper     -pAperture <= x < eAperture
+    col_0_a   eAperture <= x < sep-pAperture
+    pAper     sep-pAperture <= x < sep+pAperture
+    col_0_b   sep+pAperture <= x < eAperture+width
+    col_j     the j-th extra piece, j = 1 ... pieces-1
+    outside   beyond the last piece
+
+Each particle gets a region from np.searchsorted on x and a selection from its
+partID and zp (selected with zp>=0, selected with zp<0, other particle) which
+are combined into one index and counted with a single np.bincount.
+
+Example:
+
+>>> r = apertureRegions(eAperture=0.005, pAperture=0.02, sep=0.121896, pieces=2)
+>>> counts = r.count(DRIFT_1, COL_0)       # shape (2 samplers, 3 selections, nregions)
+>>> numBefore, numAfter = r.shielded(counts)
+"""
+
+import numpy as _np
+
+# selections (second axis of the counts)
+FORWARD  = 0    # selected particle with zp>=0
+BACKWARD = 1    # selected particle with zp<0
+OTHER    = 2    # any other particle
+
+
+class samplerColumns:
+    """
+    Flat arrays of the selected branches of one sampler over all events, accessed through
+    'data' in the same way as pybdsim.Data.SamplerData.
+    """
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+    # end __init__ (func)
+
+# end samplerColumns (class)
+
+class apertureRegions:
+    """
+    Bin edges in x of the apertures and collimator pieces of an IR.
+    """
+
+    def __init__(self, eAperture, pAperture, sep, pieces=1):
+        width = (sep-eAperture)*2
+        edges = [-pAperture, eAperture, sep-pAperture, sep+pAperture]
+        names = ["below", "eAper", "col_0_a", "pAper", "col_0_b"]
+        for j in range(1, pieces+1):
+            edges.append(eAperture+(j*width))
+            names.append("col_{}".format(j) if j < pieces else "outside")
+
+        self.edges = _np.asarray(edges)
+        self.names = names
+        self._index = {n: i for i, n in enumerate(names)}
+    # end __init__ (func)
+
+    def __len__(self):
+        return len(self.names)
+    # end __len__ (func)
+
+    def index(self, *names):
+        """
+        Return the region numbers of the given region names.
+        """
+        return [self._index[n] for n in names]
+    # end index (func)
+
+    def classify(self, x, zp, partID, _partID=22, weight=None):
+        """
+        Return the counts of one sampler as an array of shape (3, nregions), the first axis is
+        the selection (FORWARD, BACKWARD, OTHER). With 'weight' the counts are the sums of the
+        weights of the particles (see biasing.py).
+        """
+        x      = _np.asarray(x)
+        n      = len(self.names)
+        region = _np.searchsorted(self.edges, x, side='right')
+        isPart = _np.asarray(partID) == _partID
+        sel    = (2-(2*isPart)) + (isPart & (_np.asarray(zp) < 0))
+        return _np.bincount(region+(n*sel), weights=weight, minlength=3*n).reshape(3, n)
+    # end classify (func)
+
+    def count(self, *samplers, _partID=22, weighted=False):
+        """
+        Return the counts of all samplers (pybdsim SamplerData or anything with a 'data' dict
+        of 'x', 'zp' and 'partID', and 'weight' if weighted) as an array of shape
+        (nsamplers, 3, nregions).
+        """
+        return _np.stack([self.classify(s.data['x'], s.data['zp'], s.data['partID'], _partID=_partID,
+                                        weight=s.data['weight'] if weighted else None) for s in samplers])
+    # end count (func)
+
+    def shielded(self, counts):
+        """
+        Number of forward selected particles outside of the apertures, i.e. incident on the
+        shielding, for each sampler in counts.
+        """
+        counts = _np.asarray(counts)[..., FORWARD, :]
+        keep   = [i for i, n in enumerate(self.names) if n not in ("below", "eAper", "pAper")]
+        return counts[..., keep].sum(axis=-1)
+    # end shielded (func)
+
+    def apertures(self, counts):
+        """
+        Number of forward selected particles in the (electron, proton) apertures for each
+        sampler in counts.
+        """
+        counts = _np.asarray(counts)[..., FORWARD, :]
+        e, p   = self.index("eAper", "pAper")
+        return counts[..., e], counts[..., p]
+    # end apertures (func)
+
+# end apertureRegions (class)
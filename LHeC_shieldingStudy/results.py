@@ -0,0 +1,182 @@
+"""
+SQLite store of the counts of every run, instead of the runData csv files.
+
+The runSim scripts append their results to 'DATA/<runKey>/<material>_runData.csv'
+so every rerun adds another header and duplicate rows, and the plots parse these
+files again one material at a time. resultsDB keeps one row per run
+
+    (ir, material, thickness, seed, config) -> ngenerate, the counts of _runSeed
+                                               (the slab counts as json), time
+
+where 'config' is cache.configKey() of the study (gmad files, analysis, ngenerate
+and apertures) so a rerun of the same point replaces its rows while a changed
+lattice is kept apart. The table is indexed on (ir, material, thickness) and the
+database is in WAL mode with a busy timeout so several studies or campaigns can
+write to it at once.
+
+runs() reads the selected rows as numpy arrays in one query and points() reduces
+them to the fraction absorbed of each point with a GROUP BY in sqlite, so campaigns
+of tens of thousands of runs are quick to query.
+
+Example:
+
+>>> db = resultsDB("DATA/results.sqlite")
+>>> s.results = db
+>>> value, err, val_range = s.runStudy()
+>>> p = db.points(ir="Dipole_half", material="Pb")
+>>> plt.errorbar(p["value"]*100, p["thickness"]*100, xerr=p["err"]*100)
+"""
+
+import json as _json
+import os as _os
+import sqlite3 as _sqlite3
+import time as _time
+
+import numpy as _np
+
+from . import cache as _cache
+
+# columns of the counts of a run, see _runSeed
+COUNTS = ("total", "eAper", "pAper", "zp", "numBefore", "numAfter")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    ir        TEXT    NOT NULL,
+    material  TEXT    NOT NULL,
+    thickness REAL    NOT NULL,
+    seed      INTEGER NOT NULL,
+    config    TEXT    NOT NULL,
+    ngenerate INTEGER NOT NULL,
+    total     REAL, eAper REAL, pAper REAL, zp REAL, numBefore REAL, numAfter REAL,
+    slabs     TEXT,
+    time      REAL,
+    PRIMARY KEY (ir, material, thickness, seed, config)
+);
+CREATE INDEX IF NOT EXISTS runs_point ON runs (ir, material, thickness);
+"""
+
+
+class resultsDB:
+    """
+    SQLite database of the counts of each run at 'path'. Each process opens its own connection
+    so the object can be given to parallel workers.
+    """
+
+    def __init__(self, path="results.sqlite", timeout=60):
+        self.path    = _os.path.abspath(path)
+        self.timeout = timeout      # (seconds to wait for another writer)
+        self._conn   = None
+        self._pid    = None
+        d = _os.path.dirname(self.path)
+        if d:
+            _os.makedirs(d, exist_ok=True)
+    # end __init__ (func)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_conn"], state["_pid"] = None, None
+        return state
+    # end __getstate__ (func)
+
+    def connection(self):
+        """
+        The sqlite connection of this process, the tables are created on first use.
+        """
+        if self._conn is None or self._pid != _os.getpid():
+            self._conn = _sqlite3.connect(self.path, timeout=self.timeout)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._pid = _os.getpid()
+        return self._conn
+    # end connection (func)
+
+    @staticmethod
+    def row(study, i, counts, config=None):
+        """
+        Row of run i of study with the given counts, 'config' defaults to cache.configKey(study).
+        """
+        config = _cache.configKey(study) if config is None else config
+        return ((study._runKey, study._colMat, float(study._thickness), (i*42)+23, config, study._ngenerate)
+                + tuple(float(c) for c in counts[:6])
+                + (_json.dumps([float(c) for c in counts[6:]]) if len(counts) > 6 else None, _time.time()))
+    # end row (func)
+
+    def insert(self, rows):
+        """
+        Write rows (see row()) in one transaction, a row with the same key replaces the old one.
+        """
+        conn = self.connection()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO runs VALUES ({})".format(",".join("?"*14)), list(rows))
+    # end insert (func)
+
+    def store(self, study, runs):
+        """
+        Write the counts of a dict of run index -> counts of study.
+        """
+        config = _cache.configKey(study)
+        self.insert([self.row(study, i, counts, config) for i, counts in runs.items()])
+    # end store (func)
+
+    @staticmethod
+    def _where(ir=None, material=None, thickness=None, config=None, ngenerate=None):
+        terms, args = [], []
+        for name, value in [("ir", ir), ("material", material), ("thickness", thickness),
+                            ("config", config), ("ngenerate", ngenerate)]:
+            if value is None:
+                continue
+            values = [value] if _np.isscalar(value) else list(value)
+            terms.append("{} IN ({})".format(name, ",".join("?"*len(values))))
+            args   += [float(v) if name == "thickness" else v for v in values]
+        return (" WHERE "+" AND ".join(terms) if terms else ""), args
+    # end _where (func)
+
+    def runs(self, ir=None, material=None, thickness=None, config=None, ngenerate=None):
+        """
+        Rows matching the selection (each a value or a list of values) as a dict of column ->
+        numpy array, ordered by ir, material, thickness and seed.
+        """
+        where, args = self._where(ir, material, thickness, config, ngenerate)
+        cur  = self.connection().execute("SELECT ir, material, thickness, seed, config, ngenerate, {} FROM runs{} "
+                                         "ORDER BY ir, material, thickness, seed".format(", ".join(COUNTS), where), args)
+        rows = cur.fetchall()
+        cols = ["ir", "material", "thickness", "seed", "config", "ngenerate"]+list(COUNTS)
+        if not rows:
+            return {c: _np.zeros(0, dtype=object if c in ("ir", "material", "config") else float) for c in cols}
+        data = list(zip(*rows))
+        out  = {}
+        for c, v in zip(cols, data):
+            out[c] = _np.array(v, dtype=object) if c in ("ir", "material", "config") else _np.array(v, dtype=float)
+        return out
+    # end runs (func)
+
+    def points(self, ir=None, material=None, thickness=None, config=None, ngenerate=None):
+        """
+        Fraction absorbed of each (ir, material, thickness, config) of the selected runs, as a
+        dict of numpy arrays: ir, material, thickness, config, n (num runs), value and err (mean
+        of the runs and its standard error, as runStudy), pooled (1 - sum(numAfter)/sum(numBefore)).
+        """
+        where, args = self._where(ir, material, thickness, config, ngenerate)
+        # the sums of each point are done by sqlite on the index, only one row per point is read
+        cur  = self.connection().execute("SELECT ir, material, thickness, config, COUNT(*), "
+                                         "SUM(1-numAfter/numBefore), SUM((1-numAfter/numBefore)*(1-numAfter/numBefore)), "
+                                         "SUM(numAfter), SUM(numBefore) FROM runs{} GROUP BY ir, material, thickness, config "
+                                         "ORDER BY ir, material, thickness".format(where), args)
+        rows = cur.fetchall()
+        cols = ["ir", "material", "thickness", "config"]
+        if not rows:
+            return {c: _np.zeros(0) for c in cols+["n", "value", "err", "pooled"]}
+        data = list(zip(*rows))
+        out  = {c: _np.array(v, dtype=object) for c, v in zip(cols, data)}
+        out["thickness"] = _np.array(data[2], dtype=float)
+        n, s1, s2, after, before = [_np.array(v, dtype=float) for v in data[4:]]
+        value = s1/n
+        out.update({"n"      : n.astype(int),
+                    "value"  : value,
+                    "err"    : _np.sqrt(_np.maximum((s2/n)-(value**2), 0))/_np.sqrt(n),
+                    "pooled" : 1-(after/before)})
+        return out
+    # end points (func)
+
+# end resultsDB (class)
@@ -0,0 +1,82 @@
+"""
+Score the shielding in thin slabs to get the attenuation against thickness from one study.
+
+A thickness scan normally needs a separate genGMAD() and runStudy() for every
+thickness although the tracking up to the shielding is identical. With
+study.slabs = N the collimator of thickness t is built from N stacked slabs of
+thickness t/N of the same material, each followed by a sampler, so every run
+also counts the photons left after t/N, 2t/N, ... t of material. The last slab
+keeps the name of the original collimator (e.g. 'COL_0') so the usual results of
+runStudy() are unchanged, the slabs before it are named '<name>_S<k>'.
+
+Example:
+
+>>> s = shieldingStudy("Pb", 10000, 30, 0.1, "run2b")
+>>> s.slabs = 10
+>>> s.genGMAD()
+>>> s.runStudy()
+>>> thickness, value, err = s.getCurve()    # fraction absorbed at 0.01, 0.02 ... 0.1 m
+"""
+
+import numpy as _np
+
+
+def slabNames(name, nslabs):
+    """
+    Names of the slabs (and so their samplers) of the collimator 'name' in beam order, the
+    last slab is 'name' itself.
+    """
+    return ["{}_S{}".format(name, k) for k in range(nslabs-1)] + [name]
+# end slabNames (func)
+
+def slabEdges(thickness, nslabs):
+    """
+    Cumulative thickness of material after each slab.
+    """
+    return thickness*_np.arange(1, nslabs+1)/nslabs
+# end slabEdges (func)
+
+def addCollimator(machine, name, thickness, material, eAperture, pAperture, sep, pieces, nslabs=1, bias=None):
+    """
+    Add the collimator of 'pieces' blocks side by side to a pybdsim Builder.Machine, split into
+    nslabs slabs along s. The first block of each slab is a lattice element named '<name>_0'
+    (see slabNames), the other blocks '<name>_<j>' are placed next to it.
+
+    'bias' is the name of a bias object attached to the material of every block (see biasing.py).
+
+    Return the definitions of the placed blocks which must go in the extra gmad file.
+    """
+    width  = (sep-eAperture)*2 # width of first collimater so that proton aperture is in correct place
+    slabT  = thickness/nslabs
+    for k in range(nslabs):
+        suffix = "" if k == nslabs-1 else "_S{}".format(k)
+        col0   = "{}_0{}".format(name, suffix)
+        biasKw = {} if bias is None else {"biasMaterial": bias}
+        machine.AddRCol(col0, slabT, material=material, xsize=pAperture, ysize=pAperture, horizontalWidth=width, offsetX=((width/2)+eAperture), **biasKw)
+        for j in range(1, pieces):
+            machine.AddPlacement('{}_{}{}_p'.format(name, j, suffix), bdsimElement='"{}_{}"'.format(name, j), referenceElement='"{}"'.format(col0), x=((width/2)+(width*j)+eAperture))
+
+    biasDef = "" if bias is None else ', biasMaterial="{}"'.format(bias)
+    return ['{}_{}: rcol, horizontalWidth={}, l={}, material="{}", xsize=0.0, ysize=0.0{};'.format(name, j, width, slabT, material, biasDef) for j in range(1, pieces)]
+# end addCollimator (func)
+
+def slabFractions(counts):
+    """
+    Fraction absorbed after each slab of one run from the counts returned by _runSeed, i.e.
+    [total, eAper, pAper, zp, numBefore, numAfter] followed by the number after each slab
+    before the last.
+    """
+    return [1-(n/counts[4]) for n in list(counts[6:])+[counts[5]]]
+# end slabFractions (func)
+
+def attenuationCurve(buffer, thickness):
+    """
+    Mean fraction absorbed and its standard error at each cumulative thickness from the
+    per run fractions of each slab (buffer has shape (nruns, nslabs)).
+    Return (thickness, value, err) as arrays.
+    """
+    b     = _np.asarray(buffer, dtype=float)
+    value = _np.mean(b, axis=0)
+    err   = _np.std(b, axis=0)/_np.sqrt(len(b))
+    return slabEdges(thickness, b.shape[1]), value, err
+# end attenuationCurve (func)
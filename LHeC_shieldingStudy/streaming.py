@@ -0,0 +1,117 @@
+"""
+Stream the samplers of a large bdsim output in chunks of events.
+
+pybdsim.Data.SamplerData loads every branch of a sampler for every event at
+once, which does not fit in memory for large runs (e.g. ngenerate=100000 with
+samplers on every element). iterSamplers() is a generator which yields the
+selected branches of the selected samplers for a fixed number of events at a
+time, the functions below consume it incrementally so the memory used only
+depends on the chunk size.
+
+Example:
+
+>>> chunks = iterSamplers("DATA/run2b/Pb-0.025m.root", ["DRIFT_0", "target"], chunkSize=5000)
+>>> n = counts(chunks, ["DRIFT_0", "target"], select=lambda d: d['partID']==22)
+"""
+
+import numpy as _np
+
+from . import reduction as _reduction
+
+
+def iterSamplers(filename, samplers, branches=("x", "y", "zp", "partID", "energy"), chunkSize=1000):
+    """
+    Generator over a bdsim output file yielding, for chunkSize events at a time, a dict of
+    sampler name -> regions.samplerColumns with the selected branches. The file is read in a
+    single pass (see reduction.iterChunks) so read every sampler needed in the same pass.
+    """
+    return _reduction.iterChunks(filename, samplers, branches=branches, chunkSize=chunkSize)
+# end iterSamplers (func)
+
+def _selected(data, select):
+    if select is None:
+        return None
+    return _np.asarray(select(data), dtype=bool)
+# end _selected (func)
+
+def counts(chunks, samplers, select=None):
+    """
+    Number of particles at each of 'samplers' passing 'select' (a function of the data dict
+    returning a boolean array, or None for all particles), counted in one pass over the chunks.
+    Return a dict of sampler -> number.
+    """
+    n = dict.fromkeys(samplers, 0)
+    for c in chunks:
+        for s in samplers:
+            d     = c[s].data
+            mask  = _selected(d, select)
+            n[s] += len(next(iter(d.values()))) if mask is None else int(_np.count_nonzero(mask))
+    return n
+# end counts (func)
+
+def count(chunks, sampler, select=None):
+    """
+    Number of particles at 'sampler' passing 'select', see counts().
+    """
+    return counts(chunks, [sampler], select)[sampler]
+# end count (func)
+
+def countRegions(chunks, samplers, regions, _partID=22):
+    """
+    Accumulate regions.apertureRegions counts, shape (nsamplers, 3, nregions), over all chunks.
+    """
+    total = None
+    for c in chunks:
+        counts = regions.count(*[c[s] for s in samplers], _partID=_partID)
+        total  = counts if total is None else total+counts
+    return total
+# end countRegions (func)
+
+def histogram(chunks, sampler, branch, bins, range, select=None):
+    """
+    1D histogram of 'branch' at 'sampler' for the particles passing 'select', filled chunk by
+    chunk. The bins must be fixed up front so 'range' is required. Return (counts, edges).
+    """
+    edges  = _np.histogram_bin_edges([], bins=bins, range=range)
+    counts = _np.zeros(len(edges)-1, dtype=_np.int64)
+    for c in chunks:
+        d    = c[sampler].data
+        mask = _selected(d, select)
+        v    = d[branch] if mask is None else d[branch][mask]
+        counts += _np.histogram(v, bins=edges)[0]
+    return counts, edges
+# end histogram (func)
+
+def histogram2d(chunks, sampler, xbranch, ybranch, bins, range, select=None):
+    """
+    2D histogram of 'xbranch' against 'ybranch' at 'sampler', filled chunk by chunk.
+    Return (counts, xedges, yedges).
+    """
+    xedges = _np.histogram_bin_edges([], bins=bins, range=range[0])
+    yedges = _np.histogram_bin_edges([], bins=bins, range=range[1])
+    counts = _np.zeros((len(xedges)-1, len(yedges)-1), dtype=_np.int64)
+    for c in chunks:
+        d    = c[sampler].data
+        mask = _selected(d, select)
+        x, y = (d[xbranch], d[ybranch]) if mask is None else (d[xbranch][mask], d[ybranch][mask])
+        counts += _np.histogram2d(x, y, bins=[xedges, yedges])[0].astype(_np.int64)
+    return counts, xedges, yedges
+# end histogram2d (func)
+
+def cutFlow(chunks, sampler, cuts):
+    """
+    Number of particles at 'sampler' left after each cut is applied in turn. 'cuts' is a list
+    of (name, function of the data dict returning a boolean array). Return a list of
+    (name, number) starting with ('none', all particles).
+    """
+    names  = ["none"]+[name for name, _ in cuts]
+    counts = _np.zeros(len(names), dtype=_np.int64)
+    for c in chunks:
+        d    = c[sampler].data
+        mask = _np.ones(len(next(iter(d.values()))), dtype=bool)
+        counts[0] += len(mask)
+        for k, (_, cut) in enumerate(cuts):
+            mask &= _np.asarray(cut(d), dtype=bool)
+            counts[k+1] += int(_np.count_nonzero(mask))
+    return list(zip(names, counts.tolist()))
+# end cutFlow (func)
@@ -0,0 +1,264 @@
+"""
+Surrogate of the attenuation against thickness to choose the next simulations.
+
+Every finished point of a study is kept, in the journals of its runs (see
+journal.py) and in the '<material>_runData.csv' of its DATA directory, but the
+next thicknesses are still chosen by hand. attenuationModel fits a Gaussian
+process to all these points of one IR variant and material, on
+y = -ln(1-absorbed) as in thickness.py, with a straight line as the mean (the
+Beer-Lambert part) and a smooth residual for build-up and geometry. Each point is
+weighted with its own error, the model predicts the attenuation with an
+uncertainty at any thickness.
+
+The design question is the thickness at which the target is reached, it is
+settled when the band where the target is within 'sigma' standard deviations of
+the prediction is narrower than the tolerance. Until then the next thicknesses
+are those where the target is still most uncertain (the straddle of the level
+set, sigma*std - |mean - target|), a batch of k is chosen by adding each choice
+to the model before picking the next, at least a minimum spacing apart so the
+k workers simulate k different thicknesses.
+
+Example:
+
+>>> t, err, points = activeSearch("Pb", target=0.999, tol=0.001, ir="Dipole_half",
+...                               ngenerate=10000, nruns=30, workers=32)
+>>> m = attenuationModel(loadResults("DATA/Dipole_half", "Pb", 10000))
+>>> value, err = m.absorbed([0.05, 0.06])
+"""
+
+import glob as _glob
+import os as _os
+
+import numpy as _np
+
+from . import campaign as _campaign
+from . import journal as _journal
+from . import parallel as _parallel
+from . import plotting as _plotting
+from .thickness import _logTransmission
+
+
+def loadJournals(dataDir, material, ngenerate, config=None):
+    """
+    Return the points of 'material' found in the journals of dataDir as rows of
+    (thickness, absorbed, err), using every run with the same ngenerate.
+
+    'config' is a function of the thickness returning the cache.configKey() of the study at
+    that thickness (e.g. campaign.configKey), only the runs of that config are used. Without
+    it the runs of every config in the journal are mixed.
+    """
+    rows = []
+    for path in _glob.glob(_os.path.join(dataDir, "{}-*m.journal".format(material))):
+        t = _os.path.basename(path)[len(material)+1:-len("m.journal")]
+        try:
+            t = float(t)
+        except ValueError:
+            continue
+        key = config(t) if config is not None else None
+        f   = [_parallel.absorbed(c) for c in _journal.runJournal(path, ngenerate, key).load().values()]
+        if len(f) > 1:
+            rows.append((t, _np.mean(f), _np.std(f)/_np.sqrt(len(f))))
+    return rows
+# end loadJournals (func)
+
+def loadRunData(dataDir, material):
+    """
+    Return the points of '<dataDir>/<material>_runData.csv' as rows of (thickness, absorbed, err),
+    read as the plots do (see plotting.readRunData).
+    """
+    path = _os.path.join(dataDir, "{}_runData.csv".format(material))
+    if not _os.path.exists(path):
+        return []
+    d = _plotting.readRunData(path)
+    return [(float(t), float(v), float(e)) for t, v, e in zip(d["thickness"], d["value"], d["err"])]
+# end loadRunData (func)
+
+def loadResults(dataDir, material, ngenerate, config=None):
+    """
+    All known points of 'material' in dataDir as an array of rows (thickness, absorbed, err),
+    a thickness in both a journal and the runData csv uses the journal ('config' as in
+    loadJournals).
+    """
+    points = {round(t, 6): (t, v, e) for (t, v, e) in loadRunData(dataDir, material)}
+    points.update({round(t, 6): (t, v, e) for (t, v, e) in loadJournals(dataDir, material, ngenerate, config)})
+    return _np.array(sorted(points.values())).reshape(-1, 3)
+# end loadResults (func)
+
+class attenuationModel:
+    """
+    Gaussian process of y = -ln(1-absorbed) against thickness with a straight line mean, fitted
+    to rows of (thickness, absorbed, err).
+    """
+
+    def __init__(self, points, lengthScale=None, amplitude=None):
+        points = _np.asarray(points, dtype=float)
+        if len(_np.unique(points[:,0])) < 2:
+            raise ValueError("At least two thicknesses are needed to fit the model")
+        y, s   = _logTransmission(points[:,1], points[:,2])
+        self._t, self._y, self._s = points[:,0], y, s
+
+        # choose the kernel by the marginal likelihood on a coarse grid
+        span   = _np.ptp(self._t)
+        scales = [lengthScale] if lengthScale is not None else span*_np.array([0.25, 0.5, 1, 2, 4])
+        amps   = [amplitude] if amplitude is not None else (_np.std(y)+_np.median(s))*_np.array([0.01, 0.1, 0.3, 1, 3])
+        best   = max(((self._logLikelihood(l, a), l, a) for l in scales for a in amps), key=lambda b: b[0])
+        self.lengthScale, self.amplitude = best[1], best[2]
+        self._fit(self._t, self._y, self._s)
+    # end __init__ (func)
+
+    def _kernel(self, a, b, l=None, amp=None):
+        l   = self.lengthScale if l is None else l
+        amp = self.amplitude if amp is None else amp
+        return (amp**2)*_np.exp(-0.5*((a[:,None]-b[None,:])/l)**2)
+    # end _kernel (func)
+
+    @staticmethod
+    def _basis(t):
+        return _np.vstack([t, _np.ones_like(t)])
+    # end _basis (func)
+
+    def _logLikelihood(self, l, amp):
+        # marginal likelihood with the line integrated out (Rasmussen & Williams eq. 2.45)
+        t, y = self._t, self._y
+        K    = self._kernel(t, t, l, amp) + _np.diag(self._s**2) + (1e-12*_np.eye(len(t)))
+        H    = self._basis(t)
+        try:
+            L = _np.linalg.cholesky(K)
+        except _np.linalg.LinAlgError:
+            return -_np.inf
+        Ki   = _np.linalg.inv(K)
+        A    = H @ Ki @ H.T
+        C    = Ki @ H.T @ _np.linalg.solve(A, H @ Ki)
+        return (-0.5*(y @ Ki @ y)) + (0.5*(y @ C @ y)) - _np.log(_np.diag(L)).sum() - (0.5*_np.linalg.slogdet(A)[1])
+    # end _logLikelihood (func)
+
+    def _fit(self, t, y, s):
+        K          = self._kernel(t, t) + _np.diag(s**2) + (1e-12*_np.eye(len(t)))
+        H          = self._basis(t)
+        self._Ki   = _np.linalg.inv(K)
+        self._A    = H @ self._Ki @ H.T
+        self._beta = _np.linalg.solve(self._A, H @ self._Ki @ y)
+        self._X, self._H, self._Y = t, H, y
+    # end _fit (func)
+
+    def predict(self, thickness):
+        """
+        Mean and standard deviation of y = -ln(1-absorbed) at each thickness.
+        """
+        ts   = _np.atleast_1d(_np.asarray(thickness, dtype=float))
+        Ks   = self._kernel(self._X, ts)
+        R    = self._basis(ts) - (self._H @ self._Ki @ Ks)
+        mean = (Ks.T @ self._Ki @ self._Y) + (R.T @ self._beta)
+        var  = (self.amplitude**2) - _np.einsum('ij,ik,kj->j', Ks, self._Ki, Ks) + _np.einsum('ij,ik,kj->j', R, _np.linalg.inv(self._A), R)
+        return mean, _np.sqrt(_np.maximum(var, 0))
+    # end predict (func)
+
+    def absorbed(self, thickness):
+        """
+        Predicted fraction absorbed at each thickness and its standard deviation.
+        """
+        mean, std = self.predict(thickness)
+        trans     = _np.exp(-mean)
+        return 1-trans, trans*std
+    # end absorbed (func)
+
+    def _grid(self, grid):
+        return _np.linspace(0, 2*self._t.max(), 2001) if grid is None else _np.asarray(grid, dtype=float)
+    # end _grid (func)
+
+    def threshold(self, target, sigma=2, grid=None):
+        """
+        Thickness where the prediction reaches 'target' absorbed and the band (lo, hi) where the
+        target is within sigma standard deviations, nan if not reached on the grid (by default
+        up to twice the thickest point).
+        """
+        grid      = self._grid(grid)
+        mean, std = self.predict(grid)
+        yt        = -_np.log(1-target)
+
+        def first(curve):
+            i = _np.flatnonzero(curve >= yt)
+            if len(i) == 0:
+                return _np.nan
+            if i[0] == 0:
+                return grid[0]
+            j = i[0]
+            return grid[j-1] + ((yt-curve[j-1])*(grid[j]-grid[j-1])/(curve[j]-curve[j-1]))
+        return first(mean), first(mean+(sigma*std)), first(mean-(sigma*std))
+    # end threshold (func)
+
+    def propose(self, target, k=1, sigma=2, grid=None, noise=None, spacing=None):
+        """
+        Return k distinct thicknesses where a simulation would reduce the uncertainty on the
+        thickness reaching 'target' the most. 'noise' is the expected error on y of a new point,
+        by default the median error of the fitted points. Each choice is added to the model (with
+        the kernel kept) before the next and no two choices are closer than 'spacing', by default
+        the smaller of half the length scale and the grid width over 2k.
+        """
+        grid    = self._grid(grid)
+        noise   = _np.median(self._s) if noise is None else noise
+        spacing = min(self.lengthScale/2, _np.ptp(grid)/(2*k)) if spacing is None else spacing
+        yt      = -_np.log(1-target)
+        t, y, s = self._t, self._y, self._s
+        news    = []
+        for _ in range(k):
+            mean, std = self.predict(grid)
+            score     = (sigma*std)-_np.abs(mean-yt)
+            for n in news:
+                score[_np.abs(grid-n) < spacing] = -_np.inf
+            if not _np.isfinite(score).any():
+                break
+            best = grid[_np.argmax(score)]
+            news.append(float(best))
+            # the new point only changes the uncertainty, use the prediction as its value
+            t = _np.append(t, best)
+            y = _np.append(y, self.predict(best)[0])
+            s = _np.append(s, noise)
+            self._fit(t, y, s)
+        self._fit(self._t, self._y, self._s)
+        return news
+    # end propose (func)
+
+# end attenuationModel (class)
+
+def activeSearch(material, target=0.999, tol=0.001, bracket=(0.01, 0.2), ir="Dipole_half",
+                 ngenerate=10000, nruns=30, workers=1, k=None, sigma=2, maxIter=20, **spec):
+    """
+    Simulate thicknesses of 'material' chosen by an attenuationModel until the thickness which
+    absorbs 'target' is known to within 'tol' (metre), starting from every point already in
+    the journals and runData csv of the IR variant (the 'bracket' is only simulated if there
+    are fewer than two). The runs are journaled (checkpoint) so they are reused by later
+    searches. Any other key of a campaign spec can be passed on.
+
+    Return the thickness, its error and an array of all (thickness, absorbed, err) used.
+    """
+    k    = max(1, k if k is not None else min(workers or 1, 8))
+    spec = dict(spec, ir=ir, materials=[material], ngenerate=ngenerate, nruns=nruns, checkpoint=True)
+    search  = _campaign.campaign(dict(spec, thicknesses=[bracket[0]]))
+    dataDir = search._newStudy(material, bracket[0])._dataDir()
+    # only the journaled runs of the config being searched, not those of other apertures or slabs
+    config  = lambda t: search.configKey(material, t)
+
+    def evaluate(thicknesses):
+        _campaign.campaign(dict(spec, thicknesses=sorted(set(round(float(t), 6) for t in thicknesses)))).run(workers=workers, write=False)
+
+    points = loadResults(dataDir, material, ngenerate, config)
+    if len(_np.unique(points[:,0])) < 2:
+        evaluate(bracket)
+
+    tt, lo, hi = _np.nan, _np.nan, _np.nan
+    for _ in range(maxIter):
+        points     = loadResults(dataDir, material, ngenerate, config)
+        model      = attenuationModel(points)
+        tt, lo, hi = model.threshold(target, sigma=sigma)
+        if hi-lo <= tol:
+            break
+
+        known = set(round(t, 6) for t in points[:,0])
+        news  = [t for t in model.propose(target, k=k, sigma=sigma) if t > 0 and round(t, 6) not in known]
+        if not news:
+            break
+        evaluate(news)
+
+    return tt, (hi-lo)/(2*sigma), points
+# end activeSearch (func)
@@ -0,0 +1,133 @@
+"""
+Find the thickness of a material which absorbs a target fraction of the photons.
+
+Instead of choosing a list of thicknesses by hand and running until one brackets
+the target, the thickness is searched for directly. The transmission through
+the shielding falls roughly exponentially with thickness, so the search works
+on y = -ln(1-absorbed) which is close to linear in the thickness.
+
+Each iteration evaluates k thicknesses inside the current bracket as a single
+campaign (k = number of points, by default one per free worker), so with several
+workers the bracket shrinks by a factor k+1 per iteration. With k=1 the next
+point is placed at the root of a weighted fit instead. Every simulated point is
+kept with its error and the final thickness comes from a weighted fit to the
+points inside the bracket, the search stops when the bracket or the error on the
+fitted thickness is within the tolerance.
+
+Example:
+
+>>> t, err, points = findThickness("Pb", target=0.999, tol=0.001, bracket=(0.01, 0.1),
+...                                ir="Dipole_half", ngenerate=10000, nruns=30, workers=32)
+"""
+
+import numpy as _np
+
+from . import campaign as _campaign
+
+
+def _logTransmission(value, err):
+    """
+    Return y = -ln(1-value) and its error, the transmission is limited to 1e-9 as a
+    fully absorbing point would otherwise be infinite.
+    """
+    trans = _np.maximum(1-_np.asarray(value, dtype=float), 1e-9)
+    return -_np.log(trans), _np.maximum(_np.asarray(err, dtype=float), 1e-9)/trans
+# end _logTransmission (func)
+
+def fitThickness(points, target):
+    """
+    Weighted straight line fit of -ln(1-absorbed) against thickness for points, an array of
+    rows (thickness, absorbed, err). Return the thickness where the fit reaches target and
+    its error, or (None, None) if it cannot be fitted.
+    """
+    points = _np.asarray(points, dtype=float)
+    if len(points) < 2 or len(_np.unique(points[:,0])) < 2:
+        return None, None
+
+    t    = points[:,0]
+    y, s = _logTransmission(points[:,1], points[:,2])
+    w    = 1/s**2
+
+    # weighted least squares y = a*t + b
+    A    = _np.vstack([t, _np.ones_like(t)]).T
+    cov  = _np.linalg.inv(A.T @ (A*w[:,None]))
+    a, b = cov @ (A.T @ (w*y))
+    if a <= 0:
+        return None, None
+
+    yt = -_np.log(1-target)
+    tt = (yt-b)/a
+    # propagate the covariance of (a, b) to the thickness
+    J   = _np.array([-(yt-b)/a**2, -1/a])
+    err = _np.sqrt(J @ cov @ J)
+    return tt, err
+# end fitThickness (func)
+
+def findThickness(material, target=0.999, tol=0.001, bracket=(0.01, 0.2), ir="Dipole_half",
+                  ngenerate=10000, nruns=30, workers=1, k=None, sigma=2, maxIter=20, **spec):
+    """
+    Search for the thickness (metre) of 'material' which absorbs the fraction 'target' of the
+    photons, to within 'tol' (metre).
+
+    'bracket' is the initial (thinnest, thickest) guess, it is widened if it does not contain
+    the target. 'k' is the number of thicknesses simulated at the same time, by default one
+    per worker (at most 8). A point only moves the bracket if it is more than 'sigma' errors
+    away from the target. Any other key of a campaign spec (runKey, cache, checkpoint, ...) can
+    be passed on.
+
+    Return the thickness, its error and an array of all simulated (thickness, absorbed, err).
+    """
+    k      = max(1, k if k is not None else min(workers or 1, 8))
+    lo, hi = bracket
+    points = {}
+
+    def evaluate(thicknesses):
+        thicknesses = sorted(set(round(float(t), 6) for t in thicknesses) - set(points))
+        if not thicknesses:
+            return
+        c = _campaign.campaign(dict(spec, ir=ir, materials=[material], thicknesses=thicknesses,
+                                    ngenerate=ngenerate, nruns=nruns))
+        for (m, t), row in c.run(workers=workers, write=False).items():
+            points[t] = (row[0], row[1])
+
+    def table():
+        return _np.array(sorted((t, v, e) for t, (v, e) in points.items()))
+
+    # make sure the target is inside the bracket, widen it if not
+    evaluate([lo, hi])
+    for _ in range(maxIter):
+        if points[round(hi, 6)][0] < target:
+            lo, hi = hi, hi*2
+        elif points[round(lo, 6)][0] > target:
+            lo, hi = lo/2, lo
+        else:
+            break
+        evaluate([lo, hi])
+
+    tt, err = None, None
+    for _ in range(maxIter):
+        p = table()
+        below = p[p[:,1]+(sigma*p[:,2]) < target]
+        above = p[p[:,1]-(sigma*p[:,2]) > target]
+        if len(below): lo = max(lo, below[:,0].max())
+        if len(above): hi = min(hi, above[:,0].min())
+
+        inside  = p[(p[:,0] >= lo) & (p[:,0] <= hi)]
+        tt, err = fitThickness(inside, target)
+        if hi-lo <= tol or (err is not None and err <= tol/2):
+            break
+
+        if k == 1 and tt is not None and lo < tt < hi:
+            # single point, place it at the fitted root but away from the edges
+            w    = hi-lo
+            news = [min(max(tt, lo+(0.1*w)), hi-(0.1*w))]
+        else:
+            news = _np.linspace(lo, hi, k+2)[1:-1]
+        if not set(round(float(t), 6) for t in news) - set(points):
+            break
+        evaluate(news)
+
+    if tt is None:
+        tt, err = (lo+hi)/2, (hi-lo)/2
+    return tt, err, table()
+# end findThickness (func)
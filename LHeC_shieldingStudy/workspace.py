@@ -0,0 +1,48 @@
+"""
+Separate workspace directories for shielding studies.
+
+By default a study writes 'GMAD/...', 'rebdsim-input.txt' and 'tmp/...' relative
+to the directory python was run from, so two studies running at the same time
+overwrite each others gmad files and analysis config. A study given a workspace
+writes all of these inside its own directory and uses absolute paths for
+everything, the bdsim output still goes to the DATA tree of the directory the
+study was created in.
+
+Example:
+
+>>> s = shieldingStudy("Pb", 10000, 30, 0.025, "quads", workspace=True)
+>>> s.genGMAD()       # written to workspaces/quads-Pb-0.025m/GMAD/
+"""
+
+import os as _os
+import shutil as _shutil
+
+# user provided gmad files included by genGMAD which are copied into each workspace
+INCLUDES = ("material_Concretes.gmad",)
+
+
+def defaultPath(runKey, colMat, thickness):
+    """
+    Workspace used for workspace=True.
+    """
+    return _os.path.join("workspaces", "{}-{}-{}m".format(runKey, colMat, thickness))
+# end defaultPath (func)
+
+def setup(path, root=None):
+    """
+    Create the workspace directory (with GMAD/ and tmp/) and copy the user provided gmad
+    files from the GMAD directory of 'root' (default is the current directory). Return the
+    absolute path of the workspace.
+    """
+    root = _os.path.abspath(root or _os.getcwd())
+    path = _os.path.abspath(path)
+    for d in ["GMAD", "tmp"]:
+        _os.makedirs(_os.path.join(path, d), exist_ok=True)
+
+    for name in INCLUDES:
+        src = _os.path.join(root, "GMAD", name)
+        dst = _os.path.join(path, "GMAD", name)
+        if _os.path.exists(src) and not _os.path.exists(dst):
+            _shutil.copy(src, dst)
+    return path
+# end setup (func)
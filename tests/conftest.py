@@ -0,0 +1,30 @@
+"""
+Fixtures shared by the tests. The studies are run with the bdsim/rebdsim stand-in of
+benchmark.py in a temporary directory, so neither bdsim, ROOT nor pybdsim are needed.
+"""
+
+import pytest
+
+from LHeC_shieldingStudy import benchmark as _benchmark
+
+
+@pytest.fixture
+def standIn(tmp_path, monkeypatch):
+    """
+    Running benchmark.standIn with a small number of photons per run, in a temporary directory.
+    """
+    monkeypatch.chdir(tmp_path)
+    with _benchmark.standIn(photons=5000, memory=False) as sim:
+        yield sim
+
+@pytest.fixture
+def newStudy(standIn):
+    """
+    Factory of studies of the stand-in with their gmad files written, the keyword arguments
+    are set as attributes of the study.
+    """
+    def make(ir="Dipole_half", material="Pb", thickness=0.05, nruns=4, **attrs):
+        s = _benchmark._newStudy(ir, material, thickness, nruns, **attrs)
+        s.genGMAD()
+        return s
+    return make
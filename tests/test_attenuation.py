@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import attenuation
+
+
+@pytest.fixture
+def table():
+    # layout of Atten-Coeffs.xlsx, energies not sorted and a missing coefficient of Iron
+    return attenuation.coefficientTable(["Lead", "Iron"], [1.0, 0.1, 10.0], [11.35, 7.87],
+                                        [[0.07, 5.5, 0.05], [0.06, 0.0, 0.03]])
+
+
+def test_index(table):
+    assert table.index(["Pb", "Iron"]).tolist() == [0, 1]
+    with pytest.raises(ValueError):
+        table.index(["W"])
+
+
+def test_linear_interpolation(table):
+    mu = table.linear(["Pb"], [0.1, 1.0, np.sqrt(10)])
+    # tabulated and log-log half way between 1 and 10 MeV
+    assert np.allclose(mu[0], 11.35*np.array([5.5, 0.07, np.sqrt(0.07*0.05)]))
+
+
+def test_linear_missing(table):
+    mu = table.linear(["Pb", "Fe"], [0.01, 0.1, 0.5, 1.0, 20.0])
+    assert np.isnan(mu[:, [0, 4]]).all()
+    # no coefficient of Iron at 0.1 MeV, so nothing below 1 MeV either
+    assert np.isnan(mu[1, 1]) and np.isnan(mu[1, 2])
+    assert np.isclose(mu[1, 3], 7.87*0.06)
+
+    clipped = table.linear(["Pb"], [0.01, 20.0], clip=True)
+    assert np.allclose(clipped[0], 11.35*np.array([5.5, 0.05]))
+
+
+def test_thickness_transmission_inverse(table):
+    energies, f = [0.3, 1.0, 4.0], np.array([0.5, 1e-2, 1e-4])
+    t = attenuation.thickness(["Pb", "Fe"], energies, f, table=table)
+    assert t.shape == (2, 3, 3)
+    assert np.allclose(t[0, 1], -np.log(f)/(11.35*0.07))
+    back = attenuation.transmission(["Pb"], energies, t[0, 2], table=table)
+    assert np.allclose(back[0, 2], f)
+    assert np.isnan(t[1, 0]).all()
+
+
+def test_foldedTransmission(table):
+    t = np.linspace(0, 2, 5)
+    single = attenuation.foldedTransmission(["Pb"], t, [1.0], [3.0], table=table)
+    assert np.allclose(single, attenuation.transmission(["Pb"], [1.0], t, table=table)[:, 0])
+
+    f = attenuation.foldedTransmission(["Pb"], t, [1.0, 10.0], [1, 3], table=table)
+    mu = 11.35*np.array([0.07, 0.05])
+    assert np.allclose(f[0], (0.25*np.exp(-mu[0]*t))+(0.75*np.exp(-mu[1]*t)))
+    # below the table the nearest coefficient is used unless clip is off
+    assert np.isfinite(attenuation.foldedTransmission(["Pb"], t, [0.01], [1], table=table)).all()
+    assert np.isnan(attenuation.foldedTransmission(["Pb"], t, [0.01], [1], table=table, clip=False)).all()
+
+
+def test_foldedThickness(table):
+    energies, weights = [0.1, 1.0, 10.0], [5, 2, 1]
+    f = np.array([1.0, 0.1, 1e-3])
+    t = attenuation.foldedThickness(["Pb"], f, energies, weights, table=table, tol=1e-9)
+    assert t[0, 0] == pytest.approx(0, abs=1e-8)
+    assert np.allclose(attenuation.foldedTransmission(["Pb"], t[0], energies, weights, table=table)[0], f)
+    # a missing coefficient in the spectrum gives nan
+    assert np.isnan(attenuation.foldedThickness(["Fe"], f, energies, weights, table=table)).all()
+
+
+@pytest.mark.parametrize("f", [0, -0.1, 1.5])
+def test_foldedThickness_bad_transmission(table, f):
+    with pytest.raises(ValueError):
+        attenuation.foldedThickness(["Pb"], [0.5, f], [1.0], [1], table=table)
@@ -0,0 +1,87 @@
+import operator
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import batch, campaign
+
+
+def same(a, b):
+    return all(np.array_equal(np.asarray(x), np.asarray(y)) for x, y in zip(a, b))
+
+
+@pytest.fixture
+def executor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with batch.batchExecutor(batch.localScheduler(2), directory="batch", poll=0.2) as ex:
+        yield ex
+
+
+def test_results(executor):
+    futures = [executor.submit(operator.mul, i, 3) for i in range(5)]
+    assert [f.result(timeout=60) for f in futures] == [0, 3, 6, 9, 12]
+    # submitted together, one job array of five tasks
+    arrays = os.listdir("batch")
+    assert len(arrays) == 1 and len(os.listdir(os.path.join("batch", arrays[0], "results"))) == 5
+
+
+def test_exception(executor):
+    f = executor.submit(int, "x")
+    with pytest.raises(ValueError):
+        f.result(timeout=60)
+
+
+def test_no_result(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # the job fails before python writes its result
+    with batch.batchExecutor(batch.localScheduler(1), directory="batch", poll=0.2, setup=["echo broken; exit 3"]) as ex:
+        f = ex.submit(operator.add, 1, 2)
+        with pytest.raises(RuntimeError, match="finished without a result") as e:
+            f.result(timeout=60)
+    log = str(e.value).rsplit(" ", 1)[-1]
+    assert open(log).read() == "broken\n"
+
+
+def test_runTask(tmp_path):
+    array = str(tmp_path)
+    for d in ["tasks", "results"]:
+        os.makedirs(os.path.join(array, d))
+    for k, call in enumerate([(divmod, (7, 2), {}), (divmod, (1, 0), {})]):
+        with open(batch._taskFile(array, k), "wb") as f:
+            pickle.dump(call, f)
+    assert batch.runTask(array, 0) == 0
+    assert batch.runTask(array, 1) == 1
+    with open(batch._resultFile(array, 0), "rb") as f:
+        assert pickle.load(f) == ("ok", (3, 1))
+    with open(batch._resultFile(array, 1), "rb") as f:
+        status, e, tb = pickle.load(f)
+    assert status == "error" and isinstance(e, ZeroDivisionError) and "ZeroDivisionError" in tb
+
+
+def test_shutdown(executor):
+    executor.shutdown()
+    with pytest.raises(RuntimeError):
+        executor.submit(operator.add, 1, 2)
+
+
+def test_fromSpec(tmp_path):
+    ex = batch.fromSpec({"scheduler": "slurm", "options": ["--mem=2G"], "directory": str(tmp_path/"b"), "poll": 5})
+    assert isinstance(ex.scheduler, batch.slurm) and ex.scheduler.options == ["--mem=2G"] and ex.poll == 5
+    assert batch.fromSpec({"slots": 3, "directory": str(tmp_path/"b")}).scheduler.slots == 3
+    with pytest.raises(ValueError):
+        batch.fromSpec({"scheduler": "pbs"})
+
+
+def test_study_same_as_serial(newStudy, standIn):
+    serial = newStudy(nruns=3).runStudy()
+    with batch.batchExecutor(batch.localScheduler(2), directory="batch", poll=0.2) as ex:
+        assert same(newStudy(nruns=3).runStudy(executor=ex), serial)
+
+    spec = {"ir": "Dipole_half", "materials": ["Pb"], "thicknesses": [0.02, 0.05], "ngenerate": 1000, "nruns": 2,
+            "runKey": "b", "workspaces": "ws"}
+    rows    = campaign.campaign(spec).run(write=False)
+    batched = campaign.campaign(dict(spec, batch={"slots": 2, "poll": 0.2})).run(write=False)
+    assert sorted(rows) == sorted(batched)
+    assert all(same(rows[p], batched[p]) for p in rows)
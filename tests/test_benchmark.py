@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import benchmark, regions
+
+
+@pytest.mark.parametrize("ir", ["Dipole_half", "quads"])
+def test_gmadGeometry(newStudy, ir):
+    s     = newStudy(ir=ir, thickness=0.06)
+    shield = benchmark.gmadGeometry(s._gmadFile())
+    assert np.allclose(shield["regions"].edges, s._regions().edges)
+    assert shield["regions"].names == s._regions().names
+    assert shield["samplers"] == s._samplerNames
+    assert shield["thickness"] == pytest.approx(0.06)
+    assert not shield["weighted"]
+
+
+def test_gmadGeometry_slabs(newStudy):
+    s      = newStudy(thickness=0.06, slabs=3, bias=0.5)
+    shield = benchmark.gmadGeometry(s._gmadFile())
+    assert shield["samplers"] == s._samplerNames[:1]+s._slabSamplers()
+    assert shield["thickness"] == pytest.approx(0.06)
+    assert shield["weighted"]
+
+
+def test_gmadGeometry_no_shielding(tmp_path):
+    path = tmp_path/"input.gmad"
+    path.write_text('d1: drift, l=1*m;\nl0: line=(d1);\nuse, period=l0;\n')
+    with pytest.raises(ValueError):
+        benchmark.gmadGeometry(str(path))
+
+
+def test_syntheticSamplers():
+    r    = regions.apertureRegions(eAperture=0.005, pAperture=0.02, sep=0.121896, pieces=2)
+    data = benchmark.syntheticSamplers(r, ["A", "B_S0", "B"], 20000, 0.04, seed=1, nevents=10, weighted=True)
+    n    = [len(data["{}.x".format(s)]) for s in ["A", "B_S0", "B"]]
+    assert n[0] == 20000 and n[0] > n[1] > n[2]
+    assert data["A.event"].max() < 10 and np.all(np.diff(data["A.event"]) >= 0)
+    assert np.all(data["B.weight"] == 1)
+
+    # only the photons hitting the shielding are removed, at exp(-mu*t) per slab
+    cols = {s: regions.samplerColumns(s, {b: data["{}.{}".format(s, b)] for b in ("x", "zp", "partID")}) for s in ["A", "B_S0", "B"]}
+    counts = r.count(cols["A"], cols["B_S0"], cols["B"])
+    assert np.allclose(r.apertures(counts[2]), r.apertures(counts[0]))
+    hits = r.index("col_0_a", "col_0_b", "col_1")
+    before, half, after = counts[:, regions.FORWARD, hits].sum(axis=1)
+    assert half/before == pytest.approx(np.exp(-60*0.02), rel=0.05)
+    assert after/before == pytest.approx(np.exp(-60*0.04), rel=0.1)
+
+
+def test_standIn_calls(newStudy, standIn):
+    s = newStudy(nruns=2)
+    s.runStudy()
+    stages = [c[0] for c in standIn.calls()]
+    assert stages.count("bdsim") == 2 and stages.count("rebdsim") == 2
+
+
+def test_checkStudy():
+    checks = benchmark.checkStudy(photons=2000, nruns=2, workers=2)
+    assert checks == dict.fromkeys(checks, True)
+    assert {"workers", "cache", "journal", "reduction", "cleanup", "campaign"} <= set(checks)
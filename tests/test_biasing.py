@@ -0,0 +1,35 @@
+import glob
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import biasing, journal
+
+
+def test_definitions():
+    assert biasing.definitions(None) == []
+    assert biasing.biasName(None) is None and biasing.biasName(0.2) == biasing.NAME
+    d, = biasing.definitions(0.2, processes=("phot", "compt"))
+    assert d == 'shieldingBias: xsecBias, particle="gamma", proc="phot compt", xsecfact={0.2,0.2}, flag={1,1};'
+    # every photon, also the replayed primaries of a photon bank
+    assert biasing.FLAG == 1
+
+
+@pytest.mark.parametrize("bias", [0, -0.5])
+def test_definitions_bad_factor(bias):
+    with pytest.raises(ValueError):
+        biasing.definitions(bias)
+
+
+def test_biased_study(newStudy):
+    s = newStudy(bias=0.2)
+    extra = "".join(open(p).read() for p in glob.glob(s._path("GMAD", "extra-*.gmad")))
+    assert biasing.definitions(0.2)[0] in extra
+    assert 'biasMaterial="shieldingBias"' in open(s._gmadFile()).read()
+    assert 'biasMaterial="shieldingBias"' in extra
+
+    # the stand-in gives every photon a weight of 1, the counts are sums of the weights
+    value = s.runStudy(checkpoint=True)[0]
+    runs  = journal.studyJournal(s).load()
+    assert runs and all(isinstance(c, float) for r in runs.values() for c in r)
+    assert np.isclose(value, newStudy().runStudy()[0])
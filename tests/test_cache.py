@@ -0,0 +1,85 @@
+import os
+
+from LHeC_shieldingStudy import cache
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+    return str(path)
+
+
+def test_gmadHash_follows_includes(tmp_path):
+    main = write(tmp_path/"input.gmad", '! written today\ninclude extra.gmad;\nl1: line=(d1);\n')
+    write(tmp_path/"extra.gmad", 'd1: drift, l=1;\n')
+    h = cache.gmadHash(main)
+
+    # only comments changed
+    write(tmp_path/"input.gmad", '! written tomorrow\ninclude extra.gmad;\nl1: line=(d1);\n')
+    assert cache.gmadHash(main) == h
+
+    write(tmp_path/"extra.gmad", 'd1: drift, l=2;\n')
+    assert cache.gmadHash(main) != h
+
+
+def test_gmadHash_independent_of_names(tmp_path):
+    (tmp_path/"a").mkdir()
+    (tmp_path/"b").mkdir()
+    write(tmp_path/"a"/"x.gmad", 'd1: drift, l=1;\n')
+    write(tmp_path/"b"/"y.gmad", 'd1: drift, l=1;\n')
+    a = write(tmp_path/"a"/"input.gmad", 'include x.gmad;\n')
+    b = write(tmp_path/"b"/"input.gmad", 'include y.gmad;\n')
+    assert cache.gmadHash(a) == cache.gmadHash(b)
+
+
+def test_put_get(tmp_path):
+    c = cache.resultCache(str(tmp_path/"cache"))
+    assert c.get("k") is None
+    c.put("k", [1, 2, 3])
+    assert c.get("k") == [1.0, 2.0, 3.0]
+
+
+def test_lru_eviction(tmp_path):
+    c = cache.resultCache(str(tmp_path/"cache"), maxEntries=2)
+    c.put("a", [1])
+    c.put("b", [2])
+    os.utime(c._file("a"), (100, 100))
+    os.utime(c._file("b"), (200, 200))
+    # using a marks it as the most recently used, b is evicted next
+    c.get("a")
+    c.put("c", [3])
+    assert c.get("b") is None
+    assert c.get("a") == [1.0] and c.get("c") == [3.0]
+
+
+def test_eviction_by_size(tmp_path):
+    c = cache.resultCache(str(tmp_path/"cache"))
+    c.put("a", [1])
+    size = os.path.getsize(c._file("a"))
+    c.maxSize = 2*size
+    os.utime(c._file("a"), (100, 100))
+    c.put("b", [2])
+    os.utime(c._file("b"), (200, 200))
+    c.put("c", [3])
+    assert [e[2] for e in c.entries()] == [c._file("b"), c._file("c")]
+
+
+def test_keys(newStudy):
+    s = newStudy()
+    s._prepareRuns()
+    assert cache.runKey(s, 0) != cache.runKey(s, 1)
+    assert cache.runKey(s, 0) == cache.runKey(newStudy(), 0)
+
+    s.pAperture = 0.01
+    assert cache.runKey(s, 0) != cache.runKey(newStudy(), 0)
+    assert cache.configKey(newStudy(thickness=0.1)) != cache.configKey(newStudy())
+
+
+def test_runs_reused(newStudy, standIn):
+    c     = cache.resultCache("cache")
+    first = newStudy().runStudy(cache=c)
+    n     = len(standIn.calls())
+    assert n > 0 and len(c.entries()) == 4
+
+    assert tuple(newStudy().runStudy(cache=c)[:2]) == tuple(first[:2])
+    assert len(standIn.calls()) == n
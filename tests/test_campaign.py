@@ -0,0 +1,81 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import campaign
+
+
+def spec(**kwargs):
+    return dict({"ir": "Dipole_half", "materials": ["Pb"], "thicknesses": [0.05, 0.1], "ngenerate": 1000,
+                 "nruns": 3, "runKey": "test", "workspaces": "campaign"}, **kwargs)
+
+
+def rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_getModule():
+    assert campaign.getModule("quads").__name__.endswith("quadsHalfQuads_full")
+    with pytest.raises(ValueError):
+        campaign.getModule("Dipole")
+
+
+def test_jobs_longest_first():
+    c    = campaign.campaign(spec(materials=["Cu", "Pb"], thicknesses=[0.01, 0.2, 0.1]))
+    jobs = c.jobs()
+    assert len(jobs) == 2*3*3
+    assert [j[1] for j in jobs] == sorted((j[1] for j in jobs), reverse=True)
+
+
+def test_concurrency_limited_by_memory():
+    c = campaign.campaign(spec(memoryPerJob=4, maxMemory=10))
+    assert c.concurrency(16) == 2
+    assert c.concurrency(1) == 1
+
+
+def test_mergeCSV(tmp_path):
+    path = str(tmp_path/"Pb_runData.csv")
+    campaign.mergeCSV(path, ["", "a"], [[0.1, 1], [0.03, 2]])
+    campaign.mergeCSV(path, ["", "a"], [[0.05, 3], [0.1, 4]])
+    assert rows(path) == [["", "a"], ["0.03", "2"], ["0.05", "3"], ["0.1", "4"]]
+
+
+def test_mergeCSV_appended_reruns(tmp_path):
+    # a file the runSim scripts appended to twice
+    path = str(tmp_path/"Pb_runData.csv")
+    with open(path, "w") as f:
+        f.write(",a\n0.02,1\n,a\n0.02,5\n0.04,6\n")
+    campaign.mergeCSV(path, ["", "a"], [[0.04, 7]])
+    assert rows(path) == [["", "a"], ["0.02", "1"], ["0.02", "5"], ["0.04", "7"]]
+
+
+def test_mergeCSV_other_format(tmp_path):
+    path = str(tmp_path/"Pb_runBuffer.csv")
+    campaign.mergeCSV(path, ["", "a"], [[0.1, 1]])
+    campaign.mergeCSV(path, ["Thickness", 0, 1], [[0.2, 1, 2]])
+    assert rows(path) == [["Thickness", "0", "1"], ["0.2", "1", "2"]]
+
+
+def test_same_as_serial_studies(newStudy):
+    results = campaign.campaign(spec()).run(workers=2, write=False)
+    for t in [0.05, 0.1]:
+        s = newStudy(thickness=t, nruns=3)
+        assert results[("Pb", t)][:2] == list(s.runStudy()[:2])
+
+
+def test_writeCSV_merges_campaigns(standIn):
+    campaign.campaign(spec(thicknesses=[0.05])).run(workers=1)
+    campaign.campaign(spec(thicknesses=[0.1])).run(workers=1)
+    outdir = campaign.campaign(spec())._newStudy("Pb", 0.05)._dataDir()
+
+    data = rows(os.path.join(outdir, "Pb_runData.csv"))
+    assert data[0] == [""]+campaign.COLUMNS
+    assert [float(r[0]) for r in data[1:]] == [0.05, 0.1]
+
+    buffer = rows(os.path.join(outdir, "Pb_runBuffer.csv"))
+    assert buffer[0] == ["Thickness", "0", "1", "2"]
+    assert [float(r[0]) for r in buffer[1:]] == [0.05, 0.1]
+    assert np.all(np.array(buffer[1:], dtype=float)[:, 1:] <= 1)
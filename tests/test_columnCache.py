@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import benchmark, columnCache, reduction
+
+BRANCHES = ("x", "zp", "partID")
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    # the files read from ROOT (the stand-in)
+    calls = []
+    readSamplers = reduction.readSamplers
+    def counted(filename, *args, **kwargs):
+        calls.append(filename)
+        return readSamplers(filename, *args, **kwargs)
+    monkeypatch.setattr(reduction, "readSamplers", counted)
+    return calls
+
+
+def test_loadColumns(newStudy, reads):
+    s = newStudy()
+    samplers = s._samplerNames
+    benchmark.bdsim(s._gmadFile(), "run", 100, seed=23)
+    direct = reduction.readSamplers("run.root", samplers, branches=BRANCHES)
+    del reads[:]
+
+    first = columnCache.loadColumns("run.root", samplers, BRANCHES)
+    assert reads == ["run.root"]
+    assert os.path.exists(os.path.join("run.columns", "{}.x.npy".format(samplers[0])))
+    assert columnCache.isValid("run.root", samplers, BRANCHES)
+
+    again = columnCache.loadColumns("run.root", samplers, BRANCHES)
+    assert reads == ["run.root"]
+    for d in (first, again):
+        for name in samplers:
+            for b in BRANCHES:
+                assert isinstance(d[name].data[b], np.memmap)
+                assert np.array_equal(d[name].data[b], direct[name].data[b])
+
+    # a branch which is not cached yet is read and added
+    assert not columnCache.isValid("run.root", samplers, ("x", "event"))
+    columnCache.loadColumns("run.root", samplers[:1], ("event",))
+    assert columnCache.isValid("run.root", samplers[:1], BRANCHES+("event",))
+
+
+def test_loadColumns_changed(newStudy, reads):
+    s = newStudy()
+    sampler = s._samplerNames[0]
+    benchmark.bdsim(s._gmadFile(), "run", 100, seed=23)
+    columnCache.loadColumns("run.root", [sampler], BRANCHES)
+
+    benchmark.bdsim(s._gmadFile(), "run", 100, seed=65)
+    st = os.stat("run.root")
+    os.utime("run.root", ns=(st.st_atime_ns, st.st_mtime_ns+10**9))
+    assert not columnCache.isValid("run.root", [sampler], BRANCHES)
+    x = columnCache.loadColumns("run.root", [sampler], BRANCHES)[sampler].data["x"]
+    assert reads == ["run.root", "run.root"]
+    assert np.array_equal(x, reduction.readSamplers("run.root", [sampler])[sampler].data["x"])
@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import countStatistics as cs
+
+
+def runs(n, slabs=1, seed=0):
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        before = int(rng.integers(800, 1200))
+        after  = [int(rng.binomial(before, p)) for p in np.linspace(0.5, 0.05, slabs)]
+        out.append([before+100, 10, 20, before+50, before, after[-1]]+after[:-1])
+    return out
+
+
+def test_betaInc():
+    # I_x(1, b) = 1-(1-x)^b and I_x(a, 1) = x^a
+    x = np.array([0.0, 0.1, 0.5, 0.9, 1.0])
+    assert np.allclose(cs.betaInc(1, 3, x), 1-((1-x)**3))
+    assert np.allclose(cs.betaInc(2.5, 1, x), x**2.5)
+
+
+def test_betaQuantile_inverse():
+    q = np.array([0.05, 0.5, 0.95])
+    for a, b in [(1, 1), (3, 7), (50, 2)]:
+        assert np.allclose(cs.betaInc(a, b, cs.betaQuantile(q, a, b)), q, atol=1e-10)
+
+
+def test_normal_approximation(monkeypatch):
+    q = np.array([0.16, 0.5, 0.84])
+    for a, b in [(5000.0, 1500.0), (1001.0, 3000.0)]:
+        sd     = math.sqrt(a*b/(((a+b)**2)*(a+b+1)))
+        approx = cs._normalQuantile(q, a, b)
+        with monkeypatch.context() as m:
+            # bisected
+            m.setattr(cs, "NORMAL_ABOVE", np.inf)
+            exact = cs.betaQuantile(q, a, b)
+        assert np.all(np.abs(approx-exact) < 1e-3*sd)
+        assert np.all(np.abs(cs.betaQuantile(q, a, b)-exact) < 1e-3*sd)
+
+
+def test_clopperPearson():
+    n, alpha = 20, 1-cs.ONE_SIGMA
+    lo, hi = cs.clopperPearson([0, n, 5], [n, n, n])
+    assert lo[0] == 0 and hi[0] == pytest.approx(1-((alpha/2)**(1/n)))
+    assert hi[1] == 1 and lo[1] == pytest.approx((alpha/2)**(1/n))
+    assert lo[2] < 5/n < hi[2]
+    # wider at a higher confidence
+    lo95, hi95 = cs.clopperPearson(5, n, conf=0.95)
+    assert lo95 < lo[2] and hi95 > hi[2]
+
+
+def test_statistics():
+    r     = runs(10)
+    stats = cs.runStatistics.fromRuns(r)
+    x     = np.array(r, dtype=float)
+    f     = 1-(x[:, 5]/x[:, 4])
+    value, err = stats.fractions()
+    assert value[0] == pytest.approx(f.mean()) and err[0] == pytest.approx(f.std()/np.sqrt(10))
+    assert stats.count(0) == pytest.approx((x[:, 0].mean(), x[:, 0].std()/np.sqrt(10)))
+    assert np.allclose(stats.fractionRange(), ([f.min()], [f.max()]))
+    assert stats.pooled()[0] == pytest.approx(1-(x[:, 5].sum()/x[:, 4].sum()))
+
+    R   = x[:, 5].sum()/x[:, 4].sum()
+    res = x[:, 5]-(R*x[:, 4])
+    assert stats.pooledError()[0] == pytest.approx(res.std()/np.sqrt(10)/x[:, 4].mean())
+
+    lo, hi = stats.exact()
+    assert lo[0] < stats.pooled()[0] < hi[0]
+    blo, bhi = stats.bootstrap()
+    assert blo[0] < stats.pooled()[0] < bhi[0]
+
+
+def test_merge_any_order():
+    r    = runs(12, slabs=3)
+    all_ = cs.runStatistics.fromRuns(r)
+    for split in [(0, 5, 12), (0, 1, 7, 12), (0, 11, 12)]:
+        parts = [cs.runStatistics.fromRuns(r[a:b], start=a) for a, b in zip(split[:-1], split[1:])]
+        merged = cs.runStatistics()
+        for p in reversed(parts):
+            merged.merge(p)
+        assert merged.n == 12
+        for name in ["fractions", "pooled", "pooledError", "exact", "bootstrap", "fractionRange"]:
+            assert np.allclose(getattr(merged, name)(), getattr(all_, name)()), name
+    assert len(all_.pooled()) == 3
+
+
+def test_merge_mismatch():
+    with pytest.raises(ValueError):
+        cs.runStatistics.fromRuns(runs(2)).merge(cs.runStatistics.fromRuns(runs(2), seed=1))
+    with pytest.raises(ValueError):
+        cs.runStatistics.fromRuns(runs(2)).merge(cs.runStatistics.fromRuns(runs(2, slabs=2)))
+
+
+def test_no_photons_before():
+    stats = cs.runStatistics()
+    with pytest.raises(ValueError, match="Run 3"):
+        stats.add([0, 0, 0, 0, 0, 0], 3)
+    assert stats.n == 0
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import LHeC_shieldingStudy
+from LHeC_shieldingStudy import benchmark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(LHeC_shieldingStudy.__file__)))
+MODULES = sorted(f[:-3] for f in os.listdir(os.path.dirname(LHeC_shieldingStudy.__file__))
+                 if f.endswith(".py") and f not in ("__init__.py", "__main__.py"))
+
+SCRIPT = """
+import sys
+# importing either of them fails
+sys.modules["pybdsim"] = None
+sys.modules["ROOT"] = None
+import importlib
+for name in sys.argv[1:]:
+    importlib.import_module("LHeC_shieldingStudy."+name)
+assert sys.modules["pybdsim"] is None and sys.modules["ROOT"] is None
+"""
+
+
+def run(*modules):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop(benchmark.STANDIN, None)
+    return subprocess.run([sys.executable, "-c", SCRIPT]+list(modules), env=env, cwd=ROOT,
+                          capture_output=True, text=True)
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_without_root(module):
+    p = run(module)
+    assert p.returncode == 0, p.stderr
+
+
+def test_import_all():
+    p = run(*MODULES)
+    assert p.returncode == 0, p.stderr
@@ -0,0 +1,68 @@
+import json
+
+from LHeC_shieldingStudy import journal
+
+
+def test_append_load(tmp_path):
+    j = journal.runJournal(str(tmp_path/"a.journal"), 1000, "cfg")
+    assert j.load() == {}
+    j.append(0, [1, 2])
+    j.append(3, [3, 4])
+    assert j.load() == {0: [1.0, 2.0], 3: [3.0, 4.0]}
+    j.clear()
+    assert j.load() == {}
+
+
+def test_filters_ngenerate_and_config(tmp_path):
+    path = str(tmp_path/"a.journal")
+    journal.runJournal(path, 1000, "old").append(0, [1])
+    journal.runJournal(path, 1000, "new").append(1, [2])
+    journal.runJournal(path, 500, "new").append(2, [3])
+
+    assert journal.runJournal(path, 1000, "new").load() == {1: [2.0]}
+    assert journal.runJournal(path, 1000, "old").load() == {0: [1.0]}
+    assert journal.runJournal(path, 500, "new").load() == {2: [3.0]}
+    # without a config every run of the same ngenerate
+    assert journal.runJournal(path, 1000).load() == {0: [1.0], 1: [2.0]}
+
+
+def test_partial_line(tmp_path):
+    path = str(tmp_path/"a.journal")
+    j    = journal.runJournal(path, 1000)
+    j.append(0, [1])
+    with open(path, "a") as f:
+        f.write('{"run": 1, "ngen')       # crashed while writing
+    j.append(2, [3])
+    assert j.load() == {0: [1.0], 2: [3.0]}
+    with open(path) as f:
+        assert json.loads(f.read().splitlines()[-1])["run"] == 2
+
+
+def test_resume(newStudy, standIn):
+    first = newStudy().runStudy(checkpoint=True)
+    n     = len(standIn.calls())
+    assert len(journal.studyJournal(newStudy()).load()) == 4
+
+    assert tuple(newStudy().runStudy(checkpoint=True)[:2]) == tuple(first[:2])
+    assert len(standIn.calls()) == n
+
+
+def test_resume_after_crash(newStudy, standIn):
+    s     = newStudy()
+    full  = s.runStudy()
+    j     = journal.studyJournal(s)
+    done  = {i: s._runSeed(i) for i in [0, 2]}
+    for i, counts in done.items():
+        j.append(i, counts)
+    n     = len(standIn.calls())
+
+    assert tuple(newStudy().runStudy(checkpoint=True)[:2]) == tuple(full[:2])
+    # only the two runs missing from the journal, bdsim and rebdsim each
+    assert len(standIn.calls()) == n+4
+
+
+def test_changed_config_reruns(newStudy, standIn):
+    newStudy().runStudy(checkpoint=True)
+    n = len(standIn.calls())
+    newStudy(slabs=2).runStudy(checkpoint=True)
+    assert len(standIn.calls()) > n
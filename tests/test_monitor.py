@@ -0,0 +1,96 @@
+import subprocess
+import sys
+import time
+import types
+
+import pytest
+
+from LHeC_shieldingStudy import monitor
+
+BUSY = "import time\nt = time.process_time()\nwhile time.process_time()-t < 0.3: pass\n"
+
+
+def study(events):
+    return types.SimpleNamespace(monitor=events.append, _runKey="run", _colMat="Pb", _thickness=0.05)
+
+
+def test_commands():
+    assert monitor.bdsimCommand("a.gmad", "out", 10, options=["--seed=1"]) == \
+        ["bdsim", "--file=a.gmad", "--outfile=out", "--batch", "--ngenerate=10", "--seed=1"]
+    assert monitor.rebdsimCommand("c.txt", "in.root", "out.root", executable="x") == ["x", "c.txt", "in.root", "out.root"]
+
+
+def test_runProcess_usage():
+    event = {}
+    assert monitor.runProcess([sys.executable, "-c", BUSY], event) == 0
+    # the cpu time of the child itself
+    assert event["childCpu"] >= 0.25 and event["childMaxRSS"] > 0
+    monitor.runProcess([sys.executable, "-c", "pass"], event)
+    assert event["childCpu"] >= 0.25
+
+
+def test_runProcess_status(tmp_path):
+    with pytest.raises(RuntimeError, match="exited with status 3"):
+        monitor.runProcess([sys.executable, "-c", "raise SystemExit(3)"])
+    assert monitor.runProcess([sys.executable, "-c", "raise SystemExit(3)"], check=False) == 3
+
+    out = tmp_path/"out.txt"
+    with open(out, "w") as f:
+        monitor.runProcess([sys.executable, "-c", "print('hello')"], stdout=f)
+    assert out.read_text() == "hello\n"
+
+
+def test_runProcess_timeout():
+    t0 = time.perf_counter()
+    with pytest.raises(subprocess.TimeoutExpired):
+        monitor.runProcess([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.5)
+    assert time.perf_counter()-t0 < 10
+
+
+def test_stage():
+    events = []
+    s = study(events)
+    with monitor.stage(s, "bdsim", 23, events=100) as event:
+        monitor.runProcess([sys.executable, "-c", BUSY], event)
+        event["photons"] = 7
+    with pytest.raises(ValueError):
+        with monitor.stage(s, "reduce", 23):
+            raise ValueError("bad")
+
+    bdsim, reduce = events
+    assert (bdsim["stage"], bdsim["seed"], bdsim["material"], bdsim["photons"]) == ("bdsim", 23, "Pb", 7)
+    assert bdsim["childCpu"] >= 0.25 and bdsim["wall"] >= bdsim["childCpu"]/2
+    assert bdsim["eventsPerSec"] == pytest.approx(100/bdsim["wall"])
+    assert reduce["childMaxRSS"] is None and "ValueError" in reduce["error"]
+
+    # nothing is measured without a monitor
+    with monitor.stage(types.SimpleNamespace(), "bdsim") as event:
+        pass
+    assert event == {}
+
+
+def test_eventLog(tmp_path):
+    path = tmp_path/"events.jsonl"
+    log  = monitor.eventLog(str(path))
+    log({"stage": "bdsim", "wall": 2.0, "cpu": 0.1, "childCpu": 1.5, "bytes": 10})
+    log({"stage": "reduce", "wall": 1.0, "cpu": 0.9, "childCpu": 0.0, "bytes": 0, "photons": 5, "error": "x"})
+    log({"stage": "bdsim", "wall": 1.0, "cpu": 0.1, "childCpu": 0.5, "bytes": 20})
+    with open(path, "a") as f:
+        f.write('{"stage": "bd')
+    events = monitor.loadEvents(str(path))
+    assert len(events) == 3
+
+    summary = monitor.summarise(events)
+    assert summary["bdsim"]["n"] == 2 and summary["bdsim"]["childCpu"] == 2.0 and summary["bdsim"]["bytes"] == 30
+    assert summary["bdsim"]["fraction"] == pytest.approx(0.75)
+    assert summary["reduce"]["photons"] == 5 and summary["reduce"]["errors"] == 1
+
+
+def test_study_events(newStudy, tmp_path):
+    events = []
+    s = newStudy(nruns=2, monitor=events.append)
+    s.runStudy()
+    stages = [e["stage"] for e in events]
+    assert stages.count("bdsim") == 2 and stages.count("rebdsim") == 2
+    assert sorted(set(e["seed"] for e in events if e["stage"] == "bdsim")) == [23, 65]
+    assert all(e["childMaxRSS"] for e in events if e["stage"] == "bdsim")
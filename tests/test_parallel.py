@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import parallel
+
+
+def same(a, b):
+    return all(np.array_equal(np.asarray(x), np.asarray(y)) for x, y in zip(a, b))
+
+
+def test_workers_same_as_serial(newStudy):
+    serial = newStudy()
+    result = serial.runStudy()
+    pooled = newStudy()
+    assert same(pooled.runStudy(workers=2), result)
+    assert pooled.getBuffer() == serial.getBuffer()
+
+
+def test_runs_in_seed_order(newStudy, standIn):
+    s    = newStudy()
+    s._prepareRuns()
+    runs = parallel.runSeeds(s, [3, 0, 2], workers=2)
+    assert same(runs[0], s._runSeed(3)) and same(runs[1], s._runSeed(0)) and same(runs[2], s._runSeed(2))
+
+
+@pytest.mark.parametrize("ir", ["Dipole_half", "quads"])
+def test_outputs_removed_unless_kept(newStudy, standIn, ir):
+    newStudy(ir).runStudy()
+    outputs = set(path for _, path in standIn.calls())
+    assert len(outputs) == 8 and not any(os.path.exists(p) for p in outputs)
+
+    newStudy(ir, keep=True).runStudy()
+    assert all(os.path.exists(p) for p in outputs)
+
+
+def test_absorbed():
+    assert parallel.absorbed([10, 0, 0, 8, 200, 50]) == pytest.approx(0.75)
+    with pytest.raises(ValueError):
+        parallel.absorbed([10, 0, 0, 8, 0, 0])
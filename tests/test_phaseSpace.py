@@ -0,0 +1,78 @@
+import os
+import types
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import phaseSpace
+
+
+@pytest.fixture
+def bank(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    b = phaseSpace.photonBank("BANK")
+    # x, xp, y, yp, zp, energy of two forward photons and a backward one
+    np.save(b.file(1), np.array([[0.01, 0.002, 0.0, -0.001, 0.5, 1e-3],
+                                 [0.02, 0.0, 0.01, 0.0, 1.0, 2e-3],
+                                 [0.03, 0.001, 0.0, 0.0, -1.0, 3e-3]]))
+    return b
+
+
+def upstream(tmp_path, ngenerate=1000, gmad="beam, energy=50;"):
+    path = tmp_path/"upstream.gmad"
+    path.write_text(gmad)
+    return types.SimpleNamespace(_ngenerate=ngenerate, _gmadFile=lambda: str(path), _samplerNames=["DRIFT_1", "COL_0"])
+
+
+def test_bank_files(bank):
+    assert bank.file(1) == os.path.join("BANK", "65.npy")
+    assert bank.has(1) and not bank.has(0)
+    b = bank.load(1)
+    assert isinstance(b, np.memmap) and b.shape == (3, len(phaseSpace.COLUMNS))
+
+
+def test_replayFile(bank):
+    path, n = bank.replayFile(1, 0.1)
+    assert n == 2
+    assert os.path.isabs(path) and path.endswith(os.path.join("BANK", "65-0.1m.dat"))
+    x, xp, y, yp, e = np.loadtxt(path).T
+    # drifted back in straight lines, only the forward photons
+    assert np.allclose(x, [0.01-(0.1*0.002/0.5), 0.02])
+    assert np.allclose(y, [0.0+(0.1*0.001/0.5), 0.01])
+    assert np.allclose(xp, [0.002, 0.0]) and np.allclose(e, [1e-3, 2e-3])
+
+    # written once for each distance
+    mtime = os.stat(path).st_mtime_ns
+    assert bank.replayFile(1, 0.1) == (path, 2)
+    assert os.stat(path).st_mtime_ns == mtime
+    assert bank.replayFile(1, 0.2)[0] != path
+
+
+def test_checkMeta(bank, tmp_path):
+    assert bank.key() == "null"
+    bank._checkMeta(upstream(tmp_path))
+    key = bank.key()
+    assert '"ngenerate": 1000' in key
+    bank._checkMeta(upstream(tmp_path))
+    with pytest.raises(ValueError):
+        bank._checkMeta(upstream(tmp_path, ngenerate=500))
+    with pytest.raises(ValueError):
+        bank._checkMeta(upstream(tmp_path, gmad="beam, energy=60;"))
+    assert bank.key() == key
+
+
+def test_replayFiles(bank, tmp_path):
+    study = types.SimpleNamespace(bank=bank, _thickness=0.05, _colMat="W", _dataDir=lambda: "DATA/run",
+                                  _gmadFile=lambda: "GMAD/input.gmad")
+    seed, cmd, output, n = phaseSpace.replayFiles(study, 1)
+    path, _ = bank.replayFile(1, 0.05+phaseSpace.REPLAY_DRIFT)
+    assert (seed, output, n) == (65, "DATA/run/W-0.05m_replay_65.root", 2)
+    assert "--ngenerate=2" in cmd and "--seed=65" in cmd and "--distrFile={}".format(path) in cmd
+    assert phaseSpace.replayFiles(study, 1, attempt=2)[2] == "DATA/run/W-0.05m_replay_65_retry2.root"
+
+
+def test_upstreamStudy():
+    study = types.SimpleNamespace(bank=object(), _gmadKey=None, _runKey="run2b")
+    up    = phaseSpace.upstreamStudy(study)
+    assert up.bank is None and up._gmadKey == "run2b-upstream"
+    assert study.bank is not None
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import struct
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import journal, pipeline
+
+BUSY = "import time\nt = time.process_time()\nwhile time.process_time()-t < 0.3: pass\n"
+
+
+def same(a, b):
+    return all(np.array_equal(np.asarray(x), np.asarray(y)) for x, y in zip(a, b))
+
+
+def rootFile(path, version, end, size):
+    if version >= 1000000:
+        head = b"root"+struct.pack(">iiq", version, 100, end)
+    else:
+        head = b"root"+struct.pack(">iii", version, 100, end)
+    path.write_bytes(head.ljust(size, b"\0"))
+    return str(path)
+
+
+def test_rootFileComplete(tmp_path):
+    assert pipeline.rootFileComplete(rootFile(tmp_path/"a.root", 62400, 500, 500))
+    assert pipeline.rootFileComplete(rootFile(tmp_path/"b.root", 1062400, 3000, 3000))
+    # cut short or still being written
+    assert not pipeline.rootFileComplete(rootFile(tmp_path/"c.root", 62400, 500, 400))
+    assert not pipeline.rootFileComplete(rootFile(tmp_path/"d.root", 1062400, 500, 600))
+    (tmp_path/"e.root").write_bytes(b"PK"+b"\0"*100)
+    assert not pipeline.rootFileComplete(str(tmp_path/"e.root"))
+    assert not pipeline.rootFileComplete(str(tmp_path/"missing.root"))
+
+
+@pytest.fixture(params=["pidfd", "poll"])
+def exited(request, monkeypatch):
+    # wait for the processes on a pidfd and by polling where there is none
+    if request.param == "poll":
+        monkeypatch.delattr(os, "pidfd_open", raising=False)
+    return request.param
+
+
+def test_runProcess(exited, tmp_path):
+    event = {}
+    assert asyncio.run(pipeline.runProcess([sys.executable, "-c", BUSY], event)) == 0
+    assert event["childCpu"] >= 0.25 and event["childMaxRSS"] > 0
+    assert asyncio.run(pipeline.runProcess([sys.executable, "-c", "raise SystemExit(3)"])) == 3
+
+    with open(tmp_path/"out.log", "w") as log:
+        asyncio.run(pipeline.runProcess([sys.executable, "-c", "print('hello')"], stdout=log))
+    assert (tmp_path/"out.log").read_text() == "hello\n"
+
+
+def test_runProcess_timeout(exited):
+    t0 = time.perf_counter()
+    with pytest.raises(subprocess.TimeoutExpired):
+        asyncio.run(pipeline.runProcess([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.5))
+    assert time.perf_counter()-t0 < 10
+
+
+def test_runProcess_concurrent():
+    async def main():
+        return await asyncio.gather(*[pipeline.runProcess([sys.executable, "-c", "import time; time.sleep(0.5)"])
+                                      for _ in range(4)])
+    t0 = time.perf_counter()
+    assert asyncio.run(main()) == [0, 0, 0, 0]
+    assert time.perf_counter()-t0 < 1.9
+
+
+def executable(path, text):
+    path.write_text("#!/bin/sh\n"+text)
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.mark.parametrize("rebdsim", [True, False])
+def test_same_as_serial(newStudy, rebdsim):
+    serial = newStudy(nruns=3).runStudy(rebdsim=rebdsim)
+    events = []
+    piped  = newStudy(nruns=3, monitor=events.append).runStudy(workers=2, pipeline=pipeline.stagePipeline(), rebdsim=rebdsim)
+    assert same(piped, serial)
+    stages = [e["stage"] for e in events]
+    assert stages.count("bdsim") == 3 and stages.count("rebdsim" if rebdsim else "reduce") == 3
+
+
+def test_retry(newStudy, standIn, tmp_path):
+    real  = os.path.join(standIn.directory, "bin", "bdsim")
+    # the first simulation fails, the others run
+    flaky = executable(tmp_path/"flaky", 'mkdir {} 2>/dev/null && exit 1\nexec {} "$@"\n'.format(tmp_path/"failed", real))
+    serial = newStudy(nruns=3).runStudy()
+    assert same(newStudy(nruns=3).runStudy(workers=2, pipeline=pipeline.stagePipeline(bdsim=flaky, retries=1)), serial)
+    assert os.path.isdir(tmp_path/"failed")
+
+
+def test_failed_runs(newStudy, standIn, tmp_path):
+    real   = os.path.join(standIn.directory, "bin", "bdsim")
+    broken = executable(tmp_path/"broken", 'case "$*" in *--seed=65*) exit 1;; esac\nexec {} "$@"\n'.format(real))
+    s = newStudy(nruns=3)
+    with pytest.raises(RuntimeError, match="1 of 3 runs failed after 2 attempts") as e:
+        s.runStudy(workers=2, pipeline=pipeline.stagePipeline(bdsim=broken, retries=1), checkpoint=True)
+    assert "run 1 of Pb" in str(e.value) and "exited with status 1" in str(e.value)
+    # the other runs were stored
+    assert sorted(journal.studyJournal(s).load()) == [0, 2]
+
+
+def test_timeout_and_incomplete(newStudy, tmp_path):
+    slow = executable(tmp_path/"slow", "exec sleep 30\n")
+    with pytest.raises(RuntimeError, match="timed out after 0.5 s"):
+        newStudy(nruns=1).runStudy(pipeline=pipeline.stagePipeline(timeouts={"bdsim": 0.5}, bdsim=slow, retries=0))
+    with pytest.raises(RuntimeError, match="incomplete file"):
+        newStudy(nruns=1).runStudy(pipeline=pipeline.stagePipeline(bdsim="true", retries=0))
@@ -0,0 +1,71 @@
+import os
+import types
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import plotting, results
+
+HEADER = ",Frac. survival,Frac. err,Tot. w/o cuts\n"
+
+
+def write(path, text, mtime=None):
+    path.write_text(text)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def test_readRunData(tmp_path):
+    path = tmp_path/"Pb_runData.csv"
+    # a rerun appended with its own header, replacing 0.05
+    write(path, HEADER+"0.1,0.99,0.001,100\n0.05,0.9,0.01,100\n"+HEADER+"0.05,0.91,0.005,200\n", 10**18)
+    d = plotting.readRunData(str(path))
+    assert d["thickness"].tolist() == [0.05, 0.1]
+    assert d["value"].tolist() == [0.91, 0.99]
+    assert d["err"].tolist() == [0.005, 0.001]
+    assert d["Tot. w/o cuts"].tolist() == [200, 100]
+    assert "" not in d
+
+    # read again only if the file changes
+    assert plotting.readRunData(str(path)) is d
+    write(path, HEADER+"0.2,0.999,0.0001,50\n", 10**18+10**9)
+    assert plotting.readRunData(str(path))["thickness"].tolist() == [0.2]
+
+
+def test_readRunData_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        plotting.readRunData(str(tmp_path/"none.csv"))
+
+
+def test_dataset(tmp_path):
+    os.makedirs(tmp_path/"DATA"/"quads")
+    write(tmp_path/"DATA"/"quads"/"W_runData.csv", HEADER+"0.05,0.9,0.01,100\n")
+    assert plotting.dataset("quads", "W", root=str(tmp_path))["value"].tolist() == [0.9]
+
+    db    = results.resultsDB(str(tmp_path/"results.sqlite"))
+    study = types.SimpleNamespace(_runKey="quads", _colMat="W", _thickness=0.05, _ngenerate=1000)
+    db.insert([db.row(study, i, [110, 1, 2, 105, 100, 10+i], "c") for i in range(3)])
+    d = plotting.dataset("quads", "W", source="results.sqlite", root=str(tmp_path))
+    assert d["thickness"].tolist() == [0.05] and d["value"][0] == pytest.approx(0.89)
+    assert plotting.dataset("quads", "Pb", source="results.sqlite", root=str(tmp_path))["value"].size == 0
+
+    # new runs in the database are read
+    db.insert([db.row(study, 3, [110, 1, 2, 105, 100, 50], "c")])
+    assert plotting.dataset("quads", "W", source="results.sqlite", root=str(tmp_path))["n"][0] == 4
+
+
+def test_reportFigures():
+    figs = plotting.reportFigures(["quads"], ["Pb", "W"], source="r.sqlite", outdir="out")
+    assert [f["file"] for f in figs] == [os.path.join("out", "quads_materials.pdf"), os.path.join("out", "quads_all.pdf")]
+    assert [p["title"] for p in figs[0]["panels"]] == ["Lead", "Tungsten"]
+    assert plotting._datasets(figs[1]) == {("quads", "Pb", "r.sqlite"), ("quads", "W", "r.sqlite")}
+
+
+def test_renderAll(tmp_path):
+    pytest.importorskip("matplotlib")
+    os.makedirs(tmp_path/"DATA"/"quads")
+    for m in ["Pb", "W"]:
+        write(tmp_path/"DATA"/"quads"/"{}_runData.csv".format(m), HEADER+"0.05,0.9,0.01,100\n0.1,0.99,0.001,100\n")
+    figs  = plotting.reportFigures(["quads"], ["Pb", "W"], outdir=str(tmp_path))
+    paths = plotting.renderAll(figs, workers=2, root=str(tmp_path))
+    assert all(os.path.getsize(p) > 0 for p in paths)
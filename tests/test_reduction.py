@@ -0,0 +1,65 @@
+import numpy as np
+
+from LHeC_shieldingStudy import benchmark, cache, journal, reduction, regions
+
+
+def columns(data, sampler):
+    return regions.samplerColumns(sampler, {b: data["{}.{}".format(sampler, b)] for b in ("x", "zp", "partID")})
+
+
+def test_countSamplers(newStudy):
+    s    = newStudy()
+    r    = s._regions()
+    data = benchmark.syntheticSamplers(r, s._samplerNames, 20000, 0.05, seed=3)
+    before, after = (columns(data, n) for n in s._samplerNames)
+    total, eAper, pAper, zp, numBefore, numAfter = reduction.countSamplers(s, before, after)
+
+    x, fwd = before.data["x"], (before.data["partID"] == 22) & (before.data["zp"] >= 0)
+    assert total == np.sum(before.data["partID"] == 22)
+    assert zp == np.sum(fwd)
+    assert eAper == np.sum(fwd & (x >= -s.pAperture) & (x < s.eAperture))
+    assert pAper == np.sum(fwd & (x >= s.sep-s.pAperture) & (x < s.sep+s.pAperture))
+    assert numBefore == r.shielded(r.count(before))[0]
+    assert numAfter == r.shielded(r.count(after))[0]
+    # the stand-in only removes photons hitting the shielding
+    assert 0 < numAfter < numBefore
+    assert [a[0] for a in r.apertures(r.count(after))] == [eAper, pAper]
+
+
+def test_reduceRun(newStudy):
+    s = newStudy()
+    benchmark.bdsim(s._gmadFile(), "run", s._ngenerate, seed=23)
+    data   = reduction.readSamplers("run.root", s._samplerNames)
+    counts = reduction.reduceRun(s, "run.root")
+    assert counts == reduction.countSamplers(s, *(data[n] for n in s._samplerNames))
+    assert all(isinstance(c, int) for c in counts)
+
+
+def test_reduceRun_slabs(newStudy):
+    s = newStudy(slabs=3)
+    benchmark.bdsim(s._gmadFile(), "run", s._ngenerate, seed=23)
+    counts = reduction.reduceRun(s, "run.root")
+    # the number after each of the first two slabs is appended, decreasing
+    assert len(counts) == 8
+    assert counts[4] > counts[6] > counts[7] > counts[5]
+
+
+def test_rebdsim_same_counts(newStudy):
+    runs = []
+    for rebdsim in (True, False):
+        s = newStudy()
+        s.runStudy(checkpoint=True, rebdsim=rebdsim)
+        runs.append(journal.studyJournal(s).load())
+    assert sorted(runs[0]) == sorted(runs[1])
+    for i in runs[0]:
+        assert np.allclose(runs[0][i], runs[1][i])
+
+
+def test_configKey_by_mode(newStudy):
+    s = newStudy()
+    s._prepareRuns()
+    keys = set()
+    for rebdsim in (True, False):
+        s._rebdsim = rebdsim
+        keys.add(cache.configKey(s))
+    assert len(keys) == 2
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import regions
+
+E, P, SEP = 0.005, 0.02, 0.121896
+
+
+@pytest.fixture
+def r():
+    return regions.apertureRegions(eAperture=E, pAperture=P, sep=SEP, pieces=2)
+
+
+def test_edges_and_names(r):
+    width = (SEP-E)*2
+    assert r.names == ["below", "eAper", "col_0_a", "pAper", "col_0_b", "col_1", "outside"]
+    assert np.allclose(r.edges, [-P, E, SEP-P, SEP+P, E+width, E+(2*width)])
+    assert len(r) == 7
+    assert r.index("eAper", "pAper", "outside") == [1, 3, 6]
+
+
+def test_classify(r):
+    width = (SEP-E)*2
+    x      = [-P-0.001, -P, 0, E, SEP, SEP+P, E+width, E+(2*width), 0, 0]
+    zp     = [1, 1, 1, 1, 1, 1, 1, 1, -1, 1]
+    partID = [22, 22, 22, 22, 22, 22, 22, 22, 22, 11]
+    c = r.classify(x, zp, partID)
+    assert c.shape == (3, 7)
+    # the lower edge of each region belongs to it
+    assert c[regions.FORWARD].tolist() == [1, 2, 1, 1, 1, 1, 1]
+    assert c[regions.BACKWARD].tolist() == [0, 1, 0, 0, 0, 0, 0]
+    assert c[regions.OTHER].tolist() == [0, 1, 0, 0, 0, 0, 0]
+
+
+def test_classify_weighted(r):
+    c = r.classify([0, 0, SEP], [1, 1, 1], [22, 22, 22], weight=[0.5, 0.25, 2])
+    assert c[regions.FORWARD, 1] == 0.75
+    assert c[regions.FORWARD, 3] == 2
+
+
+def test_count_shielded_apertures(r):
+    rng = np.random.default_rng(1)
+    samplers = []
+    for name in ("a", "b"):
+        data = {"x": rng.uniform(-0.05, 0.5, 1000), "zp": rng.uniform(-0.2, 1, 1000),
+                "partID": rng.choice([22, 11], 1000), "weight": rng.uniform(0, 1, 1000)}
+        samplers.append(regions.samplerColumns(name, data))
+
+    counts = r.count(*samplers)
+    assert counts.shape == (2, 3, 7)
+    assert counts.sum(axis=(1, 2)).tolist() == [1000, 1000]
+
+    numBefore, numAfter = r.shielded(counts)
+    eAper, pAper = r.apertures(counts)
+    for s, shielded, e, p in zip(samplers, (numBefore, numAfter), eAper, pAper):
+        d   = s.data
+        fwd = (d["partID"] == 22) & (d["zp"] >= 0)
+        x   = d["x"]
+        assert e == np.sum(fwd & (x >= -P) & (x < E))
+        assert p == np.sum(fwd & (x >= SEP-P) & (x < SEP+P))
+        assert shielded == np.sum(fwd)-e-p-np.sum(fwd & (x < -P))
+
+    weighted = r.count(*samplers, weighted=True)
+    d = samplers[0].data
+    fwd = (d["partID"] == 22) & (d["zp"] >= 0)
+    assert r.apertures(weighted)[0][0] == pytest.approx(np.sum(d["weight"][fwd & (d["x"] >= -P) & (d["x"] < E)]))
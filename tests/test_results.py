@@ -0,0 +1,87 @@
+import pickle
+import types
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import cache, results
+
+
+def fakeStudy(material="Pb", thickness=0.05, ir="Dipole_half"):
+    return types.SimpleNamespace(_runKey=ir, _colMat=material, _thickness=thickness, _ngenerate=1000)
+
+
+def counts(before, after, *slabs):
+    return [before+10, 1, 2, before+5, before, after]+list(slabs)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return results.resultsDB(str(tmp_path/"DATA"/"results.sqlite"))
+
+
+def test_row():
+    row = results.resultsDB.row(fakeStudy(), 2, counts(100, 10, 50, 20), config="c")
+    assert row[:6] == ("Dipole_half", "Pb", 0.05, 107, "c", 1000)
+    assert row[6:12] == (110.0, 1.0, 2.0, 105.0, 100.0, 10.0)
+    assert row[12] == "[50.0, 20.0]"
+    assert results.resultsDB.row(fakeStudy(), 0, counts(100, 10), config="c")[12] is None
+
+
+def test_insert_replace(db):
+    s = fakeStudy()
+    db.insert([db.row(s, i, counts(100, 10+i), "c") for i in range(3)])
+    db.insert([db.row(s, 1, counts(100, 50), "c")])
+    r = db.runs()
+    assert r["seed"].tolist() == [23, 65, 107]
+    assert r["numAfter"].tolist() == [10, 50, 12]
+    assert r["material"].tolist() == ["Pb"]*3
+
+
+def test_points(db):
+    rng = np.random.default_rng(0)
+    data = {}
+    for material, t, config in [("Pb", 0.05, "a"), ("Pb", 0.05, "b"), ("Pb", 0.1, "a"), ("W", 0.05, "a")]:
+        before = rng.integers(900, 1100, 5)
+        after  = rng.integers(10, 100, 5)
+        data[(material, t, config)] = (before, after)
+        db.insert([db.row(fakeStudy(material, t), i, counts(b, a), config) for i, (b, a) in enumerate(zip(before, after))])
+
+    p = db.points(material="Pb", config="a")
+    assert p["thickness"].tolist() == [0.05, 0.1]
+    for k, t in enumerate(p["thickness"]):
+        before, after = data[("Pb", t, "a")]
+        f = 1-(after/before)
+        assert p["n"][k] == 5
+        assert p["value"][k] == pytest.approx(f.mean())
+        assert p["err"][k] == pytest.approx(f.std()/np.sqrt(5))
+        assert p["pooled"][k] == pytest.approx(1-(after.sum()/before.sum()))
+
+    # another config of the same point is kept apart
+    both = db.points(material="Pb", thickness=0.05)
+    assert sorted(both["config"].tolist()) == ["a", "b"]
+    assert len(db.runs(material=["Pb", "W"], thickness=0.05)["seed"]) == 15
+    assert len(db.points(ir="other")["value"]) == 0
+    assert len(db.runs(ngenerate=10)["seed"]) == 0
+
+
+def test_pickle(db):
+    db.insert([db.row(fakeStudy(), 0, counts(100, 10), "c")])
+    copy = pickle.loads(pickle.dumps(db))
+    assert copy._conn is None
+    assert copy.runs()["numAfter"].tolist() == [10]
+
+
+def test_study_results(newStudy, tmp_path):
+    db = results.resultsDB(str(tmp_path/"results.sqlite"))
+    s  = newStudy(nruns=3, results=db)
+    value, err, _ = s.runStudy()
+    r = db.runs(ir=s._runKey)
+    assert r["seed"].tolist() == [23, 65, 107]
+    assert set(r["config"]) == {cache.configKey(s)}
+    p = db.points(ir=s._runKey)
+    assert p["value"][0] == pytest.approx(value) and p["err"][0] == pytest.approx(err)
+
+    # a rerun replaces the rows
+    newStudy(nruns=3, results=db).runStudy()
+    assert len(db.runs()["seed"]) == 3
@@ -0,0 +1,48 @@
+import numpy as np
+
+from LHeC_shieldingStudy import parallel
+
+
+class fakeStudy:
+    """
+    Runs with a fraction absorbed of 0.9 +- spread, recording which runs were made.
+    """
+
+    def __init__(self, spread, pooled=False):
+        self.spread = spread
+        self.pooled = pooled
+        self.done   = []
+
+    def _runSeed(self, i):
+        self.done.append(i)
+        after = 100+(self.spread*np.random.default_rng(i).standard_normal())
+        return [1000, 0, 0, 1000, 1000, after]
+
+
+def test_stops_at_min_runs():
+    s    = fakeStudy(spread=0)
+    runs = parallel.runUntil(s, target_err=1e-3, min_runs=5, max_runs=30)
+    assert len(runs) == 5 and s.done == list(range(5))
+
+
+def test_stops_at_max_runs():
+    s    = fakeStudy(spread=50)
+    runs = parallel.runUntil(s, target_err=1e-9, min_runs=5, max_runs=12)
+    assert len(runs) == 12 and s.done == list(range(12))
+
+
+def test_stops_once_target_reached():
+    s    = fakeStudy(spread=20)
+    runs = parallel.runUntil(s, target_err=0.005, min_runs=5, max_runs=1000)
+    f    = [parallel.absorbed(r) for r in runs]
+    assert np.std(f)/np.sqrt(len(f)) <= 0.005
+    # one run less would not have been enough
+    assert len(runs) > 5
+    f = f[:-1]
+    assert np.std(f)/np.sqrt(len(f)) > 0.005
+
+
+def test_runStudy_target_err(newStudy):
+    s = newStudy(nruns=20)
+    value, err, _ = s.runStudy(target_err=1.0, min_runs=3)
+    assert s.getNumRuns() == 3 and err <= 1.0
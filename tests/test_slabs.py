@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import slabs
+
+
+class fakeMachine:
+    # records the elements of a pybdsim Builder.Machine
+    def __init__(self):
+        self.rcols, self.placements = [], []
+
+    def AddRCol(self, name, length, **kwargs):
+        self.rcols.append((name, length, kwargs))
+
+    def AddPlacement(self, name, **kwargs):
+        self.placements.append((name, kwargs))
+
+
+def test_slabNames_edges():
+    assert slabs.slabNames("COL_0", 3) == ["COL_0_S0", "COL_0_S1", "COL_0"]
+    assert slabs.slabNames("COL_0", 1) == ["COL_0"]
+    assert np.allclose(slabs.slabEdges(0.1, 4), [0.025, 0.05, 0.075, 0.1])
+
+
+def test_addCollimator():
+    m    = fakeMachine()
+    defs = slabs.addCollimator(m, "COL", 0.09, "G4_Pb", 0.005, 0.02, 0.121896, pieces=2, nslabs=3, bias="b")
+    assert [r[0] for r in m.rcols] == ["COL_0_S0", "COL_0_S1", "COL_0"]
+    assert all(r[1] == pytest.approx(0.03) and r[2]["biasMaterial"] == "b" for r in m.rcols)
+    assert [p[0] for p in m.placements] == ["COL_1_S0_p", "COL_1_S1_p", "COL_1_p"]
+    assert m.placements[0][1]["referenceElement"] == '"COL_0_S0"'
+    assert len(defs) == 1 and "l=0.03" in defs[0] and 'biasMaterial="b"' in defs[0]
+
+
+def test_slabFractions_curve():
+    counts = [100, 1, 2, 90, 80, 10, 40, 20]
+    assert np.allclose(slabs.slabFractions(counts), [0.5, 0.75, 0.875])
+
+    t, value, err = slabs.attenuationCurve([[0.5, 0.7], [0.6, 0.9]], 0.1)
+    assert np.allclose(t, [0.05, 0.1])
+    assert np.allclose(value, [0.55, 0.8])
+    assert np.allclose(err, [0.05, 0.1]/np.sqrt(2))
+
+
+@pytest.mark.parametrize("pooled", [False, True])
+def test_getCurve(newStudy, pooled):
+    s = newStudy(thickness=0.09, slabs=3, pooled=pooled)
+    value, err, _ = s.runStudy()
+    t, curve, curveErr = s.getCurve()
+    assert np.allclose(t, [0.03, 0.06, 0.09])
+    assert curve[0] < curve[1] < curve[2]
+    assert np.isclose(curve[-1], value) and np.isclose(curveErr[-1], err)
+
+    # the first slab absorbs as much as a shielding of its thickness
+    thin = newStudy(thickness=0.03, pooled=pooled)
+    assert np.isclose(thin.runStudy()[0], curve[0])
@@ -0,0 +1,133 @@
+import types
+
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import benchmark, reduction, streaming
+
+
+class fakeView:
+    # the buffer returned by TTree::GetVal, shaped in place
+    def __init__(self, values):
+        self.values = values
+
+    def reshape(self, shape):
+        self.values = self.values[:shape[0]]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.values, dtype=dtype)
+
+class fakeTree:
+    # Event tree of per event arrays of '<sampler>.<branch>', buffers of GetEstimate() rows
+    def __init__(self, events, estimate=10):
+        self.events   = events
+        self.estimate = estimate
+        self.draws    = 0
+
+    def GetEntries(self):
+        return len(self.events)
+
+    def GetEstimate(self):
+        return self.estimate
+
+    def SetEstimate(self, n):
+        self.estimate = n
+
+    def Draw(self, varexp, selection, option, nentries, first):
+        assert option == "goff"
+        self.draws += 1
+        events  = self.events[first:first+nentries]
+        columns = [np.concatenate([e[v] for e in events]) for v in varexp.split(":")]
+        self.buffers = [np.concatenate([c[:self.estimate], np.full(10000, np.nan)]) for c in columns]
+        return len(columns[0])
+
+    def GetVal(self, k):
+        return fakeView(self.buffers[k])
+
+class fakeFile:
+    def __init__(self, tree):
+        self.tree = tree
+
+    def Get(self, name):
+        return self.tree
+
+    def Close(self):
+        pass
+
+
+def events(n, seed=0):
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        m = rng.integers(0, 6)
+        out.append({"S.x": rng.normal(size=m), "S.zp": rng.uniform(-1, 1, m), "S.partID": rng.choice([22, 11], m)})
+    return out
+
+
+def test_drawColumns():
+    ev   = events(20)
+    tree = fakeTree(ev, estimate=1000)
+    x, zp = reduction._drawColumns(tree, ["S.x", "S.zp"], 5, 10)
+    assert np.array_equal(x, np.concatenate([e["S.x"] for e in ev[10:15]]))
+    assert np.array_equal(zp, np.concatenate([e["S.zp"] for e in ev[10:15]]))
+    assert tree.draws == 1
+
+
+def test_drawColumns_estimate():
+    ev   = events(20)
+    tree = fakeTree(ev, estimate=3)
+    x,   = reduction._drawColumns(tree, ["S.x"], 20, 0)
+    # more rows than the estimate, drawn again with a larger one
+    assert np.array_equal(x, np.concatenate([e["S.x"] for e in ev]))
+    assert tree.draws == 2 and tree.estimate > len(x)
+
+
+def test_iterChunks(monkeypatch):
+    ev   = events(25)
+    tree = fakeTree(ev)
+    monkeypatch.setattr(reduction, "_loadROOT", lambda: types.SimpleNamespace(TFile=types.SimpleNamespace(Open=lambda f: fakeFile(tree))))
+    chunks = list(reduction.iterChunks("run.root", ["S"], chunkSize=10))
+    assert len(chunks) == 3
+    assert chunks[0]["S"].data["partID"].dtype == np.int32
+    for k, c in enumerate(chunks):
+        assert np.array_equal(c["S"].data["x"], np.concatenate([e["S.x"] for e in ev[10*k:10*(k+1)]]))
+
+
+@pytest.fixture
+def run(newStudy):
+    s = newStudy()
+    benchmark.bdsim(s._gmadFile(), "run", 1000, seed=23)
+    return s._samplerNames, reduction.readSamplers("run.root", s._samplerNames)
+
+def chunks(samplers):
+    return streaming.iterSamplers("run.root", samplers, branches=("x", "zp", "partID"), chunkSize=300)
+
+
+def test_counts(run):
+    samplers, data = run
+    photon = lambda d: d["partID"] == 22
+    n = streaming.counts(chunks(samplers), samplers, select=photon)
+    assert n == {s: int(np.sum(photon(data[s].data))) for s in samplers}
+    assert streaming.count(chunks(samplers), samplers[1]) == len(data[samplers[1]].data["x"])
+
+
+def test_histogram(run):
+    samplers, data = run
+    d = data[samplers[0]].data
+    counts, edges = streaming.histogram(chunks(samplers), samplers[0], "x", 20, (-0.1, 0.5), select=lambda d: d["zp"] > 0)
+    assert np.array_equal(counts, np.histogram(d["x"][d["zp"] > 0], bins=20, range=(-0.1, 0.5))[0])
+
+    counts, _, _ = streaming.histogram2d(chunks(samplers), samplers[0], "x", "zp", 10, [(-0.1, 0.5), (-1, 1)])
+    assert np.array_equal(counts, np.histogram2d(d["x"], d["zp"], bins=10, range=[(-0.1, 0.5), (-1, 1)])[0])
+
+
+def test_cutFlow_and_regions(newStudy, run):
+    samplers, data = run
+    d    = data[samplers[0]].data
+    flow = streaming.cutFlow(chunks(samplers), samplers[0], [("photon", lambda d: d["partID"] == 22),
+                                                             ("forward", lambda d: d["zp"] >= 0)])
+    assert flow == [("none", len(d["x"])), ("photon", int(np.sum(d["partID"] == 22))),
+                    ("forward", int(np.sum((d["partID"] == 22) & (d["zp"] >= 0))))]
+
+    r = newStudy()._regions()
+    assert np.array_equal(streaming.countRegions(chunks(samplers), samplers, r), r.count(*(data[s] for s in samplers)))
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import campaign, journal, parallel, surrogate
+
+MU = 60.0
+
+
+def exponential(ts, err=1e-4):
+    return [(t, 1-np.exp(-MU*t), err) for t in ts]
+
+
+@pytest.fixture
+def model():
+    return surrogate.attenuationModel(exponential([0.01, 0.03, 0.05, 0.08]))
+
+
+def test_model_exponential(model):
+    mean, std = model.predict([0.02, 0.06])
+    assert np.allclose(mean, MU*np.array([0.02, 0.06]), rtol=1e-3)
+    value, err = model.absorbed(0.03)
+    assert value[0] == pytest.approx(1-np.exp(-MU*0.03), abs=1e-4)
+    # far from the points the prediction is less certain
+    assert model.predict(0.5)[1][0] > model.predict(0.03)[1][0]
+
+
+def test_threshold(model):
+    t, lo, hi = model.threshold(0.99)
+    assert t == pytest.approx(np.log(100)/MU, rel=1e-3)
+    assert lo <= t <= hi
+    assert np.isnan(model.threshold(1-1e-12)[0])
+
+
+def test_model_needs_two_thicknesses():
+    with pytest.raises(ValueError):
+        surrogate.attenuationModel(exponential([0.05, 0.05]))
+
+
+def test_propose(model):
+    before = model.predict(np.linspace(0, 0.2, 11))
+    news   = model.propose(0.99, k=4, spacing=0.005)
+    assert len(news) == len(set(news)) == 4
+    assert all(abs(a-b) >= 0.005 for i, a in enumerate(news) for b in news[i+1:])
+    # around the threshold
+    assert min(abs(t-(np.log(100)/MU)) for t in news) < 0.01
+    # the proposals are not kept in the model
+    after = model.predict(np.linspace(0, 0.2, 11))
+    assert np.allclose(before, after)
+
+
+def test_loadJournals_config(standIn):
+    spec = {"ir": "Dipole_half", "materials": ["Pb"], "thicknesses": [0.02, 0.05], "ngenerate": 1000,
+            "runKey": "search", "workspaces": "ws", "checkpoint": True}
+    one  = campaign.campaign(dict(spec, nruns=2))
+    one.run(write=False)
+    # other runs of the same points in the same journals
+    campaign.campaign(dict(spec, nruns=4, slabs=3)).run(write=False)
+
+    dataDir = one._newStudy("Pb", 0.02)._dataDir()
+    mixed   = surrogate.loadJournals(dataDir, "Pb", 1000)
+    rows    = surrogate.loadJournals(dataDir, "Pb", 1000, config=lambda t: one.configKey("Pb", t))
+    assert [r[0] for r in sorted(rows)] == [0.02, 0.05]
+    assert surrogate.loadJournals(dataDir, "Pb", 500) == []
+
+    for t, value, err in rows:
+        path = journal.journalFile(one._newStudy("Pb", t))
+        f    = [parallel.absorbed(c) for c in journal.runJournal(path, 1000, one.configKey("Pb", t)).load().values()]
+        assert len(f) == 2
+        assert value == pytest.approx(np.mean(f)) and err == pytest.approx(np.std(f)/np.sqrt(2))
+    assert sorted(rows) != sorted(mixed)
+
+    points = surrogate.loadResults(dataDir, "Pb", 1000, config=lambda t: one.configKey("Pb", t))
+    assert np.allclose(points, sorted(rows))
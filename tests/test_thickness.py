@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from LHeC_shieldingStudy import thickness
+
+
+def exponential(ts, mu, err=1e-4):
+    return np.array([(t, 1-np.exp(-mu*t), err) for t in ts])
+
+
+def test_fitThickness_exponential():
+    t, err = thickness.fitThickness(exponential([0.01, 0.05, 0.1], mu=60), 0.999)
+    assert t == pytest.approx(np.log(1000)/60, rel=1e-6)
+    assert err > 0
+
+
+def test_fitThickness_weights():
+    points = exponential([0.01, 0.05, 0.1], mu=60)
+    # a point far off with a huge error hardly moves the fit
+    points = np.vstack([points, [0.07, 0.5, 10]])
+    t, _ = thickness.fitThickness(points, 0.999)
+    assert t == pytest.approx(np.log(1000)/60, rel=1e-3)
+
+
+def test_fitThickness_cannot_fit():
+    assert thickness.fitThickness(exponential([0.05], mu=60), 0.999) == (None, None)
+    assert thickness.fitThickness(exponential([0.05, 0.05], mu=60), 0.999) == (None, None)
+    # absorbing less with more material
+    assert thickness.fitThickness([(0.01, 0.9, 0.01), (0.02, 0.5, 0.01)], 0.999) == (None, None)
+
+
+def test_logTransmission_fully_absorbed():
+    y, s = thickness._logTransmission([1.0, 0.0], [0.0, 0.1])
+    assert np.isfinite(y).all() and np.isfinite(s).all()
+    assert y[1] == 0 and s[1] == pytest.approx(0.1)
+
+
+def test_findThickness(standIn):
+    # the stand-in absorbs about 81% at 3cm and 97% at 8cm of Pb
+    t, err, points = thickness.findThickness("Pb", target=0.9, tol=0.005, bracket=(0.01, 0.02),
+                                             ngenerate=1000, nruns=3, runKey="find", workspaces="ws")
+    assert 0.03 < t < 0.08
+    assert err <= 0.005
+    # the bracket was widened to contain the target
+    assert points[:, 0].max() > t
+    below, above = points[points[:, 0] < t-0.01], points[points[:, 0] > t+0.01]
+    assert (below[:, 1] < 0.9).all() and (above[:, 1] > 0.9).all()
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+
+from LHeC_shieldingStudy import workspace
+from LHeC_shieldingStudy.campaign import getModule
+
+
+def test_setup(tmp_path):
+    (tmp_path/"GMAD").mkdir()
+    (tmp_path/"GMAD"/"material_Concretes.gmad").write_text("concrete;")
+    path = workspace.setup(str(tmp_path/"ws"), root=str(tmp_path))
+    assert path == str(tmp_path/"ws")
+    assert (tmp_path/"ws"/"tmp").is_dir()
+    assert (tmp_path/"ws"/"GMAD"/"material_Concretes.gmad").read_text() == "concrete;"
+
+    # a copy in the workspace is kept
+    (tmp_path/"ws"/"GMAD"/"material_Concretes.gmad").write_text("edited;")
+    workspace.setup(str(tmp_path/"ws"), root=str(tmp_path))
+    assert (tmp_path/"ws"/"GMAD"/"material_Concretes.gmad").read_text() == "edited;"
+
+
+def test_defaultPath():
+    assert workspace.defaultPath("quads", "Pb", 0.025) == os.path.join("workspaces", "quads-Pb-0.025m")
+
+
+def test_separate_studies(standIn):
+    os.makedirs("GMAD")
+    module = getModule("Dipole_half")
+    thin, thick = (module.shieldingStudy("Pb", 1000, 2, t, "ws", workspace=True) for t in (0.02, 0.08))
+    for s in (thin, thick):
+        os.makedirs(s._dataDir(), exist_ok=True)
+        s.genGMAD()
+    assert thin._gmadFile() != thick._gmadFile()
+    assert thin._rebdsimConfig() != thick._rebdsimConfig()
+    assert all(os.path.isabs(p) and os.path.exists(p) for p in (thin._gmadFile(), thick._gmadFile()))
+    # the output still goes to the DATA tree of the directory the studies were made in
+    assert thin._dataDir() == thick._dataDir() == os.path.join(os.getcwd(), "DATA", "ws")
+
+    # the gmad files of the thick study do not change the thin one
+    thinValue = thin.runStudy()[0]
+    thickValue = thick.runStudy()[0]
+    assert thinValue < thickValue
+    alone = module.shieldingStudy("Pb", 1000, 2, 0.02, "alone", workspace=True)
+    os.makedirs(alone._dataDir())
+    alone.genGMAD()
+    assert np.isclose(alone.runStudy()[0], thinValue)